@@ -41,7 +41,9 @@ def extract_transform_load():
         ingestion_artifact = ob.initiate_data_ingestion()
         
         if ingestion_artifact.status:
-            logger.info("Data ingestion completed successfully")
+            logger.info(f"Data ingestion completed successfully (cache {'hit' if ingestion_artifact.cache_hit else 'miss'})")
+            if ingestion_artifact.new_data_path is not None:
+                logger.info(f"{ingestion_artifact.new_rows} new rows in {ingestion_artifact.new_data_path}, watermark {ingestion_artifact.watermark}")
         else:
             logger.error("Data ingestion failed")
             raise AirflowException("Data ingestion failed")
@@ -72,7 +74,9 @@ def extract_transform_load():
         transformation_artifact = ob.initiate_data_transformation(ingestion_artifact)
         
         if transformation_artifact.status:
-            logger.info("Data transformation completed successfully")
+            logger.info(f"Data transformation completed successfully (cache {'hit' if transformation_artifact.cache_hit else 'miss'})")
+            if transformation_artifact.new_data_path is not None:
+                logger.info(f"New transformed batch: {transformation_artifact.new_data_path} (refit: {transformation_artifact.refit})")
             return ArtifactSerializer.serialize(transformation_artifact)
         else:
             logger.error("Data transformation failed")
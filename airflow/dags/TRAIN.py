@@ -2,12 +2,14 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import datetime
+from pathlib import Path
 from scripts.drift_detect import DataDrift
 from scripts.model_trainer import ModelTrainer
 from scripts.model_evalpush import ModelEvalPush
 from src.configuration.config_manager import ConfigurationManager
 from src.logger import logging as logger
 from src.utils.artifact_serializer import ArtifactSerializer
+from src.utils.common import load_json
 from airflow.operators.bash import BashOperator
 import dagshub
 import mlflow
@@ -57,11 +59,21 @@ def drift_model_training():
         
         experiment_id = mlflow.create_experiment(experiment_name)
         with mlflow.start_run(experiment_id=experiment_id) as run:            
-            # Log the HTML report under the 'evidently_reports' artifact path
-            mlflow.log_artifact(report_path, "evidently_report")
+            # Log the drift report (the JSON summary, or Evidently's HTML with report_format: html)
+            mlflow.log_artifact(report_path, "drift_report")
+            interval = ob.summary.get("drift_share_interval")
+            mlflow.log_metric("drift_share", float(ob.summary["drift_share"]))
+            if interval:
+                mlflow.log_metric("drift_share_lower", float(interval[0]))
+                mlflow.log_metric("drift_share_upper", float(interval[1]))
+            online = ob.summary.get("online")
+            if online:
+                for feature, psi in online["psi"].items():
+                    if psi is not None:
+                        mlflow.log_metric(f"online_psi_{feature}", float(psi))
             run_id = run.info.run_id
             
-            logger.info(f"Evidently AI HTML report logged as artifact: report.yml at {datetime.datetime.now()}")
+            logger.info(f"Drift report logged as artifact: {report_path} at {datetime.datetime.now()}")
         
         logger.info(f"Drift check completed with flag: {trigger_flag}")
         return trigger_flag
@@ -84,9 +96,29 @@ def drift_model_training():
         experiment_id = mlflow.create_experiment(model_exp_name)
         with mlflow.start_run(experiment_id=experiment_id):
             mlflow.log_metric("f1_score", float(model_training_artifact.f1_score))
+            mlflow.log_param("n_estimators", model_training_artifact.n_estimators)
+            mlflow.log_param("incremental", model_training_artifact.incremental)
+            mlflow.log_param("reused_model", model_training_artifact.reused_model)
             mlflow.log_metric("accuracy", float(model_training_artifact.precision_score))
             mlflow.log_metric("accuracy", float(model_training_artifact.recall_score))
             mlflow.log_artifact(config.trained_model_path.as_posix())
+            if model_training_artifact.compiled_model_path:
+                mlflow.log_artifact(model_training_artifact.compiled_model_path)
+            if model_training_artifact.reference_sketch_path:
+                mlflow.log_artifact(model_training_artifact.reference_sketch_path)
+            if model_training_artifact.search_results_path:
+                # One nested run per trial of the hyperparameter search
+                search_results = load_json(Path(model_training_artifact.search_results_path))
+                mlflow.log_params({f"search_{name}": value for name, value in search_results.winner.items()})
+                mlflow.log_artifact(model_training_artifact.search_results_path)
+                for trial in search_results.trials:
+                    with mlflow.start_run(experiment_id=experiment_id, run_name=f"trial_{trial.candidate}_rung_{trial.rung}", nested=True):
+                        mlflow.log_params({**trial.params, "n_rows": trial.n_rows, "rung": trial.rung})
+                        mlflow.log_metric("f1_score", trial.f1)
+                        mlflow.log_metric("fit_seconds", trial.fit_seconds)
+                        mlflow.log_metric("predict_latency_ms", trial.predict_latency_ms)
+                        mlflow.log_metric("model_mb", trial.model_mb)
+                        mlflow.log_metric("within_budget", float(trial.within_budget))
         
         return ArtifactSerializer.serialize(model_training_artifact)
         
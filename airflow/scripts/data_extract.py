@@ -1,14 +1,49 @@
 import os, sys
 # sys.path.append(os.path.abspath(os.path.join(os.path.join(os.path.dirname(__file__), '..'), '..')))
 
+import io
+import shutil
+import hashlib
 import zipfile
+import dataclasses
+from pathlib import Path
+from typing import Iterable, Optional
 import gdown
+import pandas as pd
 from src.logger import logging as logger
-from src.utils.common import create_directories
+from src.constants import RAW_DATA_DTYPES
+from src.utils.common import create_directories, load_json, save_json, table_files
+from src.feature_transform.date_age import parse_dates
+from src.utils.stage_cache import StageCache
 from src.entity.config_entity import DataIngestionConfig
 from src.entity.artifact_entity import DataIngestionArtifact
 
 
+INGESTION_METADATA_FILE_NAME = "_ingestion.json"
+WATERMARK_FILE_NAME = "watermark.json"
+# Rows are ingested incrementally by this column
+WATERMARK_COLUMN = "trans_date_trans_time"
+# Identifies the rows at the watermark already ingested, so late rows with that same timestamp still are
+ID_COLUMN = "trans_num"
+
+
+class _HashingReader(io.RawIOBase):
+    """Read-only stream that hashes the bytes of `raw` as they are read through it."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.digest = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        buffer[:len(data)] = data
+        self.digest.update(data)
+        return len(data)
+
+
 class DataIngestion:
     """Data ingestion class to handle downloading and extracting data files.
     """
@@ -44,28 +79,233 @@ class DataIngestion:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
             zip_ref.extractall(unzip_path)
             
+    def _csv_member(self, zip_ref: zipfile.ZipFile) -> str:
+        """The archive's csv: the one named after the zip file, else its only csv."""
+        expected = Path(self.config.zip_file_name).with_suffix('.csv').name
+        members = [name for name in zip_ref.namelist() if name.endswith('.csv')]
+        for name in members:
+            if Path(name).name == expected:
+                return name
+        if len(members) == 1:
+            return members[0]
+        raise ValueError(f"Expected {expected} or a single csv in the archive, found {members}")
+
+    @property
+    def store_dir(self) -> Path:
+        """Directory the csv is streamed into as parquet part-files."""
+        return Path(self.config.unzip_dir) / Path(self.config.zip_file_name).stem
+
+    @property
+    def watermark_path(self) -> Path:
+        return Path(self.config.dir_name) / WATERMARK_FILE_NAME
+
+    def _stream_zip(self, output_dir: Path, watermark: Optional[pd.Timestamp] = None, seen_ids: Iterable[str] = ()) -> dict:
+        """
+        Streams the archive's csv into parquet part-files in `output_dir` and returns the metadata
+        also written there. With `incremental`, only rows after `watermark`, or at it but with a
+        `trans_num` not in `seen_ids`, are kept (all of them when it is None). The latest kept
+        `trans_date_trans_time` is reported as the new watermark, with the `trans_num`s kept at it.
+        """
+        zip_path = os.path.join(self.config.dir_name, self.config.zip_file_name)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        create_directories([output_dir])
+
+        rows_read, rows, parts, latest, latest_ids = 0, 0, 0, None, set()
+        seen_ids = set(seen_ids)
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            member = self._csv_member(zip_ref)
+            with zip_ref.open(member) as raw:
+                reader = _HashingReader(raw)
+                chunks = pd.read_csv(io.BufferedReader(reader), chunksize=self.config.chunk_size, dtype=RAW_DATA_DTYPES)
+                for chunk in chunks:
+                    rows_read += len(chunk)
+                    if self.config.incremental:
+                        dates = parse_dates(chunk[WATERMARK_COLUMN])
+                        if watermark is not None:
+                            # Unparseable dates (NaT) compare False and are never ingested incrementally.
+                            # Rows at the watermark may have arrived after the last run read it.
+                            at_watermark = (dates == watermark).to_numpy() & ~chunk[ID_COLUMN].isin(seen_ids).to_numpy()
+                            is_new = (dates > watermark).to_numpy() | at_watermark
+                            chunk, dates = chunk[is_new], dates[is_new]
+                        if dates.notna().any():
+                            chunk_latest = dates.max()
+                            if latest is None or chunk_latest > latest:
+                                latest, latest_ids = chunk_latest, set()
+                            if chunk_latest == latest:
+                                latest_ids.update(chunk.loc[(dates == latest).to_numpy(), ID_COLUMN].dropna())
+                    if not len(chunk):
+                        continue
+                    chunk.to_parquet(output_dir / f"part-{parts:05d}.parquet", index=False)
+                    rows += len(chunk)
+                    parts += 1
+
+        metadata = {
+            "source": member,
+            "rows_read": rows_read,
+            "rows": rows,
+            "sha256": reader.digest.hexdigest(),
+            "parts": parts,
+            "watermark": latest.isoformat() if latest is not None else None,
+            "watermark_ids": sorted(latest_ids),
+        }
+        save_json(output_dir / INGESTION_METADATA_FILE_NAME, metadata)
+        return metadata
+
+    def stream_zip_to_parquet(self) -> DataIngestionArtifact:
+        """
+        Method Name :   stream_zip_to_parquet
+        Description :   Streams the csv member out of the zip in `chunk_size` row chunks, typed with
+                        RAW_DATA_DTYPES, and writes each chunk as a parquet part-file. Nothing is extracted
+                        to disk and the csv is read once. The rows are counted and the csv bytes hashed
+                        (sha256) as they are parsed; the zip member's CRC is checked by zipfile at the end
+                        of the stream. The parts go to a temporary directory that replaces the output
+                        directory only once complete.
+
+        Output      :   DataIngestionArtifact pointing at the output directory
+        On Failure  :   Raise the exception, leaving any previous output in place
+        """
+        output_dir = self.store_dir
+        tmp_dir = output_dir.with_name(output_dir.name + ".tmp")
+        metadata = self._stream_zip(tmp_dir)
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(tmp_dir, output_dir)
+        logger.info(f"Streamed {metadata['rows']} rows of {metadata['source']} into {output_dir} (sha256 {metadata['sha256']})")
+        return DataIngestionArtifact(
+            data_ingestion_unzip_file_path=str(output_dir),
+            status=True,
+            row_count=metadata["rows_read"],
+            checksum=metadata["sha256"]
+        )
+
+    def read_watermark(self) -> Optional[dict]:
+        """The incremental ingestion state, or None before the first incremental run."""
+        if not self.watermark_path.exists() or not self.store_dir.is_dir():
+            return None
+        return dict(load_json(self.watermark_path))
+
+    def ingest_new_rows(self) -> DataIngestionArtifact:
+        """
+        Method Name :   ingest_new_rows
+        Description :   Incremental ingestion. Only the rows whose `trans_date_trans_time` is after the
+                        high-watermark kept in `watermark.json` are streamed out of the archive, into a new
+                        `batch-NNNNN` directory of the store. Rows at the watermark itself are new too unless
+                        their `trans_num` is among those ingested at it, which the state file also keeps, so a
+                        row arriving late within the watermark's minute is neither lost nor ingested twice. Without a state file (first run) the store
+                        is rebuilt with every row as batch-00000. The batch is published before the state
+                        file is updated, so a run failing in between ingests the same rows into the same
+                        batch on retry.
+
+        Output      :   DataIngestionArtifact pointing at the whole store, with the new batch in `new_data_path`
+        On Failure  :   Raise the exception, leaving the store and the watermark as they were
+        """
+        store_dir = self.store_dir
+        state = self.read_watermark()
+        batch = state["batches"] if state else 0
+        watermark = pd.Timestamp(state["watermark"]) if state and state["watermark"] else None
+        # States written before the ids were kept count every row at the watermark as ingested
+        seen_ids = state.get("watermark_ids") if state else None
+        if watermark is not None and seen_ids is None:
+            watermark, seen_ids = watermark + pd.Timedelta(1, "ns"), []
+        logger.info(f"Ingesting rows from watermark {watermark} not among its {len(seen_ids or [])} ingested ids into batch {batch}")
+
+        tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+        metadata = self._stream_zip(tmp_dir, watermark, seen_ids or ())
+
+        if metadata["rows"]:
+            if state is None:
+                shutil.rmtree(store_dir, ignore_errors=True)
+            create_directories([store_dir])
+            batch_dir = store_dir / f"batch-{batch:05d}"
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            os.replace(tmp_dir, batch_dir)
+            if metadata["watermark"] is None:
+                # Only unparseable dates were new, the watermark stays
+                watermark_ids = seen_ids or []
+            elif state is not None and metadata["watermark"] == state["watermark"]:
+                watermark_ids = sorted(set(seen_ids or []) | set(metadata["watermark_ids"]))
+            else:
+                watermark_ids = metadata["watermark_ids"]
+            state = {
+                "column": WATERMARK_COLUMN,
+                "watermark": metadata["watermark"] or (state["watermark"] if state else None),
+                "watermark_ids": watermark_ids,
+                "batches": batch + 1,
+                "rows": (state["rows"] if state else 0) + metadata["rows"],
+            }
+            save_json(self.watermark_path, state)
+        elif state is None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise ValueError(f"No rows to ingest in {metadata['source']}")
+        else:
+            # Nothing new, the latest batch stays the newest data
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            batch_dir = store_dir / f"batch-{batch - 1:05d}"
+
+        logger.info(
+            f"Ingested {metadata['rows']} new rows of {metadata['rows_read']} into {batch_dir}, "
+            f"watermark now {state['watermark']}, {state['rows']} rows in the store"
+        )
+        return DataIngestionArtifact(
+            data_ingestion_unzip_file_path=str(store_dir),
+            status=True,
+            row_count=metadata["rows_read"],
+            checksum=metadata["sha256"],
+            new_data_path=str(batch_dir),
+            new_rows=metadata["rows"],
+            watermark=state["watermark"]
+        )
+
     def initiate_data_ingestion(self) -> DataIngestionArtifact:
         """
         Method Name :   initiate_data_ingestion
-        Description :   This method initiates the data ingestion process by downloading and extracting the data.
+        Description :   This method initiates the data ingestion process by downloading and extracting the data,
+                        or, with `output_format: parquet`, streaming it into parquet part-files. With
+                        `incremental`, only the rows newer than the watermark are ingested, as a new batch.
+                        The archive is always downloaded. When it has the same content (sha256) as the one
+                        the previous run ingested, with the same config, and that run's output is unchanged
+                        on disk, the extract/convert step is skipped and the previous artifact is returned
+                        (cache hit), with `new_rows` 0 when incremental.
         
         Output      :   None
         On Failure  :   Write an exception log and then raise an exception
         """
         logger.info("Starting data ingestion process")
-        
+        output = os.path.join(self.config.unzip_dir, self.config.zip_file_name.replace('.zip', '.csv'))
+
+        zip_path = os.path.join(self.config.dir_name, self.config.zip_file_name)
+
         try:
             self.download_file()
             logger.info("Data file downloaded successfully")
-            
-            self.extract_zip_file()
-            logger.info("Data file extracted successfully")
-            
-            output = os.path.join(self.config.unzip_dir, self.config.zip_file_name.replace('.zip', '.csv'))
-            return DataIngestionArtifact(
-                data_ingestion_unzip_file_path=output,
-                status=True
-            )
+
+            # The source only has an identity once downloaded, so the entry is keyed on the archive's content
+            cache = StageCache("Data ingestion", self.config.dir_name)
+            fingerprint = cache.fingerprint(self.config, [__file__, zip_path])
+            cached = cache.lookup(fingerprint)
+            if cached is not None:
+                artifact = dataclasses.replace(DataIngestionArtifact(**cached), cache_hit=True)
+                if artifact.new_data_path is not None:
+                    # Nothing is ingested on a hit: the cached batch is still the newest data, but none of it is new
+                    artifact = dataclasses.replace(artifact, new_rows=0)
+                return artifact
+
+            if self.config.incremental:
+                artifact = self.ingest_new_rows()
+                output_paths = table_files(self.store_dir) + [self.watermark_path]
+            elif self.config.output_format == 'parquet':
+                artifact = self.stream_zip_to_parquet()
+                output_paths = table_files(self.store_dir) + [self.store_dir / INGESTION_METADATA_FILE_NAME]
+            else:
+                self.extract_zip_file()
+                logger.info("Data file extracted successfully")
+                output_paths = [output]
+                artifact = DataIngestionArtifact(
+                    data_ingestion_unzip_file_path=output,
+                    status=True
+                )
+            cache.store(fingerprint, dataclasses.asdict(artifact), output_paths=output_paths, input_paths=[__file__, zip_path])
+            return artifact
             
         except Exception as e:
             logger.error(f"Error during data ingestion: {e}")
@@ -1,6 +1,13 @@
 import os, sys
+import dataclasses
+import functools
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
 # sys.path.append(os.path.abspath(os.path.join(os.path.join(os.path.dirname(__file__), '..'), '..')))
 
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
@@ -9,10 +16,44 @@ from src.logger import logging as logger
 from src.entity.config_entity import DataTransformationConfig
 from src.entity.artifact_entity import DataTransformationArtifact
 from src.entity.artifact_entity import DataIngestionArtifact
-from src.utils.common import create_directories
+from src.utils.common import create_directories, compact_dtypes, iter_table_chunks, load_table, table_files, TableWriter, TABLE_FORMATS
+from src.utils.stage_cache import StageCache
 import joblib
-from typing import Tuple
-from src.feature_transform.date_age import DateAgeFeatureExtractor
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+from src.feature_transform.date_age import DateAgeFeatureExtractor, DATE_COLUMNS
+import src.feature_transform.date_age as date_age
+from src.constants import SAMPLE_WEIGHT_COLUMN, UPSAMPLED_COLUMN
+
+
+def ordered_map(pool: Optional[Executor], fn: Callable, items: Iterable, max_pending: int) -> Iterator:
+    """
+    `map(fn, items)` on `pool`, yielding results in input order while keeping at most
+    `max_pending` items in flight, so a chunk generator isn't drained into memory up front.
+    Runs in-process when `pool` is None.
+    """
+    if pool is None:
+        yield from map(fn, items)
+        return
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _extract_by_class(extractor: DateAgeFeatureExtractor, chunk: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Extracted features of a raw chunk's majority and minority rows (pass 1 of the chunked transform)."""
+    X_chunk = chunk.drop(columns=['is_fraud'])
+    y_chunk = chunk['is_fraud']
+    return extractor.transform(X_chunk[y_chunk == 0]), extractor.transform(X_chunk[y_chunk == 1])
+
+
+def _transform_part(pipeline: Pipeline, part: tuple) -> tuple:
+    """Transforms the frame in `part[0]` and passes the rest of the tuple (labels, weights) through."""
+    X, *rest = part
+    return (pipeline.transform(X), *rest)
 
 
 class DataTransformation:
@@ -26,17 +67,30 @@ class DataTransformation:
         
         
     def transform_data(self, artifact: DataIngestionArtifact) -> DataTransformationArtifact:
+        if self.config.chunk_size:
+            return self.transform_data_chunked(artifact)
+
         try : 
-            df = pd.read_csv(artifact.data_ingestion_unzip_file_path)
+            df = load_table(artifact.data_ingestion_unzip_file_path)
             
             df['is_fraud'] = df['is_fraud'].apply(lambda x: int(str(x).split('"')[0]))
             
-            x_upsampled, y_upsampled = self.resample_data(df)
-            logger.info(f"Resampled data shapes: X - {x_upsampled.shape}, y - {y_upsampled.shape}")
-            X_processed = self.pipeline.fit_transform(x_upsampled, y_upsampled)
+            if self.config.balancing == 'weight':
+                x_balanced, y_balanced, sample_weight = self.weight_data(df)
+                # The scaler statistics are weighted the same way the model will be
+                X_processed = self.fit_transform(x_balanced, sample_weight=sample_weight)
+            else:
+                x_balanced, y_balanced, upsampled = self.resample_data(df)
+                sample_weight = None
+                logger.info(f"Resampled data shapes: X - {x_balanced.shape}, y - {y_balanced.shape}")
+                X_processed = self.fit_transform(x_balanced)
             
             X_processed_df = pd.DataFrame(X_processed, columns=self.pipeline.named_steps['date_age_extractor'].features)
-            y_upsampled_reset_index = y_upsampled.reset_index(drop=True)
+            if sample_weight is not None:
+                X_processed_df[SAMPLE_WEIGHT_COLUMN] = sample_weight
+            else:
+                X_processed_df[UPSAMPLED_COLUMN] = upsampled
+            y_upsampled_reset_index = y_balanced.reset_index(drop=True)
 
             # It's good practice to rename the Series to be its column name before concat
             y_upsampled_reset_index.name = 'is_fraud'
@@ -45,13 +99,14 @@ class DataTransformation:
             # Use axis=1 to concatenate them side-by-side (as columns)
             final_processed_df = pd.concat([X_processed_df, y_upsampled_reset_index], axis=1)
 
-            # 5. Save the combined DataFrame to a CSV file
-            create_directories([self.config.transformed_data_dir, self.config.preprocess_pipeline_object_dir])
-            
-            output_filename = os.path.join(self.config.transformed_data_dir, self.config.transformed_data_file_name)
+            # 5. Save the combined DataFrame in the configured format (csv, parquet or arrow)
+            output_filename = self.output_file(artifact)
             object_filename = os.path.join(self.config.preprocess_pipeline_object_dir, self.config.preprocess_pipeline_object_file_name)
+            create_directories([os.path.dirname(output_filename), self.config.preprocess_pipeline_object_dir])
             
-            final_processed_df.to_csv(output_filename, index=False) # index=False prevents writing the DataFrame index as a column
+            final_processed_df = compact_dtypes(final_processed_df, float32=self.config.float32, int8_columns=['is_fraud', UPSAMPLED_COLUMN])
+            with TableWriter(output_filename) as writer:
+                writer.write(final_processed_df)
             joblib.dump(self.pipeline, object_filename)
             
             logger.info(f"\nFinal processed DataFrame created with shape: {final_processed_df.shape}")
@@ -77,9 +132,57 @@ class DataTransformation:
         
         
 
-    def resample_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    @property
+    def n_jobs(self) -> int:
+        """Worker processes to use, from the config's `n_jobs` (None or 1: in-process, -1: every core)."""
+        n_jobs = self.config.n_jobs or 1
+        return (os.cpu_count() or 1) if n_jobs == -1 else max(n_jobs, 1)
+
+
+    @contextmanager
+    def worker_pool(self) -> Iterator[Optional[Executor]]:
+        """A process pool of `n_jobs` workers, or None when the transform runs in-process."""
+        if self.n_jobs == 1:
+            yield None
+            return
+        logger.info(f"Transforming with {self.n_jobs} worker processes")
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
+            yield pool
+
+
+    def fit_transform(self, X: pd.DataFrame, sample_weight: np.ndarray = None) -> np.ndarray:
         """
-        Resample the DataFrame to balance the classes.
+        Same result as `self.pipeline.fit_transform(X, scaler__sample_weight=sample_weight)`.
+
+        With `n_jobs` > 1 the rows are split into one contiguous partition per worker and the
+        date parsing and age extraction (nearly all of the transform's time) run in the pool.
+        The partitions are concatenated back in order before the scaler is fitted, so its
+        statistics and the scaled output are the same as the serial path's.
+        """
+        if self.n_jobs == 1:
+            return self.pipeline.fit_transform(X, scaler__sample_weight=sample_weight)
+
+        extractor = self.pipeline.named_steps['date_age_extractor']
+        scaler = self.pipeline.named_steps['scaler']
+        extractor.fit(X)
+        # Only the columns the extractor reads are shipped to the workers
+        columns = [column for column in X.columns if column in DATE_COLUMNS or column in extractor.features]
+        partitions = (X.iloc[rows][columns] for rows in np.array_split(np.arange(len(X)), self.n_jobs))
+        with self.worker_pool() as pool:
+            features = pd.concat(ordered_map(pool, extractor.transform, partitions, max_pending=self.n_jobs))
+        return scaler.fit_transform(features, sample_weight=sample_weight)
+
+
+    @staticmethod
+    def copy_flags(drawn) -> np.ndarray:
+        """1 on every draw of a minority row after its first, i.e. the rows upsampling added on top of the original ones."""
+        return pd.Index(drawn).duplicated().astype(np.int8)
+
+
+    def resample_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, np.ndarray]:
+        """
+        Resample the DataFrame to balance the classes. Also returns the UPSAMPLED_COLUMN flags of the
+        rows, so the original rows can be told apart from the added copies (e.g. for drift references).
         """
         X = df.drop(columns=['is_fraud'])
         y = df['is_fraud']
@@ -110,14 +213,277 @@ class DataTransformation:
 
         logger.info(f"\nUpsampled X shape: {X_upsampled.shape}")
         logger.info(f"Upsampled y value counts:\n{y_upsampled.value_counts()}")
+
+        # The draws keep the index of the minority row they copy
+        upsampled = np.concatenate([np.zeros(len(X_majority), dtype=np.int8), self.copy_flags(X_minority_upsampled.index)])
         
-        return (X_upsampled, y_upsampled)
+        return (X_upsampled, y_upsampled, upsampled)
+
+
+    @staticmethod
+    def minority_weight(n_majority: int, n_minority: int) -> float:
+        """Weight that gives the minority rows the same total weight as the majority rows."""
+        if n_minority == 0:
+            raise ValueError("No minority class rows to balance")
+        return n_majority / n_minority
+
+
+    def weight_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, np.ndarray]:
+        """
+        Balance the classes with per-row sample weights instead of duplicating rows.
+        Majority rows weigh 1 and minority rows n_majority / n_minority, the same class
+        totals upsampling produces, while the dataset keeps its original size.
+        """
+        df = df[df['is_fraud'].isin([0, 1])]
+        X = df.drop(columns=['is_fraud'])
+        y = df['is_fraud']
+
+        n_majority, n_minority = int((y == 0).sum()), int((y == 1).sum())
+        minority_weight = self.minority_weight(n_majority, n_minority)
+        sample_weight = np.where(y == 1, minority_weight, 1.0)
+
+        logger.info(f"Original majority samples: {n_majority}")
+        logger.info(f"Original minority samples: {n_minority}, weighted {minority_weight:.3f} each")
+
+        return (X, y, sample_weight)
     
     
+    def read_chunks(self, path: str) -> Iterator[pd.DataFrame]:
+        """Streams the raw data (csv, or the ingested parquet part-files) in chunks of `chunk_size` rows, with `is_fraud` parsed to int."""
+        for chunk in iter_table_chunks(path, self.config.chunk_size):
+            chunk['is_fraud'] = chunk['is_fraud'].apply(lambda x: int(str(x).split('"')[0]))
+            yield chunk
+
+
+    def _pass_two_parts(self, path: str, minority_weight: float) -> Iterator[tuple]:
+        """Raw rows for pass 2 of the chunked transform, as (X, label, sample_weight) per chunk."""
+        for chunk in self.read_chunks(path):
+            if self.config.balancing == 'weight':
+                chunk = chunk[chunk['is_fraud'].isin([0, 1])]
+                if len(chunk):
+                    labels = chunk['is_fraud'].to_numpy()
+                    yield chunk.drop(columns=['is_fraud']), labels, np.where(labels == 1, minority_weight, 1.0)
+                continue
+
+            X_majority = chunk[chunk['is_fraud'] == 0].drop(columns=['is_fraud'])
+            if len(X_majority):
+                yield X_majority, 0, None
+
+
+    def transform_data_chunked(self, artifact: DataIngestionArtifact) -> DataTransformationArtifact:
+        """
+        Method Name :   transform_data_chunked
+        Description :   Out-of-core version of `transform_data` for files that don't fit in memory.
+                        Pass 1 streams the raw data, fits the scaler incrementally (`partial_fit`) on the
+                        majority rows and keeps the extracted features of the minority rows, which are
+                        then upsampled with the same `resample` draw as `resample_data` (or, with
+                        `balancing: weight`, fed to the scaler with their class weight). Pass 2 streams
+                        the csv again and appends every transformed chunk to the output. Rows come out in
+                        the same order as in memory (majority then upsampled minority, or file order when
+                        weighting) and the saved preprocessor matches the in-memory one up to floating
+                        point summation order. With `n_jobs` > 1 both passes hand the chunks to a process
+                        pool and consume the results in file order, so the output doesn't depend on it.
+
+        Output      :   DataTransformationArtifact
+        On Failure  :   Write an exception log and return an artifact with status False
+        """
+        output_filename = self.output_file(artifact)
+        object_filename = os.path.join(self.config.preprocess_pipeline_object_dir, self.config.preprocess_pipeline_object_file_name)
+
+        try:
+            extractor = self.pipeline.named_steps['date_age_extractor']
+            scaler = self.pipeline.named_steps['scaler']
+            balance_by_weight = self.config.balancing == 'weight'
+
+            with self.worker_pool() as pool:
+                # A couple of chunks queued per worker keeps the pool busy without reading the whole file ahead
+                max_pending = 2 * self.n_jobs
+
+                # Pass 1: scaler statistics over the majority rows, minority rows kept as extracted features.
+                # Workers extract the features, the scaler is fitted here in file order.
+                n_majority = 0
+                minority_parts = []
+                extract = functools.partial(_extract_by_class, extractor)
+                chunks = self.read_chunks(artifact.data_ingestion_unzip_file_path)
+                for X_majority, X_chunk_minority in ordered_map(pool, extract, chunks, max_pending):
+                    if len(X_majority):
+                        scaler.partial_fit(X_majority, sample_weight=np.ones(len(X_majority)) if balance_by_weight else None)
+                    n_majority += len(X_majority)
+                    minority_parts.append(X_chunk_minority)
+
+                X_minority = pd.concat(minority_parts, ignore_index=True)
+                logger.info(f"Original majority samples: {n_majority}")
+                logger.info(f"Original minority samples: {len(X_minority)}")
+
+                minority_weight = self.minority_weight(n_majority, len(X_minority))
+                if balance_by_weight:
+                    upsampled_rows = np.arange(0)
+                    for start in range(0, len(X_minority), self.config.chunk_size):
+                        X_part = X_minority.iloc[start:start + self.config.chunk_size]
+                        scaler.partial_fit(X_part, sample_weight=np.full(len(X_part), minority_weight))
+                else:
+                    # Same draw as resample_data: the indices depend only on the minority size, n_samples and the seed
+                    upsampled_rows = resample(np.arange(len(X_minority)), replace=True, n_samples=n_majority, random_state=123)
+                    for start in range(0, len(upsampled_rows), self.config.chunk_size):
+                        scaler.partial_fit(X_minority.iloc[upsampled_rows[start:start + self.config.chunk_size]])
+
+                # Pass 2: transform and append, majority rows in file order followed by the upsampled minority
+                create_directories([os.path.dirname(output_filename), self.config.preprocess_pipeline_object_dir])
+                with TableWriter(output_filename) as writer:
+                    transform = functools.partial(_transform_part, self.pipeline)
+                    parts = self._pass_two_parts(artifact.data_ingestion_unzip_file_path, minority_weight)
+                    for X_processed, label, sample_weight in ordered_map(pool, transform, parts, max_pending):
+                        upsampled = None if balance_by_weight else np.zeros(len(X_processed), dtype=np.int8)
+                        self._append_transformed(writer, X_processed, label, sample_weight, upsampled)
+
+                    copies = self.copy_flags(upsampled_rows)
+                    for start in range(0, len(upsampled_rows), self.config.chunk_size):
+                        X_upsampled = X_minority.iloc[upsampled_rows[start:start + self.config.chunk_size]]
+                        self._append_transformed(writer, scaler.transform(X_upsampled), 1, upsampled=copies[start:start + self.config.chunk_size])
+
+            joblib.dump(self.pipeline, object_filename)
+
+            logger.info(f"Streamed {writer.rows} transformed rows in chunks of {self.config.chunk_size}")
+            logger.info(f"Pipeline object saved to {object_filename}")
+            logger.info(f"Transformed data saved to {output_filename}")
+
+            return DataTransformationArtifact(
+                transformed_object_file_path=object_filename,
+                transformed_file_path=output_filename,
+                status=True
+            )
+
+        except Exception as e:
+            logger.error(f"Error during chunked data transformation: {e}")
+            return DataTransformationArtifact(
+                transformed_object_file_path=object_filename,
+                transformed_file_path=output_filename,
+                status=False
+            )
+
+
+    def _append_transformed(self, writer: TableWriter, X_processed, label, sample_weight: np.ndarray = None,
+                            upsampled: np.ndarray = None):
+        features = self.pipeline.named_steps['date_age_extractor'].features
+        processed_df = pd.DataFrame(X_processed, columns=features)
+        if sample_weight is not None:
+            processed_df[SAMPLE_WEIGHT_COLUMN] = sample_weight
+        if upsampled is not None:
+            processed_df[UPSAMPLED_COLUMN] = upsampled
+        processed_df['is_fraud'] = label
+        writer.write(compact_dtypes(processed_df, float32=self.config.float32, int8_columns=['is_fraud', UPSAMPLED_COLUMN]))
+
+
+    def output_file(self, artifact: DataIngestionArtifact) -> str:
+        """File the transformed data is written to. Incremental runs write one parquet file per ingestion
+        batch, named after it, into the transformed-data directory."""
+        output = os.path.join(self.config.transformed_data_dir, self.config.transformed_data_file_name)
+        if artifact.new_data_path is None:
+            return output
+        return os.path.join(output, Path(artifact.new_data_path).name + TABLE_FORMATS['parquet'])
+
+
+    def transform_new_rows(self, artifact: DataIngestionArtifact) -> DataTransformationArtifact:
+        """
+        Method Name :   transform_new_rows
+        Description :   Incremental transform of the batch the ingestion just appended. The saved
+                        preprocessor is reused as is, and the batch, balanced on its own with the
+                        configured `balancing`, is written as one more parquet file of the
+                        transformed-data directory. A batch holding a single class is written unbalanced.
+
+        Output      :   DataTransformationArtifact pointing at the batch's file
+        On Failure  :   Write an exception log and return an artifact with status False
+        """
+        output_filename = self.output_file(artifact)
+        object_filename = os.path.join(self.config.preprocess_pipeline_object_dir, self.config.preprocess_pipeline_object_file_name)
+
+        try:
+            self.pipeline = joblib.load(object_filename)
+            df = load_table(artifact.new_data_path)
+            df['is_fraud'] = df['is_fraud'].apply(lambda x: int(str(x).split('"')[0]))
+            df = df[df['is_fraud'].isin([0, 1])]
+
+            balanced = df['is_fraud'].nunique() == 2
+            if not balanced:
+                logger.warning(f"Batch {artifact.new_data_path} holds a single class, writing it unbalanced")
+            if self.config.balancing == 'weight':
+                X, y, sample_weight = self.weight_data(df) if balanced else (df.drop(columns=['is_fraud']), df['is_fraud'], np.ones(len(df)))
+                upsampled = None
+            else:
+                X, y, upsampled = self.resample_data(df) if balanced else (df.drop(columns=['is_fraud']), df['is_fraud'], np.zeros(len(df), dtype=np.int8))
+                sample_weight = None
+
+            create_directories([os.path.dirname(output_filename)])
+            with TableWriter(output_filename) as writer:
+                self._append_transformed(writer, self.pipeline.transform(X), y.to_numpy(), sample_weight, upsampled)
+
+            logger.info(f"Transformed {len(df)} new rows into {writer.rows} rows with the saved preprocessor {object_filename}")
+            logger.info(f"Transformed data saved to {output_filename}")
+
+            return DataTransformationArtifact(
+                transformed_object_file_path=object_filename,
+                transformed_file_path=output_filename,
+                status=True
+            )
+
+        except Exception as e:
+            logger.error(f"Error during incremental data transformation: {e}")
+            return DataTransformationArtifact(
+                transformed_object_file_path=object_filename,
+                transformed_file_path=output_filename,
+                status=False
+            )
+
+
     def initiate_data_transformation(self, artifact: DataIngestionArtifact) -> DataTransformationArtifact:
-        """initiate data transformation"""
-        
-        return self.transform_data(artifact)
+        """initiate data transformation, reusing the previous outputs when the raw data and config are unchanged.
+        After an incremental ingestion only the new batch is transformed, with the saved preprocessor,
+        unless `force_refit` is set or there is no preprocessor yet."""
+        cache = StageCache("Data transformation", self.config.dir_name)
+        # The transform code is fingerprinted too, so a changed pipeline never gets stale outputs
+        inputs = table_files(artifact.data_ingestion_unzip_file_path) + [__file__, date_age.__file__]
+        # n_jobs doesn't change the output, so it's left out of the fingerprint
+        fingerprint = cache.fingerprint(dataclasses.replace(self.config, n_jobs=None), inputs)
+        cached = cache.lookup(fingerprint)
+        if cached is not None:
+            transformation_artifact = dataclasses.replace(DataTransformationArtifact(**cached), cache_hit=True)
+            if transformation_artifact.new_data_path is not None:
+                # Same store as last time, so no rows were transformed
+                transformation_artifact = dataclasses.replace(transformation_artifact, new_rows=0)
+            return transformation_artifact
+
+        incremental = artifact.new_data_path is not None
+        object_filename = os.path.join(self.config.preprocess_pipeline_object_dir, self.config.preprocess_pipeline_object_file_name)
+        refit = not incremental or self.config.force_refit or not os.path.exists(object_filename)
+        if refit:
+            transformation_artifact = self.transform_data(artifact)
+        else:
+            transformation_artifact = self.transform_new_rows(artifact)
+
+        if transformation_artifact.status and incremental:
+            batch_file = Path(transformation_artifact.transformed_file_path)
+            if refit:
+                # The refit rewrote the whole store into this batch's file, drop the older ones
+                for stale_file in table_files(batch_file.parent):
+                    if stale_file != batch_file:
+                        os.remove(stale_file)
+            transformation_artifact = dataclasses.replace(
+                transformation_artifact,
+                transformed_file_path=str(batch_file.parent),
+                new_data_path=str(batch_file),
+                new_rows=artifact.new_rows,
+                refit=refit
+            )
+            logger.info(f"{artifact.new_rows} new rows transformed into {batch_file} ({'refit' if refit else 'saved preprocessor'})")
+
+        if transformation_artifact.status:
+            cache.store(
+                fingerprint,
+                dataclasses.asdict(transformation_artifact),
+                output_paths=table_files(transformation_artifact.transformed_file_path) + [transformation_artifact.transformed_object_file_path],
+                input_paths=inputs,
+            )
+        return transformation_artifact
         
     
     
@@ -1,66 +1,273 @@
-from evidently import Report
-from evidently.presets import DataDriftPreset 
-import pandas as pd
 from src.logger import logging as logger
-import datetime, os
+from src.utils.common import iter_table_chunks, load_json, load_table, save_json, table_files
+from src.constants import SAMPLE_WEIGHT_COLUMN, UPSAMPLED_COLUMN
+from src.monitoring.sketch import ReferenceSketch, STATTESTS
+from src.monitoring.sampling import percentile_interval, sample_chunks
+import datetime, os, time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+import numpy as np
+import pandas as pd
 from src.entity.config_entity import DataDriftConfig
+from src.cloud_storage.s3_storage import S3Storage
+
+# Rows read at a time while sampling a window
+SAMPLE_CHUNK_ROWS = 100000
+SAMPLE_SEED = 42
+REPORT_FORMATS = ("json", "html")
+
 
 class DataDrift:
     def __init__(self, config: DataDriftConfig, run_name: str, experiment_name: str):
         self.config = config
         self.run_name = run_name
         self.experiment_name = experiment_name
-    
-    def detect_dataset_drift(self):
-        OVERALL_DRIFT_SHARE_THRESHOLD = 0.2
-        
+        # Filled in by detect_dataset_drift, also written to `summary_path`
+        self.summary = {}
+
+    @property
+    def summary_path(self) -> Path:
+        return Path(self.config.dir_name, self.config.file_name).with_suffix(".json")
+
+    @property
+    def html_report_path(self) -> Path:
+        return Path(self.config.dir_name, self.config.file_name).with_suffix(".html")
+
+    def read_window(self, path) -> Tuple[pd.DataFrame, int]:
+        """
+        Rows of the table at `path` (a file or a directory of batches) and how many there were.
+        With `sample_size` set, the table is streamed chunk by chunk into a stratified or
+        reservoir sample of that size, so memory and the scoring cost stay bounded.
+        """
+        if not self.config.sample_size:
+            df = load_table(path)
+            rows = len(df)
+        else:
+            df, rows = sample_chunks(
+                iter_table_chunks(path, SAMPLE_CHUNK_ROWS),
+                size=self.config.sample_size,
+                method=self.config.sampling,
+                column=self.config.target_column,
+                seed=SAMPLE_SEED,
+            )
+            logger.info(f"Sampled {len(df)} of {rows} rows of {path} ({self.config.sampling})")
+        if UPSAMPLED_COLUMN in df.columns:
+            # Copies added to balance the classes aren't data that arrived
+            df = df[df[UPSAMPLED_COLUMN] == 0]
+        # Training weights and copy flags aren't features, keep them out of the drift report
+        return df.drop(columns=[SAMPLE_WEIGHT_COLUMN, UPSAMPLED_COLUMN], errors='ignore'), rows
+
+    def current_window(self) -> Tuple[pd.DataFrame, int]:
+        """
+        The newest transformed data: the latest batch file when the transformed data is an
+        incremental store, else the whole transformed file.
+        """
+        return self.read_window(table_files(self.config.transformed_data_path)[-1])
+
+    def bootstrap_interval(self, drift_share: Callable[..., float], *frames: pd.DataFrame) -> Optional[Tuple[float, float]]:
+        """
+        Percentile bootstrap interval of `drift_share(*frames)` at the configured confidence,
+        resampling every frame with replacement `bootstrap_rounds` times. None when disabled.
+        """
+        if not self.config.bootstrap_rounds:
+            return None
+        rng = np.random.default_rng(SAMPLE_SEED)
+        shares = [
+            drift_share(*[frame.iloc[rng.integers(0, len(frame), len(frame))] for frame in frames])
+            for _ in range(self.config.bootstrap_rounds)
+        ]
+        return percentile_interval(shares, self.config.confidence)
+
+    def sketch_drift_share(self) -> float:
+        """
+        Method Name :   sketch_drift_share
+        Description :   Scores the current window against the reference sketch the trainer saved next to
+                        the model and records the per-feature scores in the summary. Only the window is read,
+                        so the check costs milliseconds however much history there is. Without a sketch
+                        (no model trained yet) every feature counts as drifted.
+
+        Output      :   Share of drifted features
+        """
+        if self.config.stattest not in STATTESTS:
+            raise ValueError(f"Unknown stattest '{self.config.stattest}', expected one of {STATTESTS}")
+        if not os.path.exists(self.config.reference_sketch_path):
+            logger.warning(f"No reference sketch at {self.config.reference_sketch_path}, training a model first")
+            self.summary.update({"reference": None, "drift_share": 1.0})
+            return 1.0
+
+        started = time.perf_counter()
+        sketch = ReferenceSketch.load(self.config.reference_sketch_path)
+        current, current_rows = self.current_window()
+
+        def drift_share(window: pd.DataFrame) -> float:
+            return float((sketch.score(window)[self.config.stattest] > self.config.stattest_threshold).mean())
+
+        scores = sketch.score(current)
+        scores["drifted"] = scores[self.config.stattest] > self.config.stattest_threshold
+        drift_share_value = float(scores["drifted"].mean())
+        interval = self.bootstrap_interval(drift_share, current)
+        logger.info(f"Scored {len(current)} rows against the reference sketch in {(time.perf_counter() - started) * 1000:.1f}ms")
+        logger.info(f"Drift scores:\n{scores}")
+
+        self.summary.update({
+            "stattest": self.config.stattest,
+            "stattest_threshold": self.config.stattest_threshold,
+            "reference_rows": sketch.rows,
+            "current_rows": current_rows,
+            "current_sampled": len(current),
+            "drift_share": drift_share_value,
+            "drift_share_interval": interval,
+            "features": {name: {key: value.item() if hasattr(value, "item") else value for key, value in row.items()}
+                         for name, row in scores.to_dict(orient="index").items()},
+        })
+        return drift_share_value
+
+    def evidently_drift_share(self) -> float:
+        """
+        Evidently DataDriftPreset of the (sampled) reference data against the (sampled) current
+        window. The HTML report is only rendered with `report_format: html`. Without reference
+        data other than the current window (no model trained yet) every feature counts as drifted.
+        """
+        reference_path = Path(self.config.refrence_data_path)
+        current_path = table_files(self.config.transformed_data_path)[-1]
+        if not reference_path.exists() or reference_path.resolve() == Path(current_path).resolve():
+            # Comparing the window with itself would never find drift
+            logger.warning(f"No reference data at {reference_path} apart from the current window, training a model first")
+            self.summary.update({"reference": None, "drift_share": 1.0})
+            return 1.0
+
+        # Only this method needs Evidently
+        from evidently import Report
+        from evidently.presets import DataDriftPreset
+
+        reference_df, reference_rows = self.read_window(reference_path)
+        current_df, current_rows = self.read_window(current_path)
+
+        def run(reference: pd.DataFrame, current: pd.DataFrame):
+            return Report([
+                DataDriftPreset()
+            ]).run(reference, current)
+
+        def drift_share(my_eval) -> float:
+            # Find the DriftedColumnsCount metric
+            for metric in my_eval.dict().get('metrics', []):
+                if metric.get('metric_id') == 'DriftedColumnsCount(drift_share=0.5)': # Match the exact metric_id
+                    return float(metric['value']['share']) # Extract the 'share' value
+            return 0.0 # Default value
+
+        started = time.perf_counter()
+        my_eval = run(reference_df, current_df)
+        drift_share_value = drift_share(my_eval)
+        interval = self.bootstrap_interval(lambda reference, current: drift_share(run(reference, current)), reference_df, current_df)
+        logger.info(f"Evidently drift evaluation took {time.perf_counter() - started:.2f}s")
+
+        if self.config.report_format == 'html':
+            my_eval.save_html(str(self.html_report_path))
+            self.summary["html_report"] = str(self.html_report_path)
+
+        self.summary.update({
+            "reference_rows": reference_rows,
+            "reference_sampled": len(reference_df),
+            "current_rows": current_rows,
+            "current_sampled": len(current_df),
+            "drift_share": drift_share_value,
+            "drift_share_interval": interval,
+        })
+        return drift_share_value
+
+    def download_online_snapshot(self) -> Optional[str]:
+        """Fetches the snapshot the app publishes to S3 into `online_snapshot_path`. None when it can't be had."""
+        path = str(self.config.online_snapshot_path)
+        if not self.config.s3_drift_snapshot_name:
+            # Not published, only a snapshot placed there by other means is read
+            return path if os.path.exists(path) else None
         try:
-            data = pd.read_csv(self.config.transformed_data_path)
-            reference_df, current_df = data, data
-            
-            report = Report([
-                DataDriftPreset() 
-            ])
-
-            my_eval = report.run(reference_df, current_df)
-
-            drift_detected = False
-            drift_share_value = 0.0 # Default value
-            
-            try:
-                report_data = my_eval.dict()
+            return S3Storage().download_file(
+                bucket_name=self.config.s3_bucket_name,
+                folder_path=self.config.s3_artifact_dir,
+                file_name=self.config.s3_drift_snapshot_name,
+                download_location=path
+            )
+        except Exception as e:
+            logger.warning(f"Could not fetch the online drift snapshot: {e}")
+            return None
 
-                # Find the DriftedColumnsCount metric
-                for metric in report_data.get('metrics', []):
-                    if metric.get('metric_id') == 'DriftedColumnsCount(drift_share=0.5)': # Match the exact metric_id
-                        drift_share_value = float(metric['value']['share']) # Extract the 'share' value
-                        break # Found the metric, no need to continue loop
+    def online_summary(self) -> Optional[dict]:
+        """
+        Drift scores of the live traffic from the snapshot the app publishes, without its histograms.
+        None when there is no snapshot (the app hasn't scored anything yet, or S3 is unreachable) or it can't be read.
+        """
+        if self.config.online_snapshot_path is None:
+            return None
+        path = self.download_online_snapshot()
+        if path is None:
+            return None
+        try:
+            snapshot = load_json(Path(path)).to_dict()
+            snapshot.pop("histograms", None)
+            logger.info(f"Online drift snapshot of {snapshot['rows']:.0f} rows from {path}: {snapshot['psi']}")
+        except Exception as e:
+            # The offline check stands on its own, an unreadable snapshot is only left out of the summary
+            logger.warning(f"Could not read the online drift snapshot {path}: {e}")
+            return None
+        return snapshot
+
+    def detect_dataset_drift(self) -> Tuple[str, str]:
+        """
+        Method Name :   detect_dataset_drift
+        Description :   Computes the drift share with the configured method and decides whether to retrain.
+                        The summary (drift share, its confidence interval, sampling and per-feature scores)
+                        is always written as a small JSON file; Evidently's HTML report only with
+                        `report_format: html`.
+
+        Output      :   (next task id, path of the report to log)
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            try:
+                if self.config.report_format not in REPORT_FORMATS:
+                    raise ValueError(f"Unknown report format '{self.config.report_format}', expected one of {REPORT_FORMATS}")
+                self.summary = {
+                    "method": self.config.method,
+                    "sampling": self.config.sampling if self.config.sample_size else None,
+                    "sample_size": self.config.sample_size,
+                    "bootstrap_rounds": self.config.bootstrap_rounds,
+                    "confidence": self.config.confidence,
+                }
+                if self.config.method == 'sketch':
+                    drift_share_value = self.sketch_drift_share()
+                elif self.config.method == 'evidently':
+                    drift_share_value = self.evidently_drift_share()
+                else:
+                    raise ValueError(f"Unknown drift method '{self.config.method}', expected sketch or evidently")
 
-                logger.info(f"Detected drifted columns share: {drift_share_value}")
+                interval = self.summary.get("drift_share_interval")
+                bounds = f" ({self.config.confidence:.0%} interval {interval[0]:.2%} - {interval[1]:.2%})" if interval else ""
+                logger.info(f"Detected drifted columns share: {drift_share_value}{bounds}")
 
-                if drift_share_value <= OVERALL_DRIFT_SHARE_THRESHOLD:
-                    logger.warning(f"Overall drift share ({drift_share_value:.2%}) exceeds threshold ({OVERALL_DRIFT_SHARE_THRESHOLD:.2%}). Triggering retraining.")
-                    drift_detected = True
+                drift_detected = drift_share_value > self.config.drift_share_threshold
+                if drift_detected:
+                    logger.warning(f"Overall drift share ({drift_share_value:.2%}) exceeds threshold ({self.config.drift_share_threshold:.2%}). Triggering retraining.")
                 else:
                     logger.info(f"Overall drift share ({drift_share_value:.2%}) is below threshold. No retraining needed.")
 
-                my_eval.save_html(os.path.join(self.config.dir_name, self.config.file_name))
-                
-                
+                self.summary["drift_detected"] = drift_detected
+                self.summary["online"] = self.online_summary()
+                os.makedirs(self.config.dir_name, exist_ok=True)
+                save_json(self.summary_path, self.summary)
 
             except Exception as e:
                 logger.error(f"Error processing drift report: {e}")
                 raise Exception(f"Error processing drift report: {e}")
 
+            report_path = self.summary.get("html_report") or str(self.summary_path)
             if drift_detected:
                 logger.info("Drift detected, retraining model.")
-                return "model_train", os.path.join(self.config.dir_name, self.config.file_name)
+                return "model_train", report_path
             else:
                 logger.info("No drift detected, no retraining needed.")
-                return "end_pipeline", os.path.join(self.config.dir_name, self.config.file_name)
-            
+                return "end_pipeline", report_path
+
         except Exception as e:
             logger.error(f"Error in detecting dataset drift: {e}")
             raise Exception(f"Error in detecting dataset drift: {e}")
-            
-    
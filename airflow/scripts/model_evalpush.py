@@ -2,7 +2,17 @@ from src.logger import logging as logger
 from src.entity.config_entity import ModelEvaluationConfig
 from src.entity.artifact_entity import ModelTrainingArtifact
 from src.cloud_storage.s3_storage import S3Storage
+from src.utils.common import save_json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
 import joblib
+import os
+import time
+
+# Every push goes to its own folder under s3_artifact_dir; the manifest next to them names the live one
+VERSIONS_DIR = "versions"
 
 class ModelEvalPush:
     def __init__(self, config: ModelEvaluationConfig):
@@ -16,32 +26,71 @@ class ModelEvalPush:
 
         return True
                 
-    def model_push(self, model_path: str):
+    def model_push(self, model_path: str, compiled_model_path: str = "", reference_sketch_path: str = ""):
+        """
+        Method Name :   model_push
+        Description :   Uploads the artifacts in parallel to a new version folder under `s3_artifact_dir`, then
+                        points the manifest at it. The manifest lists the ETag of every artifact of the version and
+                        is written last, so the app only ever sees a complete set and a failed push leaves the
+                        previous version in place.
+
+        Output      :   The pushed version
+        On Failure  :   Raise a RuntimeError naming the artifacts that couldn't be uploaded
+        """
         model = joblib.load(model_path)
         preprocessor = joblib.load(self.config.preprocessor_object_path)
         
         S3_BUCKET_NAME = self.config.s3_bucket_name
-        S3_FOLDER = self.config.s3_artifact_dir
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        S3_FOLDER = f"{self.config.s3_artifact_dir.rstrip('/')}/{VERSIONS_DIR}/{version}"
 
         MODEL_FILE_NAME = self.config.s3_model_name
         PREPROCESSOR_FILE_NAME = self.config.s3_preprocessor_name
 
-        print("\n--- Uploading Artifacts ---")
-        upload_model_success = self.store.upload_artifact(
-            obj=model,
-            bucket_name=S3_BUCKET_NAME,
-            folder_path=S3_FOLDER,
-            file_name=MODEL_FILE_NAME,
-            serializer='joblib'
-        )
+        jobs = {
+            MODEL_FILE_NAME: partial(self.store.upload_artifact, obj=model, serializer='joblib'),
+            PREPROCESSOR_FILE_NAME: partial(self.store.upload_artifact, obj=preprocessor, serializer='joblib'),
+        }
+        # Already serialized by the trainer, uploaded as-is
+        if compiled_model_path and os.path.exists(compiled_model_path):
+            jobs[self.config.s3_compiled_model_name] = partial(self.store.upload_file, file_path=compiled_model_path)
+        # Plain JSON, the app scores its live traffic against it
+        if reference_sketch_path and os.path.exists(reference_sketch_path):
+            jobs[self.config.s3_reference_sketch_name] = partial(self.store.upload_file, file_path=reference_sketch_path)
+
+        logger.info(f"Uploading {list(jobs)} to s3://{S3_BUCKET_NAME}/{S3_FOLDER}")
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = {
+                file_name: pool.submit(upload, bucket_name=S3_BUCKET_NAME, folder_path=S3_FOLDER, file_name=file_name)
+                for file_name, upload in jobs.items()
+            }
+            uploads = {file_name: future.result() for file_name, future in futures.items()}
+
+        failed = [file_name for file_name, success in uploads.items() if not success]
+        if failed:
+            raise RuntimeError(f"Failed to upload {failed} to s3://{S3_BUCKET_NAME}/{S3_FOLDER}, the manifest still points at the previous version")
+
+        etags = {file_name: self.store.object_etag(S3_BUCKET_NAME, S3_FOLDER, file_name) for file_name in uploads}
+        if None in etags.values():
+            raise RuntimeError(f"Could not read back the uploaded artifacts in s3://{S3_BUCKET_NAME}/{S3_FOLDER}")
 
-        upload_preprocessor_success = self.store.upload_artifact(
-            obj=preprocessor,
+        # Kept next to the model as a record of what was pushed
+        manifest_path = Path(os.path.dirname(model_path), self.config.s3_manifest_name)
+        save_json(manifest_path, {
+            "version": version,
+            "folder": S3_FOLDER,
+            "created_at": time.time(),
+            "artifacts": etags,
+        })
+        if not self.store.upload_file(
+            file_path=str(manifest_path),
             bucket_name=S3_BUCKET_NAME,
-            folder_path=S3_FOLDER,
-            file_name=PREPROCESSOR_FILE_NAME,
-            serializer='joblib'
-        )
+            folder_path=self.config.s3_artifact_dir,
+            file_name=self.config.s3_manifest_name
+        ):
+            raise RuntimeError(f"Failed to upload the manifest of version {version}, the app keeps serving the previous version")
+        logger.info(f"Pushed version {version} ({list(etags)}) to s3://{S3_BUCKET_NAME}/{S3_FOLDER}")
+        return version
 
 
     def initiate_model_eval_push(self, model_trainer_artifact):
@@ -50,7 +99,11 @@ class ModelEvalPush:
             # Logic to push the model to S3
             if self.model_eval(model_trainer_artifact):
                 logger.info("Model evaluation passed. Proceeding to push the model.")
-                self.model_push(model_trainer_artifact.trained_model_path,)
+                self.model_push(
+                    model_trainer_artifact.trained_model_path,
+                    model_trainer_artifact.compiled_model_path,
+                    model_trainer_artifact.reference_sketch_path,
+                )
 
             else:
                 logger.info("Model evaluation failed. Not pushing the model.")
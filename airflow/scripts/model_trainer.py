@@ -1,12 +1,45 @@
+import os
+import time
+import numpy as np
 import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
 import joblib
 from src.logger import logging
+from src.utils.common import TableWriter, load_json, load_table, save_json, table_files
+from src.constants import SAMPLE_WEIGHT_COLUMN, UPSAMPLED_COLUMN
 from src.entity.config_entity import ModelTrainingConfig
 from src.entity.artifact_entity import ModelTrainingArtifact
+from src.model.compiled_forest import CompiledForest
+from src.model.search import SuccessiveHalvingSearch, serving_cost, trials_to_dicts, within_budget
+from src.monitoring.sketch import ReferenceSketch
 
+# Written next to the model: which transformed files the forest was fitted on
+TRAINING_STATE_FILE_NAME = "training_state.json"
+# Every trial of the last hyperparameter search
+SEARCH_RESULTS_FILE_NAME = "search_results.json"
+# Candidates refitted on the whole training split, in search rank order, looking for one within the serving budget
+MAX_REFITS = 3
+
+
+def resolve_n_jobs(n_jobs: Optional[int]) -> int:
+    """None or 1: one, -1: every core."""
+    n_jobs = n_jobs or 1
+    return (os.cpu_count() or 1) if n_jobs == -1 else max(n_jobs, 1)
+
+
+def with_fraud_share(X: pd.DataFrame, y: pd.Series, fraud_share: float, seed: int = 42) -> pd.DataFrame:
+    """Rows of `X` with the fraud rows subsampled so they make up `fraud_share` of them, when there are more than that."""
+    fraud = np.flatnonzero(y.to_numpy() == 1)
+    if fraud_share >= 1.0:
+        return X
+    n_keep = min(len(fraud), round((len(y) - len(fraud)) * fraud_share / (1.0 - fraud_share)))
+    keep = np.ones(len(y), dtype=bool)
+    keep[np.random.default_rng(seed).choice(fraud, len(fraud) - n_keep, replace=False)] = False
+    return X[keep]
 
 class ModelTrainer:
     def __init__(self, config: ModelTrainingConfig):
@@ -16,7 +49,168 @@ class ModelTrainer:
         """
 
         self.config = config
-        
+        # Set by train(): whether the previous forest was grown rather than rebuilt or kept as is, and where the search trials went
+        self.grew_model = False
+        self.reused_model = False
+        # Trees fitted into the model over all its growths, dropped ones included; seeds the next growth
+        self.trees_grown = 0
+        self.search_results_path = ""
+
+    @property
+    def n_jobs(self) -> int:
+        """Threads the forest is fitted with, from the config's `n_jobs` (None or 1: one, -1: every core)."""
+        return resolve_n_jobs(self.config.n_jobs)
+
+    @property
+    def training_state_path(self) -> Path:
+        return Path(self.config.dir_name, TRAINING_STATE_FILE_NAME)
+
+    def batch_stats(self) -> Dict[str, List[int]]:
+        """Size and mtime of every transformed data file, a rewritten file (e.g. after a preprocessor refit) changes them."""
+        stats = {}
+        for path in table_files(self.config.training_data_path):
+            stat = os.stat(path)
+            stats[str(path)] = [stat.st_size, stat.st_mtime_ns]
+        return stats
+
+    def new_batches(self) -> Optional[List[str]]:
+        """
+        Method Name :   new_batches
+        Description :   In incremental mode, finds the transformed batch files the previous model hasn't been
+                        fitted on. The forest has to be rebuilt instead when there is no previous model or
+                        training state, or when a file it was fitted on has been rewritten or removed.
+
+        Output      :   The new batch files (empty when the previous model has seen them all), or None when
+                        the forest is to be rebuilt from all the data
+        """
+        if not self.config.incremental:
+            return None
+        if not (os.path.exists(self.config.trained_model_path) and os.path.exists(self.training_state_path)):
+            logging.info("No previous model to grow, training from scratch")
+            return None
+
+        state = load_json(self.training_state_path)
+        if "metrics" not in state:
+            logging.info("Training state predates recorded metrics, training from scratch")
+            return None
+        trained_on = state.batches
+        current = self.batch_stats()
+        changed = [path for path, stat in trained_on.items() if current.get(path) != list(stat)]
+        if changed:
+            logging.info(f"{len(changed)} files the previous model was fitted on were rewritten or removed, training from scratch")
+            return None
+
+        return [path for path in current if path not in trained_on]
+
+    def previous_model(self):
+        """
+        Method Name :   previous_model
+        Description :   Keeps the previous model, with the metrics recorded when it was trained, when there is
+                        no transformed data it hasn't seen.
+
+        Output      :   Same tuple as `train`
+        """
+        metrics = load_json(self.training_state_path).metrics
+        model = joblib.load(self.config.trained_model_path)
+        compiled_model_path = self.config.compiled_model_path.as_posix() if os.path.exists(self.config.compiled_model_path) else ""
+        self.reused_model = True
+        logging.info(f"No transformed data the previous model hasn't seen, keeping it ({len(model.estimators_)} trees)")
+        return model, metrics.accuracy, metrics.f1, metrics.precision, metrics.recall, compiled_model_path
+
+    def search(self, x_train: pd.DataFrame, y_train: pd.Series, w_train=None):
+        """
+        Method Name :   search
+        Description :   Successive-halving search of the forest parameters over a process pool. The candidates
+                        are fitted on part of the training split and ranked on the rest, by F1 among those
+                        within the serving latency and size budget.
+
+        Output      :   (parameters of every candidate, winner first, every trial)
+        """
+        search_config = self.config.search
+        x_fit, x_val, y_fit, y_val, *weights = train_test_split(
+            x_train, y_train,
+            *([w_train] if w_train is not None else []),
+            test_size=search_config.validation_ratio,
+            stratify=y_train,
+            random_state=42
+        )
+        search = SuccessiveHalvingSearch(
+            space=search_config.space,
+            strategy=search_config.strategy,
+            n_candidates=search_config.n_candidates,
+            factor=search_config.factor,
+            min_rows=search_config.min_rows,
+            max_latency_ms=search_config.max_latency_ms,
+            max_model_mb=search_config.max_model_mb,
+            latency_rows=search_config.latency_rows,
+            n_jobs=resolve_n_jobs(search_config.n_jobs),
+            seed=42,
+        )
+        started = time.perf_counter()
+        ranking, trials = search.run(
+            x_fit.to_numpy(), y_fit.to_numpy(), x_val.to_numpy(), y_val.to_numpy(),
+            weights[0].to_numpy() if weights else None
+        )
+        logging.info(f"Searched {len(search.candidates)} candidates in {len(trials)} trials in {time.perf_counter() - started:.1f}s, winner: {ranking[0]}")
+        return ranking, trials
+
+    def fit_searched(self, x_train: pd.DataFrame, y_train: pd.Series, x_check: pd.DataFrame, w_train=None) -> RandomForestClassifier:
+        """
+        Method Name :   fit_searched
+        Description :   Fits the search winner on the whole training split. The search only checked the budget on
+                        models fitted on part of it and a forest grows with its data, so the refit is measured
+                        again (compiled-forest latency on rows of x_check, pickled size). When it misses the budget
+                        the next candidates are refitted in rank order, up to MAX_REFITS in all, and the first that
+                        fits is kept; if none does, the winner is kept with a warning. The trials and the refits
+                        are saved to search_results.json.
+
+        Output      :   The fitted forest
+        """
+        search_config = self.config.search
+        ranking, trials = self.search(x_train, y_train, w_train)
+        X_latency = x_check.to_numpy()[:search_config.latency_rows]
+
+        refits, chosen = [], None
+        for params in ranking[:MAX_REFITS]:
+            model = RandomForestClassifier(random_state=42, n_jobs=self.n_jobs, **params)
+            model.fit(x_train, y_train, sample_weight=w_train)
+            latency_ms, model_mb = serving_cost(model, X_latency)
+            fits = within_budget(latency_ms, model_mb, search_config.max_latency_ms, search_config.max_model_mb)
+            refits.append({"params": params, "predict_latency_ms": latency_ms, "model_mb": model_mb, "within_budget": fits})
+            if chosen is None or fits:
+                chosen = (params, model)
+            if fits:
+                break
+            logging.warning(f"Refitted on {len(x_train)} rows, {params} misses the serving budget ({latency_ms:.2f}ms, {model_mb:.1f}MB)")
+        else:
+            logging.warning(f"None of the {len(refits)} best candidates fits the serving budget once refitted, keeping the winner {chosen[0]}")
+
+        self.search_results_path = Path(self.config.dir_name, SEARCH_RESULTS_FILE_NAME).as_posix()
+        save_json(Path(self.search_results_path), {
+            "winner": chosen[0],
+            "max_latency_ms": search_config.max_latency_ms,
+            "max_model_mb": search_config.max_model_mb,
+            "trials": trials_to_dicts(trials),
+            "refits": refits,
+        })
+        return chosen[1]
+
+    def grow(self, model: RandomForestClassifier, x_train: pd.DataFrame, y_train: pd.Series, w_train=None, seed: int = 42):
+        """
+        Adds `trees_per_increment` trees fitted on the new data to `model` by warm start. The oldest
+        trees are dropped first when the forest would otherwise exceed `max_estimators`, so it keeps
+        following the newest data. Warm start seeds the new trees with the draws that follow one per
+        existing tree, so after a drop a fixed `random_state` would hand them the seeds of trees still
+        in the forest; `seed` must differ between growths.
+        """
+        keep = self.config.max_estimators - self.config.trees_per_increment
+        if len(model.estimators_) > keep:
+            logging.info(f"Dropping the {len(model.estimators_) - keep} oldest trees to stay within {self.config.max_estimators}")
+            model.estimators_ = model.estimators_[len(model.estimators_) - keep:]
+
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + self.config.trees_per_increment, n_jobs=self.n_jobs, random_state=seed)
+        model.fit(x_train, y_train, sample_weight=w_train)
+
     def train(self):
         """
         Method Name :   get_model_object_and_report
@@ -28,31 +222,113 @@ class ModelTrainer:
         try:
             logging.info("Training triggered ")
             
-            df = pd.read_csv(self.config.training_data_path)
-            x_train, x_test, y_train, y_test = train_test_split(
+            model = None
+            batches = self.new_batches()
+            if batches == []:
+                return self.previous_model()
+            if batches:
+                df = pd.concat([load_table(path) for path in batches], ignore_index=True)
+                model = joblib.load(self.config.trained_model_path)
+                # New trees must see every class, or their outputs wouldn't line up with the old trees'
+                if not np.isin(model.classes_, df[self.config.target_column].unique()).all():
+                    logging.info(f"New data lacks some of the classes {model.classes_}, training from scratch")
+                    model = None
+                else:
+                    logging.info(f"Growing the previous model ({len(model.estimators_)} trees) on {len(df)} new rows from {len(batches)} files")
+            if model is None:
+                df = load_table(self.config.training_data_path)
+            self.grew_model = model is not None
+
+            # Present when the transform balanced the classes by weighting rather than upsampling
+            sample_weight = df.pop(SAMPLE_WEIGHT_COLUMN) if SAMPLE_WEIGHT_COLUMN in df.columns else None
+            # Present when it balanced them by upsampling: marks the added copies of fraud rows, which are trained on but not sketched
+            upsampled = df.pop(UPSAMPLED_COLUMN) if UPSAMPLED_COLUMN in df.columns else None
+
+            x_train, x_test, y_train, y_test, *weights = train_test_split(
                 df.drop(columns=[self.config.target_column]),
                 df[self.config.target_column],
+                *([sample_weight] if sample_weight is not None else []),
                 test_size=self.config.train_test_ratio,
                 random_state=42
             )
-            
-            model = RandomForestClassifier(max_depth=1200,n_estimators=120,random_state=42)
-            model.fit(x_train,y_train)
+            w_train = weights[0] if weights else None
+
+            started = time.perf_counter()
+            if self.grew_model:
+                state = load_json(self.training_state_path)
+                # States written before trees_grown was recorded: the trees in the forest are the best lower bound
+                trees_grown = state.get("trees_grown", state.n_estimators)
+                self.grow(model, x_train, y_train, w_train, seed=42 + trees_grown)
+                self.trees_grown = trees_grown + self.config.trees_per_increment
+            elif self.config.search:
+                model = self.fit_searched(x_train, y_train, x_test, w_train)
+            else:
+                model = RandomForestClassifier(random_state=42, n_jobs=self.n_jobs, max_depth=1200, n_estimators=self.config.n_estimators)
+                model.fit(x_train,y_train,sample_weight=w_train)
+            if not self.grew_model:
+                self.trees_grown = len(model.estimators_)
+            logging.info(f"Fitted {len(model.estimators_)} trees on {len(x_train)} rows with {self.n_jobs} threads in {time.perf_counter() - started:.1f}s")
+            # Saved without the training settings: serving parallelism is the app's executor's business
+            model.set_params(warm_start=False, n_jobs=None)
             
             y_pred = model.predict(x_test)
 
+            # Drift checks score new data (and the app its served predictions) against this summary of what the model was trained on.
+            # When the model was grown, that is the data its newest trees were fitted on. New data arrives with the raw class
+            # shares, so the upsampled fraud copies are left out (weighted data holds the original rows only).
+            reference = df
+            x_test_reference = x_test
+            if upsampled is not None:
+                original = (upsampled == 0).to_numpy()
+                reference = df[original]
+                # The test split holds a fifth of the majority rows but most distinct fraud rows, so those are subsampled too
+                test_original = (upsampled.loc[x_test.index] == 0).to_numpy()
+                fraud_share = float((df[self.config.target_column][original] == 1).mean())
+                x_test_reference = with_fraud_share(x_test[test_original], y_test[test_original], fraud_share)
+            ReferenceSketch.from_frame(
+                reference.drop(columns=[self.config.target_column]),
+                predictions=model.predict_proba(x_test_reference)[:, list(model.classes_).index(1)],
+            ).save(self.config.reference_sketch_path)
+            logging.info(f"Reference sketch saved to {self.config.reference_sketch_path}")
+            # The same rows, labels included, for the evidently drift method to compare the next data against
+            with TableWriter(self.config.reference_data_path) as writer:
+                writer.write(reference)
+            logging.info(f"Reference data ({len(reference)} rows) saved to {self.config.reference_data_path}")
+
             accuracy = accuracy_score(y_test, y_pred) 
             f1 = f1_score(y_test, y_pred)  
             precision = precision_score(y_test, y_pred)  
             recall = recall_score(y_test, y_pred)
+
+            compiled_model_path = self.export_compiled_model(model, x_test)
             
-            return model, accuracy, f1, precision, recall
+            return model, accuracy, f1, precision, recall, compiled_model_path
         
         except Exception as e:
             logging.error(f"Error in get_model_object_and_report: {e}")
             raise Exception(f"Error in get_model_object_and_report: {e}")
             
 
+    def export_compiled_model(self, model: RandomForestClassifier, x_check: pd.DataFrame) -> str:
+        """
+        Method Name :   export_compiled_model
+        Description :   Flattens the trained forest into a CompiledForest and saves it next to the sklearn model.
+                        The export is skipped when it does not reproduce the forest's predictions on x_check.
+        
+        Output      :   Returns the compiled model path, or an empty string if nothing was exported
+        """
+        compiled = CompiledForest.from_estimator(model)
+
+        X_check = x_check.to_numpy()
+        if not (np.array_equal(compiled.predict(X_check), model.predict(x_check))
+                and np.allclose(compiled.predict_proba(X_check), model.predict_proba(x_check))):
+            logging.warning("Compiled forest does not reproduce the trained model, skipping export")
+            return ""
+
+        compiled.save(self.config.compiled_model_path)
+        logging.info(f"Compiled forest with {compiled.n_estimators} trees saved to {self.config.compiled_model_path}")
+        return self.config.compiled_model_path.as_posix()
+
     def initiate_model_trainer(self, run_name: str, exp_id: str, exp_name: str) -> ModelTrainingArtifact:
         logging.info("Entered initiate_model_trainer method of ModelTrainer class")
         """
@@ -64,16 +340,33 @@ class ModelTrainer:
         """
         try:
             logging.info("Initiating model trainer process")
-            model, accuracy, f1, precision, recall = self.train()
+            model, accuracy, f1, precision, recall, compiled_model_path = self.train()
             logging.info(f"Model training completed with accuracy: {accuracy}, f1: {f1}, precision: {precision}, recall: {recall}")
 
-            joblib.dump(model, self.config.trained_model_path)
+            # A kept model is already on disk with its training state
+            if not self.reused_model:
+                joblib.dump(model, self.config.trained_model_path)
+                # Incremental runs grow this model on whatever isn't listed here, or keep it when that is nothing
+                save_json(self.training_state_path, {
+                    "created_at": time.time(),
+                    "incremental": self.grew_model,
+                    "n_estimators": len(model.estimators_),
+                    "trees_grown": self.trees_grown,
+                    "batches": self.batch_stats(),
+                    "metrics": {"accuracy": accuracy, "f1": f1, "precision": precision, "recall": recall},
+                })
 
             model_trainer_artifact = ModelTrainingArtifact(
                 trained_model_path=self.config.trained_model_path.as_posix(),
                 f1_score=f1,
                 precision_score=precision,
-                recall_score=recall
+                recall_score=recall,
+                compiled_model_path=compiled_model_path,
+                reference_sketch_path=self.config.reference_sketch_path.as_posix(),
+                n_estimators=len(model.estimators_),
+                incremental=self.grew_model,
+                search_results_path=self.search_results_path,
+                reused_model=self.reused_model
             )
             
             
@@ -1,20 +1,74 @@
 from fastapi import FastAPI, Request
-from src.entity.prediction_input import DataForm
-from src.cloud_storage.s3_storage import S3Storage
+from fastapi.responses import JSONResponse
+from src.entity.prediction_input import DataForm, BatchDataForm
 from src.configuration.config_manager import ConfigurationManager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
 from uvicorn import run as app_run
 from prometheus_fastapi_instrumentator import Instrumentator
-import os
-import joblib
-import pandas as pd
+from src.serving.model_registry import registry
+from src.serving.metrics import PREDICTION_STAGE_SECONDS
+from src.serving.predictor import label_to_status
+from src.serving.executor import InferenceExecutor
+from src.serving.micro_batcher import MicroBatcher
+from src.serving.artifact_sync import ArtifactSynchronizer
+from src.serving.drift_monitor import DriftMonitor
+from src.logger import logging as logger
+from contextlib import asynccontextmanager
+import asyncio
 import sys, pathlib
 
 sys.path.append(pathlib.Path(__file__).parent.absolute().as_posix())
 
 
-app = FastAPI()
+app_config = ConfigurationManager().get_app_config()
+
+synchronizer = ArtifactSynchronizer(ConfigurationManager().get_prediction_config(), registry)
+
+# Served features and predictions are scored against the model's reference sketch, see /metrics
+drift_monitor = DriftMonitor(
+    snapshot_path=app_config.drift_snapshot_path,
+    interval_seconds=app_config.drift_monitor_interval_seconds,
+    decay=app_config.drift_monitor_decay,
+    min_rows=app_config.drift_monitor_min_rows,
+    # Uploaded next to the model artifacts, where the offline drift check reads it
+    publish=synchronizer.upload_drift_snapshot,
+)
+
+# Preprocessing and prediction run on a worker pool so the event loop keeps serving
+executor = InferenceExecutor(
+    registry,
+    mode=app_config.executor_mode,
+    max_workers=app_config.executor_max_workers,
+    max_concurrency=app_config.executor_max_concurrency,
+    observer=drift_monitor.observe,
+)
+
+# Single-row form posts are coalesced into one preprocess + predict call per batch
+batcher = MicroBatcher(
+    predict_fn=executor.run,
+    max_batch_size=app_config.batch_max_size,
+    max_wait_ms=app_config.batch_max_wait_ms,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Artifacts are synced before the app starts serving so no request ever waits on S3
+    if not await asyncio.to_thread(synchronizer.sync):
+        logger.warning("No model could be loaded at startup, /ready will report not ready until one is.")
+    poller = asyncio.create_task(synchronizer.poll(app_config.artifact_poll_interval_seconds))
+    await executor.start()
+    await batcher.start()
+    await drift_monitor.start()
+    yield
+    await drift_monitor.stop()
+    await batcher.stop()
+    await executor.stop()
+    poller.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 Instrumentator().instrument(app).expose(app)
 
 templates = Jinja2Templates(directory='template')
@@ -31,69 +85,66 @@ app.add_middleware(
 
 @app.get("/", tags=["authentication"])
 def index(request: Request):
-    
-    store = S3Storage()
-    config = ConfigurationManager().get_prediction_config()
-    
-    S3_BUCKET_NAME = config.s3_bucket_name
-    S3_FOLDER = config.s3_artifact_dir
-
-    MODEL_FILE_NAME = config.s3_model_name
-    PREPROCESSOR_FILE_NAME = config.s3_preprocessor_name
-    download_location = config.download_location
-    
-    print("\n--- Downloading Artifacts ---")
-    if not pathlib.Path(os.path.join(download_location, MODEL_FILE_NAME)).exists():
-        model_path = store.download_artifact(
-            bucket_name=S3_BUCKET_NAME,
-            folder_path=S3_FOLDER,
-            file_name=MODEL_FILE_NAME,
-            serializer='joblib',
-            download_location=os.path.join(download_location, MODEL_FILE_NAME)
-        )
-
-    if not pathlib.Path(os.path.join(download_location, PREPROCESSOR_FILE_NAME)).exists():
-        pre_path = store.download_artifact(
-            bucket_name=S3_BUCKET_NAME,
-            folder_path=S3_FOLDER,
-            file_name=PREPROCESSOR_FILE_NAME,
-            serializer='joblib',
-            download_location=os.path.join(download_location, PREPROCESSOR_FILE_NAME)
-        )
-
     return templates.TemplateResponse(
             "form.html",{"request": request, "context": "Rendering"})
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once a model is loaded in the registry, 503 before that."""
+    if not registry.is_loaded:
+        return JSONResponse(status_code=503, content={"status": False, "model_version": None})
+    return {"status": True, "model_version": registry.version}
     
+
 @app.post("/")
 async def predict(request: Request):
     try:
         form = DataForm(request)
         
-        input_df = await form.get_usvisa_input_data_frame()
-        config = ConfigurationManager().get_prediction_config()
-        
-        model = joblib.load(os.path.join(config.download_location, config.s3_model_name))
-        preprocessor = joblib.load(os.path.join(config.download_location, config.s3_preprocessor_name))
+        with PREDICTION_STAGE_SECONDS.labels("form_parse").time():
+            record = await form.get_record()
+        labels, _ = await batcher.submit([record])
+        status = label_to_status(labels[0])
 
-        X_processed = preprocessor.fit_transform(input_df)
-            
-        X_processed_df = pd.DataFrame(X_processed, columns=preprocessor.named_steps['date_age_extractor'].features)
-
-        value = model.predict(X_processed_df)[0]
-        
-        status = None
-        if value == 1:
-            status = "Fraud"
-        else:
-            status = "Not Fraud"
-
-        return templates.TemplateResponse(
-            "form.html",
-            {"request": request, "context": status},
-        )
+        # The template is rendered when the response is built
+        with PREDICTION_STAGE_SECONDS.labels("render").time():
+            response = templates.TemplateResponse(
+                "form.html",
+                {"request": request, "context": status},
+            )
+        return response
         
     except Exception as e:
         return {"status": False, "error": f"{e}"}
-    
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """
+    Scores a JSON array or NDJSON body of transactions in one vectorized call.
+    Each record needs trans_date_trans_time, dob, amt, city_pop and merch_long.
+    """
+    try:
+        form = BatchDataForm(request)
+        with PREDICTION_STAGE_SECONDS.labels("form_parse").time():
+            records = await form.get_records()
+
+        loaded = registry.get()
+        labels, fraud_proba = await executor.run(records, loaded)
+
+        with PREDICTION_STAGE_SECONDS.labels("render").time():
+            predictions = [
+                {"is_fraud": int(label), "status": label_to_status(label), "fraud_probability": float(proba)}
+                for label, proba in zip(labels, fraud_proba)
+            ]
+        return {"status": True, "model_version": loaded.version, "predictions": predictions}
+
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": False, "error": f"{e}"})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"status": False, "error": f"{e}"})
+
+
 if __name__ == "__main__":
     app_run(app, host="0.0.0.0", port="8000", reload=True)
\ No newline at end of file
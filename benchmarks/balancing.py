@@ -0,0 +1,123 @@
+"""
+Compares the two class balancing modes of DataTransformation (`upsample`, `weight`).
+
+A stratified holdout is split off the raw csv first. Each mode then runs the
+real transform and ModelTrainer on the remaining rows, and the resulting model
+and preprocessor are scored on the untouched holdout. The trainer's own test F1
+is reported too, but under upsampling its test split shares duplicated fraud
+rows with the training split, so the holdout F1 is the one to compare.
+
+Run from the repository root:
+
+    python -m benchmarks.balancing
+    python -m benchmarks.balancing --data artifacts/data_ingestion/fraud_data.csv --output balancing.json
+"""
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import pandas as pd
+from sklearn.metrics import f1_score, precision_score, recall_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "airflow"))
+
+from scripts.data_transform import DataTransformation
+from scripts.model_trainer import ModelTrainer
+from src.configuration.config_manager import ConfigurationManager
+from src.entity.artifact_entity import DataIngestionArtifact
+from src.utils.common import load_table
+
+BALANCING_MODES = ("upsample", "weight")
+
+
+def run_mode(mode: str, train_csv: str, holdout: pd.DataFrame, workdir: str) -> dict:
+    manager = ConfigurationManager()
+    mode_dir = os.path.join(workdir, mode)
+    transformation_config = dataclasses.replace(
+        manager.get_data_transformation_config(),
+        balancing=mode,
+        transformed_data_dir=Path(mode_dir),
+        preprocess_pipeline_object_dir=Path(mode_dir),
+    )
+
+    started = time.perf_counter()
+    transformed = DataTransformation(transformation_config).transform_data(DataIngestionArtifact(train_csv, True))
+    transform_seconds = time.perf_counter() - started
+    if not transformed.status:
+        raise RuntimeError(f"Transform failed in {mode} mode, see the logs")
+
+    training_config = dataclasses.replace(
+        manager.get_training_config(),
+        training_data_path=Path(transformed.transformed_file_path),
+        trained_model_path=Path(mode_dir, "model.jbl"),
+        compiled_model_path=Path(mode_dir, "compiled_model.jbl"),
+        reference_sketch_path=Path(mode_dir, "reference_sketch.json"),
+        reference_data_path=Path(mode_dir, "reference_data").with_suffix(Path(transformed.transformed_file_path).suffix),
+    )
+    started = time.perf_counter()
+    model, _, test_f1, _, _, _ = ModelTrainer(training_config).train()
+    train_seconds = time.perf_counter() - started
+
+    preprocessor = joblib.load(transformed.transformed_object_file_path)
+    features = preprocessor.named_steps["date_age_extractor"].features
+    X_holdout = pd.DataFrame(preprocessor.transform(holdout.drop(columns=["is_fraud"])), columns=features)
+    y_pred = model.predict(X_holdout)
+
+    return {
+        "transform_seconds": transform_seconds,
+        "transformed_rows": len(load_table(transformed.transformed_file_path, columns=["is_fraud"])),
+        "file_bytes": os.path.getsize(transformed.transformed_file_path),
+        "train_seconds": train_seconds,
+        "trainer_test_f1": test_f1,
+        "holdout_f1": f1_score(holdout["is_fraud"], y_pred),
+        "holdout_precision": precision_score(holdout["is_fraud"], y_pred),
+        "holdout_recall": recall_score(holdout["is_fraud"], y_pred),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare upsampling and weight-based class balancing.")
+    parser.add_argument("--data", default="notebooks/data/fraud_data.csv", help="Raw transactions csv.")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of rows held out for scoring.")
+    parser.add_argument("--output", default=None, help="Optional path to write the results as JSON.")
+    args = parser.parse_args(argv)
+
+    raw = pd.read_csv(args.data)
+    raw["is_fraud"] = raw["is_fraud"].apply(lambda x: int(str(x).split('"')[0]))
+    train, holdout = train_test_split(raw, test_size=args.holdout, stratify=raw["is_fraud"], random_state=42)
+
+    results = {"rows": len(train), "holdout_rows": len(holdout)}
+    with tempfile.TemporaryDirectory(prefix="balancing_") as workdir:
+        train_csv = os.path.join(workdir, "train.csv")
+        train.to_csv(train_csv, index=False)
+        for mode in BALANCING_MODES:
+            results[mode] = run_mode(mode, train_csv, holdout, workdir)
+
+    print(f"{results['rows']} training rows, {results['holdout_rows']} holdout rows")
+    print(f"{'mode':<10}{'rows':>9}{'file KB':>10}{'transform s':>13}{'train s':>9}{'test F1':>9}{'holdout F1':>12}{'P':>7}{'R':>7}")
+    for mode in BALANCING_MODES:
+        r = results[mode]
+        print(
+            f"{mode:<10}{r['transformed_rows']:>9}{r['file_bytes'] / 1024:>10.0f}{r['transform_seconds']:>13.2f}"
+            f"{r['train_seconds']:>9.2f}{r['trainer_test_f1']:>9.3f}{r['holdout_f1']:>12.3f}"
+            f"{r['holdout_precision']:>7.3f}{r['holdout_recall']:>7.3f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
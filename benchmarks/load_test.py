@@ -0,0 +1,301 @@
+"""
+In-process load benchmark for the FastAPI prediction service.
+
+Drives `app.app` through httpx's ASGI transport (no network, no uvicorn) with
+synthetic transactions, against model artifacts trained on synthetic data
+and served from a moto S3 stand-in, so no AWS account is needed.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --requests 500
+    python -m benchmarks.load_test --baseline benchmarks/results/before.json
+
+Results are written as JSON. With --baseline, scenarios whose throughput or
+tail latency regressed beyond --tolerance are reported and the exit status
+is 1.
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+sys.path.append(os.getcwd())
+
+from benchmarks.synthetic import TransactionGenerator
+from src.configuration.config_manager import ConfigurationManager
+from src.feature_transform.date_age import DateAgeFeatureExtractor
+from src.model.compiled_forest import CompiledForest
+
+ENDPOINTS = ("form", "batch", "ndjson")
+# Distinct request bodies generated up front and cycled through, so generation isn't timed
+PAYLOAD_POOL_SIZE = 512
+WARMUP_REQUESTS = 20
+
+
+@dataclasses.dataclass
+class Scenario:
+    endpoint: str
+    concurrency: int
+    requests: int
+    rows_per_request: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.endpoint}/c{self.concurrency}/r{self.rows_per_request}"
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size of this process, where /proc is available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def build_artifacts(directory: str, n_rows: int, n_estimators: int, seed: int) -> Dict[str, str]:
+    """
+    Trains the preprocessor and forest the training DAG produces, on synthetic
+    transactions, and saves them under the object names the app downloads.
+
+    Returns:
+        Dict[str, str]: S3 object name -> local path.
+    """
+    config = ConfigurationManager().get_prediction_config()
+    df = TransactionGenerator(seed).frame(n_rows)
+
+    preprocessor = Pipeline([("date_age_extractor", DateAgeFeatureExtractor()), ("scaler", StandardScaler())])
+    X = preprocessor.fit_transform(df.drop(columns=["is_fraud"]))
+    X = pd.DataFrame(X, columns=preprocessor.named_steps["date_age_extractor"].features)
+    model = RandomForestClassifier(max_depth=1200, n_estimators=n_estimators, random_state=seed).fit(X, df["is_fraud"])
+
+    paths = {name: os.path.join(directory, name) for name in (config.s3_model_name, config.s3_preprocessor_name, config.s3_compiled_model_name)}
+    joblib.dump(model, paths[config.s3_model_name])
+    joblib.dump(preprocessor, paths[config.s3_preprocessor_name])
+    CompiledForest.from_estimator(model).save(paths[config.s3_compiled_model_name])
+    return paths
+
+
+def make_payloads(endpoint: str, rows_per_request: int, seed: int) -> List[dict]:
+    generator = TransactionGenerator(seed)
+    if endpoint == "form":
+        return [{"data": fields} for fields in generator.form_fields(PAYLOAD_POOL_SIZE)]
+
+    payloads = []
+    for _ in range(PAYLOAD_POOL_SIZE):
+        records = generator.records(rows_per_request)
+        if endpoint == "batch":
+            payloads.append({"json": records})
+        else:
+            body = "\n".join(json.dumps(record) for record in records)
+            payloads.append({"content": body.encode(), "headers": {"content-type": "application/x-ndjson"}})
+    return payloads
+
+
+async def send(client, endpoint: str, payload: dict) -> bool:
+    if endpoint == "form":
+        response = await client.post("/", **payload)
+        # Failed form posts come back as a 200 JSON error instead of the rendered page
+        return response.status_code == 200 and response.headers.get("content-type", "").startswith("text/html")
+
+    response = await client.post("/predict/batch", **payload)
+    return response.status_code == 200
+
+
+async def run_scenario(client, scenario: Scenario, payloads: List[dict]) -> dict:
+    """Sends `scenario.requests` requests with at most `scenario.concurrency` in flight and summarizes them."""
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+    request_ids = iter(range(scenario.requests))
+
+    async def worker():
+        # All workers draw from the same iterator, so exactly `requests` are sent
+        for i in request_ids:
+            started = time.perf_counter()
+            try:
+                ok = await send(client, scenario.endpoint, payloads[i % len(payloads)])
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            outcomes["ok" if ok else "error"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(scenario.concurrency)])
+    duration = time.perf_counter() - started
+
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "key": scenario.key,
+        **dataclasses.asdict(scenario),
+        "errors": outcomes["error"],
+        "duration_seconds": duration,
+        "requests_per_second": scenario.requests / duration,
+        "rows_per_second": scenario.requests * scenario.rows_per_request / duration,
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(latencies_ms.max()),
+        },
+        "rss_mb": rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run_all(app_module, scenarios: List[Scenario], seed: int) -> List[dict]:
+    import httpx
+
+    results = []
+    # ASGITransport doesn't send lifespan events, so start the app's lifespan (sync, pools, batcher) here
+    async with app_module.lifespan(app_module.app):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for scenario in scenarios:
+                payloads = make_payloads(scenario.endpoint, scenario.rows_per_request, seed)
+                await run_scenario(client, dataclasses.replace(scenario, requests=WARMUP_REQUESTS), payloads)
+
+                result = await run_scenario(client, scenario, payloads)
+                results.append(result)
+                print(
+                    f"{result['key']:<22} {result['requests_per_second']:>9.1f} req/s "
+                    f"{result['rows_per_second']:>10.1f} rows/s  "
+                    f"p50 {result['latency_ms']['p50']:>8.2f}ms  p95 {result['latency_ms']['p95']:>8.2f}ms  "
+                    f"p99 {result['latency_ms']['p99']:>8.2f}ms  errors {result['errors']}  rss {result['rss_mb'] or 0:.0f}MB"
+                )
+    return results
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """Lists the scenarios that got slower than `baseline` by more than `tolerance` (a fraction)."""
+    previous = {result["key"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["key"])
+        if before is None:
+            continue
+        if result["requests_per_second"] < before["requests_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{result['key']}: throughput {before['requests_per_second']:.1f} -> {result['requests_per_second']:.1f} req/s"
+            )
+        for percentile in ("p95", "p99"):
+            if result["latency_ms"][percentile] > before["latency_ms"][percentile] * (1 + tolerance):
+                regressions.append(
+                    f"{result['key']}: {percentile} {before['latency_ms'][percentile]:.2f} -> {result['latency_ms'][percentile]:.2f} ms"
+                )
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{result['key']}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="In-process load benchmark for the prediction service.")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"Comma separated subset of {ENDPOINTS}.")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario.")
+    parser.add_argument("--batch-rows", default="100", help="Comma separated rows per batch request.")
+    parser.add_argument("--train-rows", type=int, default=14446, help="Synthetic rows to train the benchmark model on.")
+    parser.add_argument("--n-estimators", type=int, default=120, help="Trees in the benchmark model.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Where to write the JSON results.")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed regression against the baseline, as a fraction.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    endpoints = [endpoint for endpoint in args.endpoints.split(",") if endpoint]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints {sorted(unknown)}, expected a subset of {ENDPOINTS}")
+
+    scenarios = [
+        Scenario(endpoint, int(concurrency), args.requests, 1 if endpoint == "form" else int(rows))
+        for endpoint in endpoints
+        for rows in (["1"] if endpoint == "form" else args.batch_rows.split(","))
+        for concurrency in args.concurrency.split(",")
+    ]
+
+    try:
+        import boto3
+        from moto import mock_aws
+    except ImportError as e:
+        raise SystemExit(f"{e}. Install the benchmark requirements: pip install -r benchmarks/requirements.txt")
+
+    # Never let the benchmark reach a real AWS account
+    os.environ.update(AWS_ACCESS_KEY_ID="benchmark", AWS_SECRET_ACCESS_KEY="benchmark", AWS_DEFAULT_REGION="us-east-1")
+    prediction_config = ConfigurationManager().get_prediction_config()
+
+    with tempfile.TemporaryDirectory(prefix="load_test_") as workdir, mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket=prediction_config.s3_bucket_name)
+        started = time.perf_counter()
+        for name, path in build_artifacts(workdir, args.train_rows, args.n_estimators, args.seed).items():
+            s3.upload_file(path, prediction_config.s3_bucket_name, f"{prediction_config.s3_artifact_dir}/{name}")
+        print(f"Benchmark model trained and uploaded in {time.perf_counter() - started:.1f}s")
+
+        import app as app_module
+
+        # Download into the scratch directory rather than over the real deploy/ artifacts
+        app_module.synchronizer.config = dataclasses.replace(
+            prediction_config, download_location=os.path.join(workdir, "deploy")
+        )
+        results = asyncio.run(run_all(app_module, scenarios, args.seed))
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "app_config": dataclasses.asdict(app_module.app_config),
+        "compiled_model_max_rows": prediction_config.compiled_model_max_rows,
+        "n_estimators": args.n_estimators,
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"load_test_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# Marginals measured on notebooks/data/fraud_data.csv (14,446 transactions)
+FRAUD_RATE = 0.128
+LOG_AMT = {0: (3.44, 1.37), 1: (5.51, 1.65)}  # (mean, std) of log(amt) per class
+AMT_RANGE = (1.0, 3261.47)
+LOG_CITY_POP = (8.24, 2.80)
+CITY_POP_RANGE = (46, 2383912)
+MERCH_LONG_RANGE = (-166.670685, -88.646366)
+TRANS_DATE_RANGE = (datetime(2019, 1, 1), datetime(2020, 12, 31, 23, 59))
+DOB_RANGE = (datetime(1927, 9, 9), datetime(2001, 7, 26))
+
+# The csv writes dates day first, e.g. "04-01-2019 00:58" and "09-11-1939"
+TRANS_DATE_FORMAT = "%d-%m-%Y %H:%M"
+DOB_FORMAT = "%d-%m-%Y"
+
+
+class TransactionGenerator:
+    """
+    Generates transactions shaped like `notebooks/data/fraud_data.csv`.
+
+    Only the columns the serving pipeline reads are produced, drawn from the
+    marginal distributions of the real dataset: log-normal amounts (fraudulent
+    ones markedly larger), log-normal city populations, merchant longitudes in
+    the dataset's range and day-first date strings. Output is reproducible for a
+    given seed.
+    """
+
+    def __init__(self, seed: int = 42):
+        self.rng = np.random.default_rng(seed)
+
+    def _dates(self, start: datetime, end: datetime, n: int, date_format: str) -> List[str]:
+        minutes = self.rng.integers(0, int((end - start).total_seconds() // 60), size=n)
+        return [(start + timedelta(minutes=int(m))).strftime(date_format) for m in minutes]
+
+    def frame(self, n: int) -> pd.DataFrame:
+        """Returns `n` labelled transactions, with `is_fraud` as 0/1."""
+        is_fraud = (self.rng.random(n) < FRAUD_RATE).astype(int)
+
+        log_amt = np.where(
+            is_fraud == 1,
+            self.rng.normal(*LOG_AMT[1], size=n),
+            self.rng.normal(*LOG_AMT[0], size=n),
+        )
+        amt = np.clip(np.exp(log_amt), *AMT_RANGE).round(2)
+        city_pop = np.clip(np.exp(self.rng.normal(*LOG_CITY_POP, size=n)), *CITY_POP_RANGE).astype(int)
+        merch_long = self.rng.uniform(*MERCH_LONG_RANGE, size=n).round(6)
+
+        return pd.DataFrame({
+            "trans_date_trans_time": self._dates(*TRANS_DATE_RANGE, n, TRANS_DATE_FORMAT),
+            "amt": amt,
+            "city_pop": city_pop,
+            "dob": self._dates(*DOB_RANGE, n, DOB_FORMAT),
+            "merch_long": merch_long,
+            "is_fraud": is_fraud,
+        })
+
+    def records(self, n: int) -> List[dict]:
+        """Returns `n` unlabelled transactions as JSON-ready dicts, as a client would send them."""
+        return self.frame(n).drop(columns=["is_fraud"]).to_dict(orient="records")
+
+    def form_fields(self, n: int) -> List[dict]:
+        """Returns `n` transactions as string-valued form fields, as the HTML form posts them."""
+        return [{key: str(value) for key, value in record.items()} for record in self.records(n)]
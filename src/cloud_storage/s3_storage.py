@@ -1,13 +1,19 @@
 import boto3
 import os
 import logging
+import hashlib
+import tempfile
+import time
 import joblib # Recommended for scikit-learn models/preprocessors
 import pickle # Alternative for general Python objects if joblib isn't suitable
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import NoCredentialsError, ClientError
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from src.logger import logging as logger   
 import io
 
+ETAG_SUFFIX = ".etag"
+MB = 1024 * 1024
 
 
 class S3Storage:
@@ -17,14 +23,38 @@ class S3Storage:
     environment variables (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_DEFAULT_REGION).
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        s3_client=None,
+        multipart_threshold: int = 64 * MB,
+        multipart_chunksize: int = 16 * MB,
+        max_concurrency: int = 8,
+        on_download: Optional[Callable[[str, int, float], None]] = None
+    ):
         """
         Initializes the S3 client.
         Expects AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, and AWS_DEFAULT_REGION
         to be set as environment variables, or configured via AWS CLI/IAM roles.
+
+        Args:
+            s3_client (optional): An existing boto3 S3 client, e.g. one pointed at a local S3 stand-in.
+            multipart_threshold (int): Objects larger than this are downloaded with parallel ranged GETs.
+            multipart_chunksize (int): Size of each ranged GET.
+            max_concurrency (int): Number of ranged GETs in flight at once.
+            on_download (callable, optional): Called as `on_download(file_name, size_bytes, seconds)`
+                after every object actually transferred, e.g. to record metrics.
         """
+        self.on_download = on_download
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency
+        )
         try:
-            self.s3_client = boto3.client('s3')
+            self.s3_client = s3_client if s3_client is not None else boto3.client('s3')
+            # ETag each in-flight download must match, keyed by (bucket, key)
+            self._expected_etags = {}
+            self.s3_client.meta.events.register('before-parameter-build.s3.GetObject', self._add_if_match)
 
             logger.info("S3 client initialized successfully.")
         except NoCredentialsError:
@@ -36,6 +66,12 @@ class S3Storage:
             logger.error(f"Failed to initialize S3 client: {e}")
             raise
 
+    def _add_if_match(self, params: dict, **kwargs):
+        """Makes every GET of a download (one per range for large objects) conditional on the ETag its HEAD saw."""
+        etag = self._expected_etags.get((params.get('Bucket'), params.get('Key')))
+        if etag is not None:
+            params.setdefault('IfMatch', etag)
+
     def _get_s3_object_key(self, folder_path: str, file_name: str) -> str:
         """Helper to construct the full S3 object key."""
         if folder_path and not folder_path.endswith('/'):
@@ -79,6 +115,58 @@ class S3Storage:
             logger.error(f"An unexpected error occurred during upload: {e}")
             return False
 
+    def upload_file(
+        self,
+        file_path: str,
+        bucket_name: str,
+        folder_path: str,
+        file_name: str
+    ) -> bool:
+        """
+        Uploads a file from disk unchanged, e.g. a JSON artifact the serving side reads without unpickling.
+
+        Args:
+            file_path (str): Local path of the file to upload.
+            bucket_name (str): The name of the S3 bucket.
+            folder_path (str): The path to the folder within the bucket (e.g., "models/").
+            file_name (str): The name to store the file under.
+
+        Returns:
+            bool: True if the upload was successful, False otherwise.
+        """
+        s3_object_key = self._get_s3_object_key(folder_path, file_name)
+        logger.info(f"Attempting to upload '{file_path}' to s3://{bucket_name}/{s3_object_key}")
+
+        try:
+            self.s3_client.upload_file(file_path, bucket_name, s3_object_key, Config=self.transfer_config)
+            logger.info(f"Successfully uploaded '{file_name}' to s3://{bucket_name}/{s3_object_key}")
+            return True
+        except ClientError as e:
+            logger.error(f"S3 ClientError during upload: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during upload: {e}")
+            return False
+
+    def object_etag(self, bucket_name: str, folder_path: str, file_name: str) -> Optional[str]:
+        """
+        Returns the ETag of an S3 object, e.g. to record which version of it was uploaded.
+
+        Args:
+            bucket_name (str): The name of the S3 bucket.
+            folder_path (str): The path to the folder within the bucket (e.g., "models/").
+            file_name (str): The name of the object.
+
+        Returns:
+            str: The ETag without quotes, or None if the object can't be read.
+        """
+        s3_object_key = self._get_s3_object_key(folder_path, file_name)
+        try:
+            return self.s3_client.head_object(Bucket=bucket_name, Key=s3_object_key)['ETag'].strip('"')
+        except ClientError as e:
+            logger.error(f"S3 ClientError reading the ETag of s3://{bucket_name}/{s3_object_key}: {e}")
+            return None
+
     def download_artifact(
         self,
         bucket_name: str,
@@ -86,47 +174,124 @@ class S3Storage:
         file_name: str,
         download_location: str,
         serializer: str = 'joblib'
-    ) -> Optional[Any]:
+    ) -> Optional[str]:
         """
-        Downloads and deserializes a Python object from a specified folder in an S3 bucket.
+        Downloads a serialized object from a specified folder in an S3 bucket to disk.
+
+        The object is streamed to disk as-is, it is not deserialized here; see
+        `download_file`.
 
         Args:
             bucket_name (str): The name of the S3 bucket.
             folder_path (str): The path to the folder within the bucket (e.g., "models/").
             file_name (str): The name of the file to download (e.g., "model.pkl").
-            serializer (str): The deserialization method ('joblib' or 'pickle'). Defaults to 'joblib'.
+            download_location (str): Local path to write the object to.
+            serializer (str): Kept for backwards compatibility, the bytes are written unchanged.
 
         Returns:
-            Any: The deserialized Python object, or None if download/deserialization failed.
+            str: The local path of the artifact, or None if the download failed.
+        """
+        return self.download_file(bucket_name, folder_path, file_name, download_location)
+
+    def download_file(
+        self,
+        bucket_name: str,
+        folder_path: str,
+        file_name: str,
+        download_location: str
+    ) -> Optional[str]:
+        """
+        Streams an S3 object to `download_location`, skipping the transfer when the local copy is current.
+
+        The remote ETag and size are read with `head_object` first. If the local file
+        matches them nothing is downloaded. Otherwise the object is written to a
+        temporary file next to `download_location` (large objects are fetched with
+        parallel ranged GETs) and atomically renamed into place, so readers never
+        see a partial file. Every GET carries `If-Match` with the ETag from the HEAD,
+        so an object overwritten mid-transfer fails the download instead of pairing
+        new bytes with the old ETag. The ETag is kept in a `.etag` sidecar file for
+        the next check.
+
+        Args:
+            bucket_name (str): The name of the S3 bucket.
+            folder_path (str): The path to the folder within the bucket (e.g., "models/").
+            file_name (str): The name of the file to download (e.g., "model.pkl").
+            download_location (str): Local path to write the object to.
+
+        Returns:
+            str: The local path of the artifact, or None if the download failed.
         """
         s3_object_key = self._get_s3_object_key(folder_path, file_name)
-        logger.info(f"Attempting to download '{file_name}' from s3://{bucket_name}/{s3_object_key}")
 
         try:
-            response = self.s3_client.get_object(Bucket=bucket_name, Key=s3_object_key)
-            downloaded_bytes = response['Body'].read()
-            # Create a new BytesIO buffer from bytes
-            buffer_from_bytes = io.BytesIO(downloaded_bytes)
-            logger.info(f"Successfully downloaded '{file_name}'.")
-            print("*"*40 , f"trying to load {file_name}")
-            try: 
-                loaded_object = joblib.load(buffer_from_bytes)
-            except Exception as e:
-                print(e, "exception happend hhhhhh")
-            print("*"*40 , loaded_object, f"this should be the loaded object {file_name}")
-            
-            logger.info(f"Successfully deserialized '{file_name}'.")
-            
-            joblib.dump(loaded_object, download_location)
-            
+            head = self.s3_client.head_object(Bucket=bucket_name, Key=s3_object_key)
+            etag = head['ETag'].strip('"')
+            etag_path = download_location + ETAG_SUFFIX
+            size = head['ContentLength']
+
+            if self._is_local_copy_current(download_location, etag, size):
+                logger.info(f"Local copy of s3://{bucket_name}/{s3_object_key} is up to date, skipping download.")
+                return download_location
+
+            logger.info(f"Downloading s3://{bucket_name}/{s3_object_key} ({size} bytes) to {download_location}")
+            directory = os.path.dirname(os.path.abspath(download_location))
+            os.makedirs(directory, exist_ok=True)
+
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(download_location)}.")
+            os.close(fd)
+            started = time.perf_counter()
+            self._expected_etags[(bucket_name, s3_object_key)] = head['ETag']
+            try:
+                self.s3_client.download_file(bucket_name, s3_object_key, tmp_path, Config=self.transfer_config)
+                # Drop the old sidecar first, a crash before the new one is written then falls back to the MD5 check
+                if os.path.exists(etag_path):
+                    os.remove(etag_path)
+                os.replace(tmp_path, download_location)
+            finally:
+                self._expected_etags.pop((bucket_name, s3_object_key), None)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            with open(etag_path, 'w') as f:
+                f.write(etag)
+
+            if self.on_download is not None:
+                self.on_download(file_name, size, time.perf_counter() - started)
+
+            logger.info(f"Successfully downloaded '{file_name}' to {download_location}.")
             return download_location
         except ClientError as e:
-            if e.response['Error']['Code'] == 'NoSuchKey':
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
                 logger.error(f"Object not found: s3://{bucket_name}/{s3_object_key}")
+            elif e.response['Error']['Code'] in ('PreconditionFailed', '412'):
+                logger.error(f"s3://{bucket_name}/{s3_object_key} changed during the download, keeping the local copy")
             else:
                 logger.error(f"S3 ClientError during download: {e}")
             return None
         except Exception as e:
-            logger.error(f"An unexpected error occurred during download/deserialization: {e}")
+            logger.error(f"An unexpected error occurred during download: {e}")
+            return None
+
+    @staticmethod
+    def local_etag(download_location: str) -> Optional[str]:
+        """Returns the ETag recorded when `download_location` was last downloaded, if any."""
+        try:
+            with open(download_location + ETAG_SUFFIX) as f:
+                return f.read().strip()
+        except FileNotFoundError:
             return None
 
+    def _is_local_copy_current(self, download_location: str, etag: str, size: int) -> bool:
+        if not os.path.exists(download_location) or os.path.getsize(download_location) != size:
+            return False
+
+        recorded_etag = self.local_etag(download_location)
+        if recorded_etag is not None:
+            return recorded_etag == etag
+
+        # Single-part uploads (put_object) have the MD5 of the content as their ETag
+        if '-' not in etag:
+            with open(download_location, 'rb') as f:
+                return hashlib.file_digest(f, lambda: hashlib.md5(usedforsecurity=False)).hexdigest() == etag
+
+        return False
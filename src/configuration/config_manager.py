@@ -1,80 +1,237 @@
 import os
+import hashlib
+import threading
+from functools import wraps
+from typing import Optional
+from box import ConfigBox
 from src.constants import *
-from src.utils.common import read_yaml, create_directories
+from src.utils.common import read_yaml, create_directories, table_path
 from src.entity.config_entity import (DataIngestionConfig, DataTransformationConfig,
                                                        ModelTrainingConfig,
+                                                       ModelSearchConfig,
                                                        DataDriftConfig,
                                                        ModelEvaluationConfig,
-                                                       PredictionConfig
+                                                       PredictionConfig,
+                                                       AppConfig
                                                        )
-                                                
+
+
+class _ParsedConfig:
+    """One parse of the config file plus the config objects built from it."""
+    def __init__(self, config: ConfigBox, stat_key: tuple, digest: str):
+        self.config = config
+        self.stat_key = stat_key
+        self.digest = digest
+        self.sections = {}
+
+
+_parsed_configs = {}
+_created_directories = set()
+_lock = threading.Lock()
+
+
+def load_config(path: Path = CONFIG_FILE_PATH) -> _ParsedConfig:
+    """
+    Returns the parsed config file, re-parsing it only when it changed on disk.
+
+    The file is stat'ed on every call; it is only re-read when its mtime or size
+    moved, and only re-parsed when the content hash differs from the cached one.
+    """
+    stat = os.stat(path)
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+
+    parsed = _parsed_configs.get(path)
+    if parsed is not None and parsed.stat_key == stat_key:
+        return parsed
+
+    with _lock:
+        parsed = _parsed_configs.get(path)
+        if parsed is not None and parsed.stat_key == stat_key:
+            return parsed
+
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+
+        if parsed is not None and parsed.digest == digest:
+            # Touched but unchanged, keep handing out the same config objects
+            parsed.stat_key = stat_key
+            return parsed
+
+        parsed = _ParsedConfig(read_yaml(path), stat_key, digest)
+        _parsed_configs[path] = parsed
+        return parsed
+
+
+def ensure_directories(path_to_directories: list):
+    """Creates each directory once per process instead of on every config lookup."""
+    missing = [str(path) for path in path_to_directories if str(path) not in _created_directories]
+    if missing:
+        create_directories(missing)
+        _created_directories.update(missing)
+
+
+def cached_section(getter):
+    """Builds a config object once per parse of the config file and reuses it afterwards."""
+    @wraps(getter)
+    def wrapper(self):
+        sections = self._parsed.sections
+        if getter.__name__ not in sections:
+            sections[getter.__name__] = getter(self)
+        return sections[getter.__name__]
+    return wrapper
 
 
 class ConfigurationManager:
     def __init__(self):
-        self.config = read_yaml(CONFIG_FILE_PATH)
-        create_directories([self.config.artifacts_root])
+        self._parsed = load_config(CONFIG_FILE_PATH)
+        self.config = self._parsed.config
+        ensure_directories([self.config.artifacts_root])
+
+    @property
+    def transformed_data_format(self) -> str:
+        return self.config.data_transformation.get('output_format', 'csv')
+
+    @property
+    def incremental(self) -> bool:
+        return self.config.data_ingestion.get('incremental', False)
+
+    def transformed_data_path(self, path) -> Path:
+        """
+        Points a transformed-data path at the file extension of the configured output format, or,
+        with incremental ingestion, at the directory of per-batch parquet files named after it.
+        """
+        path = table_path(path, self.transformed_data_format)
+        if self.incremental:
+            if self.transformed_data_format != 'parquet':
+                raise ValueError("Incremental ingestion stores the transformed data as parquet batches, "
+                                 "set data_transformation.output_format to parquet")
+            return path.with_suffix('')
+        return path
         
+    @cached_section
     def get_data_ingestion_config(self) -> DataIngestionConfig:
         config = self.config.data_ingestion
 
-        create_directories([config.dir_name])
+        ensure_directories([config.dir_name])
 
         data_ingestion_config = DataIngestionConfig(
             dir_name=Path(config.dir_name),
             source_URL=config.source_URL,
             zip_file_name=config.zip_file_name,
-            unzip_dir=Path(config.unzip_dir) 
+            unzip_dir=Path(config.unzip_dir),
+            output_format=config.get('output_format', 'csv'),
+            chunk_size=config.get('chunk_size', 100000),
+            incremental=self.incremental
         )
+        if data_ingestion_config.incremental and data_ingestion_config.output_format != 'parquet':
+            raise ValueError("Incremental ingestion appends to the parquet store, set data_ingestion.output_format to parquet")
 
         return data_ingestion_config
     
+    @cached_section
     def get_data_transformation_config(self) -> DataTransformationConfig:
         config = self.config.data_transformation
         
-        create_directories([config.dir_name])
+        ensure_directories([config.dir_name])
         
         data_transformation_config = DataTransformationConfig(
             dir_name=Path(config.dir_name),
             transformed_data_dir=Path(config.transformed_data_dir),
             preprocess_pipeline_object_dir=Path(config.preprocess_pipeline_object_dir),
-            transformed_data_file_name=config.transformed_data_file_name,
-            preprocess_pipeline_object_file_name=config.preprocess_pipeline_object_file_name
+            transformed_data_file_name=str(self.transformed_data_path(config.transformed_data_file_name)),
+            preprocess_pipeline_object_file_name=config.preprocess_pipeline_object_file_name,
+            chunk_size=config.get('chunk_size'),
+            output_format=self.transformed_data_format,
+            float32=config.get('float32', False),
+            balancing=config.get('balancing', 'upsample'),
+            n_jobs=config.get('n_jobs'),
+            force_refit=config.get('force_refit', False)
         )
     
         return data_transformation_config
 
+    @cached_section
     def get_training_config(self) -> ModelTrainingConfig:
         config = self.config.model_training
         
-        create_directories([config.dir_name])
+        ensure_directories([config.dir_name])
+        if config.get('incremental', False) and config.get('trees_per_increment', 40) > config.get('max_estimators', 360):
+            raise ValueError("model_training.trees_per_increment can't exceed model_training.max_estimators")
         
         model_training_config = ModelTrainingConfig(
             dir_name = Path(config.dir_name),
-            training_data_path = Path(config.training_data_path),
+            training_data_path = self.transformed_data_path(config.training_data_path),
             trained_model_path = Path(config.trained_model_path),
+            compiled_model_path = Path(config.compiled_model_path),
+            reference_sketch_path = Path(config.reference_sketch_path),
+            # One file even with incremental ingestion
+            reference_data_path = table_path(config.reference_data_path, self.transformed_data_format),
             train_test_ratio = config.train_test_ratio,
             mlflow_uri = config.mlflow_uri,
-            target_column = config.target_column
+            target_column = config.target_column,
+            n_jobs = config.get('n_jobs'),
+            n_estimators = config.get('n_estimators', 120),
+            incremental = config.get('incremental', False),
+            trees_per_increment = config.get('trees_per_increment', 40),
+            max_estimators = config.get('max_estimators', 360),
+            search = self.get_model_search_config()
         )
         
         return model_training_config
     
+    def get_model_search_config(self) -> Optional[ModelSearchConfig]:
+        """The hyperparameter search settings, or None when model_training.search isn't enabled."""
+        config = self.config.model_training.get('search')
+        if not config or not config.get('enabled', False):
+            return None
+
+        return ModelSearchConfig(
+            space={name: list(values) for name, values in config.space.items()},
+            strategy=config.get('strategy', 'grid'),
+            n_candidates=config.get('n_candidates'),
+            factor=config.get('factor', 3),
+            min_rows=config.get('min_rows', 2000),
+            validation_ratio=config.get('validation_ratio', 0.2),
+            max_latency_ms=config.get('max_latency_ms'),
+            latency_rows=config.get('latency_rows', 1),
+            max_model_mb=config.get('max_model_mb'),
+            n_jobs=config.get('n_jobs')
+        )
+
+    @cached_section
     def get_data_drift_config(self):
         config = self.config.data_drift
         
-        create_directories([config.dir_name])
+        ensure_directories([config.dir_name])
         
         data_drift_config = DataDriftConfig(
             dir_name=Path(config.dir_name),
             file_name=Path(config.file_name),
-            refrence_data_path=Path(config.refrence_data_path),
-            transformed_data_path=Path(config.transformed_data_path),
-            mlflow_uri=config.mlflow_uri
+            refrence_data_path=table_path(config.refrence_data_path, self.transformed_data_format),
+            transformed_data_path=self.transformed_data_path(config.transformed_data_path),
+            mlflow_uri=config.mlflow_uri,
+            method=config.get('method', 'evidently'),
+            # Written by the trainer next to the model
+            reference_sketch_path=Path(self.config.model_training.reference_sketch_path),
+            stattest=config.get('stattest', 'psi'),
+            stattest_threshold=config.get('stattest_threshold', 0.2),
+            drift_share_threshold=config.get('drift_share_threshold', 0.2),
+            sample_size=config.get('sample_size'),
+            sampling=config.get('sampling', 'stratified'),
+            bootstrap_rounds=config.get('bootstrap_rounds', 0),
+            confidence=config.get('confidence', 0.95),
+            report_format=config.get('report_format', 'html'),
+            target_column=self.config.model_training.target_column,
+            online_snapshot_path=Path(config.online_snapshot_path) if config.get('online_snapshot_path') else None,
+            # Published there by the app, next to the reference sketch it serves with
+            s3_bucket_name=self.config.prediction.s3_bucket_name,
+            s3_artifact_dir=self.config.prediction.s3_artifact_dir,
+            s3_drift_snapshot_name=self.config.prediction.get('s3_drift_snapshot_name')
         )
         
         return data_drift_config
     
+    @cached_section
     def get_model_evaluation_config(self) -> ModelEvaluationConfig:
         
         config = self.config.model_eval_push
@@ -85,11 +242,15 @@ class ConfigurationManager:
             s3_bucket_name=config.s3_bucket_name,
             s3_model_name=config.s3_model_name,
             s3_artifact_dir=config.s3_artifact_dir,
-            s3_preprocessor_name=config.s3_preprocessor_name
+            s3_preprocessor_name=config.s3_preprocessor_name,
+            s3_compiled_model_name=config.s3_compiled_model_name,
+            s3_reference_sketch_name=config.s3_reference_sketch_name,
+            s3_manifest_name=config.get('s3_manifest_name', 'manifest.json')
         )
         
         return model_evaluation_config
     
+    @cached_section
     def get_prediction_config(self) -> PredictionConfig:
         
         config = self.config.prediction
@@ -99,9 +260,36 @@ class ConfigurationManager:
             s3_model_name=config.s3_model_name,
             s3_artifact_dir=config.s3_artifact_dir,
             s3_preprocessor_name=config.s3_preprocessor_name,
-            download_location=config.download_location
+            s3_compiled_model_name=config.s3_compiled_model_name,
+            s3_reference_sketch_name=config.s3_reference_sketch_name,
+            s3_manifest_name=config.get('s3_manifest_name', 'manifest.json'),
+            s3_drift_snapshot_name=config.get('s3_drift_snapshot_name'),
+            download_location=config.download_location,
+            compiled_model_max_rows=config.compiled_model_max_rows
         )
         
         return prediction_config
+
+    @cached_section
+    def get_app_config(self) -> AppConfig:
+
+        config = self.config.app
+
+        app_config = AppConfig(
+            host=config.host,
+            port=config.port,
+            batch_max_wait_ms=config.batch_max_wait_ms,
+            batch_max_size=config.batch_max_size,
+            artifact_poll_interval_seconds=config.artifact_poll_interval_seconds,
+            executor_mode=config.executor_mode,
+            executor_max_workers=config.executor_max_workers,
+            executor_max_concurrency=config.executor_max_concurrency,
+            drift_monitor_interval_seconds=config.drift_monitor_interval_seconds,
+            drift_monitor_decay=config.drift_monitor_decay,
+            drift_monitor_min_rows=config.drift_monitor_min_rows,
+            drift_snapshot_path=config.drift_snapshot_path
+        )
+
+        return app_config
     
     
@@ -1,3 +1,28 @@
 from pathlib import Path
 
 CONFIG_FILE_PATH = Path("config/config.yml")
+
+# Per-row training weight written next to the features when classes are balanced by weighting
+SAMPLE_WEIGHT_COLUMN = "sample_weight"
+# 1 on the extra copies of fraud rows written when classes are balanced by upsampling, 0 on every original row
+UPSAMPLED_COLUMN = "upsampled_copy"
+
+# Column types of the raw transactions csv, used when ingesting it into typed columnar files.
+# The dates and the is_fraud label (which has malformed values) stay strings and are parsed by the transform.
+RAW_DATA_DTYPES = {
+    "trans_date_trans_time": "str",
+    "merchant": "str",
+    "category": "str",
+    "amt": "float64",
+    "city": "str",
+    "state": "str",
+    "lat": "float64",
+    "long": "float64",
+    "city_pop": "int64",
+    "job": "str",
+    "dob": "str",
+    "trans_num": "str",
+    "merch_lat": "float64",
+    "merch_long": "float64",
+    "is_fraud": "str",
+}
@@ -1,20 +1,40 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
 class DataIngestionArtifact:
     data_ingestion_unzip_file_path: str
     status: bool
+    cache_hit: bool = False
+    # Filled in when the csv is streamed into parquet part-files
+    row_count: Optional[int] = None
+    checksum: Optional[str] = None
+    # Filled in by incremental ingestion: the batch written by this run and the watermark after it
+    new_data_path: Optional[str] = None
+    new_rows: Optional[int] = None
+    watermark: Optional[str] = None
         
 @dataclass
 class DataTransformationArtifact:
     transformed_object_file_path:str 
     transformed_file_path:str
     status: bool
+    cache_hit: bool = False
+    # Incremental runs: the transformed batch this run wrote, and whether the preprocessor was refitted
+    new_data_path: Optional[str] = None
+    new_rows: Optional[int] = None
+    refit: bool = True
 
 @dataclass
 class ModelTrainingArtifact:
     trained_model_path:str
     f1_score:float
     precision_score:float
-    recall_score:float    
+    recall_score:float
+    compiled_model_path:str = ""
+    reference_sketch_path:str = ""
+    n_estimators:int = 0
+    incremental:bool = False
+    search_results_path:str = ""
+    reused_model:bool = False
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, Optional
  
 @dataclass(frozen=True)
 class DataIngestionConfig:
@@ -7,33 +8,80 @@ class DataIngestionConfig:
   source_URL: str
   zip_file_name: Path
   unzip_dir: Path
+  output_format: str
+  chunk_size: int
+  incremental: bool
     
-@dataclass
+@dataclass(frozen=True)
 class DataTransformationConfig:
   dir_name: Path
   transformed_data_dir: Path
   preprocess_pipeline_object_dir: Path
   transformed_data_file_name: str
   preprocess_pipeline_object_file_name: str
+  chunk_size: Optional[int]
+  output_format: str
+  float32: bool
+  balancing: str
+  n_jobs: Optional[int]
+  force_refit: bool
                            
-@dataclass
+@dataclass(frozen=True)
 class DataDriftConfig:
   dir_name: Path
   file_name: str
   refrence_data_path: Path
   transformed_data_path: Path
   mlflow_uri: str
+  method: str
+  reference_sketch_path: Path
+  stattest: str
+  stattest_threshold: float
+  drift_share_threshold: float
+  sample_size: Optional[int]
+  sampling: str
+  bootstrap_rounds: int
+  confidence: float
+  report_format: str
+  target_column: str
+  online_snapshot_path: Optional[Path]
+  s3_bucket_name: str
+  s3_artifact_dir: str
+  s3_drift_snapshot_name: Optional[str]
                                                     
-@dataclass
+@dataclass(frozen=True)
+class ModelSearchConfig:
+  space: Dict[str, list]
+  strategy: str
+  n_candidates: Optional[int]
+  factor: int
+  min_rows: int
+  validation_ratio: float
+  max_latency_ms: Optional[float]
+  latency_rows: int
+  max_model_mb: Optional[float]
+  n_jobs: Optional[int]
+
+@dataclass(frozen=True)
 class ModelTrainingConfig:
   dir_name: Path
   training_data_path: Path
   trained_model_path: Path
+  compiled_model_path: Path
+  reference_sketch_path: Path
+  reference_data_path: Path
   train_test_ratio: float
   mlflow_uri: str
   target_column: str
+  n_jobs: Optional[int]
+  n_estimators: int
+  incremental: bool
+  trees_per_increment: int
+  max_estimators: int
+  # None unless model_training.search.enabled
+  search: Optional[ModelSearchConfig] = None
     
-@dataclass
+@dataclass(frozen=True)
 class ModelEvaluationConfig:
   expected_score: float
   preprocessor_object_path: str
@@ -41,14 +89,37 @@ class ModelEvaluationConfig:
   s3_model_name: str
   s3_artifact_dir: str
   s3_preprocessor_name: str
+  s3_compiled_model_name: str
+  s3_reference_sketch_name: str
+  s3_manifest_name: str
 
-@dataclass
+@dataclass(frozen=True)
 class PredictionConfig:
   s3_bucket_name: str
   s3_model_name: str
   s3_artifact_dir: str
   s3_preprocessor_name: str
+  s3_compiled_model_name: str
+  s3_reference_sketch_name: str
+  s3_manifest_name: str
+  s3_drift_snapshot_name: Optional[str]
   download_location: str
+  compiled_model_max_rows: Optional[int]
+
+@dataclass(frozen=True)
+class AppConfig:
+  host: str
+  port: int
+  batch_max_wait_ms: float
+  batch_max_size: int
+  artifact_poll_interval_seconds: float
+  executor_mode: str
+  executor_max_workers: int
+  executor_max_concurrency: int
+  drift_monitor_interval_seconds: float
+  drift_monitor_decay: float
+  drift_monitor_min_rows: int
+  drift_snapshot_path: str
 
 
 # @dataclass
@@ -1,5 +1,8 @@
 from fastapi import Request
 import pandas as pd
+import json
+
+INPUT_COLUMNS = ["trans_date_trans_time", "dob", "amt", "city_pop", "merch_long"]
 
 class DataForm:
     def __init__(self, request: Request):
@@ -18,6 +21,16 @@ class DataForm:
         self.amt = form.get("amt")
         self.city_pop = form.get("city_pop")
         self.merch_long = form.get("merch_long")
+
+    async def get_record(self) -> dict:
+        await self.get_usvisa_data()
+        return {
+            "trans_date_trans_time": self.trans_date_trans_time,
+            "dob": self.dob,
+            "amt": self.amt,
+            "city_pop": self.city_pop,
+            "merch_long": self.merch_long
+        }
         
     async def get_usvisa_input_data_frame(self):
         await self.get_usvisa_data()
@@ -30,5 +43,43 @@ class DataForm:
         }
         
         return pd.DataFrame(data)
-    
-    
+
+
+class BatchDataForm:
+    """
+    Parses a batch of transactions sent either as a JSON array of records
+    or as NDJSON (one JSON record per line) into validated records.
+    """
+    def __init__(self, request: Request):
+        self.request: Request = request
+
+    async def get_records(self) -> list:
+        body = await self.request.body()
+        content_type = self.request.headers.get("content-type", "")
+
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            records = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            records = json.loads(body)
+            if not isinstance(records, list):
+                raise ValueError("Expected a JSON array of transaction records")
+
+        if not records:
+            raise ValueError("No transaction records received")
+
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise ValueError(f"Record {i} is not a JSON object")
+            missing =[col for col in INPUT_COLUMNS if col not in record]
+            if missing:
+                raise ValueError(f"Record {i} is missing fields: {missing}")
+
+        return records
+
+    async def get_input_data_frame(self) -> pd.DataFrame:
+        return records_to_frame(await self.get_records())
+
+
+def records_to_frame(records: list) -> pd.DataFrame:
+    # Build the frame column-wise in one shot instead of row by row
+    return pd.DataFrame({col: [record[col] for record in records] for col in INPUT_COLUMNS})
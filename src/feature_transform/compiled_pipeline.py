@@ -0,0 +1,120 @@
+import re
+from datetime import datetime
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from src.feature_transform.date_age import parse_dates
+
+# Raw record used to check a compiled preprocessor against the sklearn pipeline it came from
+PARITY_PROBE_RECORDS = [
+    {"trans_date_trans_time": "2019-01-04T00:58", "dob": "1939-11-09", "amt": "966.11", "city_pop": "145", "merch_long": "-165.473127"},
+    {"trans_date_trans_time": "04-01-2019 15:06", "dob": "09-11-1939", "amt": 14.37, "city_pop": 3495, "merch_long": -73.2},
+    {"trans_date_trans_time": "2020-06-21 12:14:25", "dob": "1990-02-28", "amt": "0.1", "city_pop": "1", "merch_long": "0"},
+]
+
+# Plain ISO dates and local times, the only strings `fromisoformat` and mixed parsing agree on.
+# Week dates, ordinal dates, compact forms and offsets are left to pandas.
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?")
+
+
+def parse_year(value) -> float:
+    """
+    Returns the calendar year of a date string, or NaN when it cannot be parsed.
+
+    Plain ISO 8601 dates and times (what the HTML form and most JSON clients
+    send) are parsed with `datetime.fromisoformat`. Anything else goes through
+    `pd.to_datetime(format="mixed", errors="coerce")`, whose result
+    `DateAgeFeatureExtractor` reproduces, so the year is always the one the
+    training pipeline would have computed.
+    """
+    if isinstance(value, str) and ISO_DATE.fullmatch(value):
+        try:
+            return float(datetime.fromisoformat(value).year)
+        except ValueError:
+            pass
+
+    parsed = pd.to_datetime(pd.Series([value]), format="mixed", errors="coerce").iloc[0]
+    return float("nan") if pd.isna(parsed) else float(parsed.year)
+
+
+def to_float(value) -> float:
+    """Converts a raw feature value like the scaler's input validation does: missing (None) becomes NaN."""
+    return float("nan") if value is None else float(value)
+
+
+class CompiledPreprocessor:
+    """
+    Inference-only form of the fitted `date_age_extractor` + `scaler` pipeline.
+
+    Works on plain dict records and a flat float64 array: no DataFrame is built
+    and the scaler's persisted `mean_`/`scale_` are applied with the same
+    in-place subtract and divide `StandardScaler.transform` uses, so the output
+    is bit-identical to `pipeline.transform`.
+    """
+
+    def __init__(self, features: Sequence[str], mean: np.ndarray, scale: np.ndarray):
+        self.features = list(features)
+        self.mean = mean
+        self.scale_ = scale
+
+    @classmethod
+    def from_pipeline(cls, pipeline: Pipeline) -> "CompiledPreprocessor":
+        """
+        Builds a compiled preprocessor from a fitted training pipeline.
+
+        Raises:
+            ValueError: if the pipeline does not have the expected steps.
+        """
+        steps = pipeline.named_steps
+        if list(steps) != ["date_age_extractor", "scaler"]:
+            raise ValueError(f"Cannot compile pipeline with steps {list(steps)}")
+
+        scaler = steps["scaler"]
+        features = steps["date_age_extractor"].features
+        mean = scaler.mean_ if scaler.with_mean else None
+        scale = scaler.scale_ if scaler.with_std else None
+
+        return cls(features=features, mean=mean, scale=scale)
+
+    def _raw_value(self, record: dict, feature: str) -> float:
+        if feature == "age":
+            return parse_year(record["trans_date_trans_time"]) - parse_year(record["dob"])
+        return to_float(record[feature])
+
+    def _ages(self, records: List[dict]) -> np.ndarray:
+        # Batches parse each date column vectorized, like the pipeline does
+        trans_year = parse_dates(pd.Series([record["trans_date_trans_time"] for record in records], dtype=object)).dt.year
+        dob_year = parse_dates(pd.Series([record["dob"] for record in records], dtype=object)).dt.year
+        return (trans_year - dob_year).to_numpy(dtype=np.float64)
+
+    def extract(self, records: List[dict]) -> np.ndarray:
+        """Returns the unscaled feature matrix (dates parsed into `age`) for raw transaction records."""
+        if len(records) <= 1 or "age" not in self.features:
+            return np.array(
+                [[self._raw_value(record, feature) for feature in self.features] for record in records],
+                dtype=np.float64,
+            ).reshape(len(records), len(self.features))
+
+        X = np.empty((len(records), len(self.features)), dtype=np.float64)
+        for column, feature in enumerate(self.features):
+            X[:, column] = self._ages(records) if feature == "age" else [to_float(record[feature]) for record in records]
+        return X
+
+    def scale(self, X: np.ndarray) -> np.ndarray:
+        """Applies the persisted scaler statistics to `X` in place and returns it."""
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale_ is not None:
+            X /= self.scale_
+        return X
+
+    def transform_records(self, records: List[dict]) -> np.ndarray:
+        """Returns the scaled feature matrix for raw transaction records."""
+        return self.scale(self.extract(records))
+
+    def matches(self, pipeline: Pipeline, records: List[dict] = PARITY_PROBE_RECORDS) -> bool:
+        """Checks that this compiled form reproduces `pipeline.transform` exactly on `records`."""
+        expected = pipeline.transform(pd.DataFrame(records))
+        return np.array_equal(self.transform_records(records), np.asarray(expected, dtype=np.float64), equal_nan=True)
@@ -1,6 +1,100 @@
+import warnings
+from collections import Counter
+from typing import List, Mapping, Optional
+
 from sklearn.base import BaseEstimator, TransformerMixin
+import numpy as np
 import pandas as pd
 
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+# Number of distinct values a column's date formats are inferred from
+FORMAT_SAMPLE_SIZE = 20
+# Guessing a format costs a few times more than mixed-parsing one value, so small columns skip it
+MIN_VALUES_FOR_INFERENCE = 100
+DATE_COLUMNS = ['trans_date_trans_time', 'dob']
+# Most frequent inferred formats tried before falling back to mixed parsing
+MAX_FORMATS = 3
+
+
+def _month_first(date_format: str) -> Optional[str]:
+    """Returns the month-first version of a day-first format ('%d-%m-%Y' -> '%m-%d-%Y'), else None."""
+    day, month = date_format.find("%d"), date_format.find("%m")
+    if day == -1 or month == -1 or day > month:
+        return None
+    return date_format.replace("%d", "\0").replace("%m", "%d").replace("\0", "%m")
+
+
+def infer_date_formats(values) -> List[str]:
+    """
+    Infers the explicit formats worth trying on `values`, most common first.
+
+    `format="mixed"` reads ambiguous dates such as 04-01-2019 month first and
+    only falls back to day first when the first field can't be a month, so a
+    day-first format is always preceded by its month-first counterpart. Applied
+    in that order, each explicit format yields exactly the date mixed parsing would.
+    """
+    step = max(len(values) // FORMAT_SAMPLE_SIZE, 1)
+    sample = [value for value in values[::step][:FORMAT_SAMPLE_SIZE] if isinstance(value, str)]
+    with warnings.catch_warnings():
+        # guess_datetime_format warns whenever it has to read a date day first
+        warnings.simplefilter("ignore")
+        guesses = Counter(guess_datetime_format(value) for value in sample)
+
+    # Timezone-aware values are left to mixed parsing, which keeps their offsets
+    guesses = Counter({
+        date_format: count for date_format, count in guesses.items()
+        if date_format is not None and "%z" not in date_format and "%Z" not in date_format
+    })
+
+    formats = []
+    for date_format, _ in guesses.most_common(MAX_FORMATS):
+        for candidate in (_month_first(date_format), date_format):
+            if candidate is not None and candidate not in formats:
+                formats.append(candidate)
+    return formats
+
+
+def parse_dates(column: pd.Series) -> pd.Series:
+    """
+    Same result as `pd.to_datetime(column, format="mixed", errors="coerce")`, much faster.
+
+    Every distinct string is parsed once (customers share a handful of `dob`
+    values), vectorized with the column's dominant explicit formats. Only the
+    values none of them match go through mixed, per-element parsing.
+    """
+    if not pd.api.types.is_object_dtype(column) and not pd.api.types.is_string_dtype(column):
+        return pd.to_datetime(column, format="mixed", errors="coerce")
+
+    codes, uniques = pd.factorize(column)
+    uniques = np.asarray(uniques, dtype=object)
+
+    parsed = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[ns]")
+    pending = np.ones(len(uniques), dtype=bool)
+    formats = infer_date_formats(uniques) if len(uniques) >= MIN_VALUES_FOR_INFERENCE else []
+    for date_format in formats:
+        candidates = np.flatnonzero(pending)
+        if not candidates.size:
+            break
+        attempt = pd.to_datetime(pd.Series(uniques[candidates]), format=date_format, errors="coerce")
+        matched = attempt.notna().to_numpy()
+        parsed[candidates[matched]] = attempt[matched].to_numpy(dtype="datetime64[ns]")
+        pending[candidates[matched]] = False
+
+    if pending.any():
+        rest = pd.to_datetime(pd.Series(uniques[pending]), format="mixed", errors="coerce")
+        if rest.dtype != parsed.dtype:
+            # e.g. timezone-aware strings, leave the whole column to the generic parser
+            return pd.to_datetime(column, format="mixed", errors="coerce")
+        parsed[pending] = rest.to_numpy()
+
+    # factorize marks missing values with code -1, which takes the trailing NaT (also when every value is missing)
+    result = np.append(parsed, np.datetime64("NaT")).take(codes)
+    return pd.Series(result, index=column.index, name=column.name)
+
 
 class DateAgeFeatureExtractor(BaseEstimator, TransformerMixin):
     """
@@ -8,6 +102,9 @@ class DateAgeFeatureExtractor(BaseEstimator, TransformerMixin):
     1. Convert 'trans_date_trans_time' and 'dob' to datetime objects.
     2. Calculate 'age' from these datetime columns.
     3. Select the specified features for the pipeline.
+
+    Only the date columns and the selected features are read from the input,
+    which can be a DataFrame, a NumPy structured array or a dict of arrays.
     """
     def __init__(self, features=['amt', 'age', 'city_pop', 'merch_long']):
         self.features = features
@@ -15,16 +112,35 @@ class DateAgeFeatureExtractor(BaseEstimator, TransformerMixin):
     def fit(self, X, y=None):
         return self # Nothing to learn from data
 
+    def _column(self, X, name: str) -> pd.Series:
+        if isinstance(X, pd.DataFrame):
+            return X[name]
+        if isinstance(X, np.ndarray) and X.dtype.names is not None:
+            return pd.Series(X[name], name=name)
+        if isinstance(X, Mapping):
+            return pd.Series(np.asarray(X[name]), name=name)
+        raise TypeError(f"Expected a DataFrame, structured array or dict of arrays, got {type(X).__name__}")
+
     def transform(self, X):
-        # Ensure we are working on a copy to avoid modifying the original DataFrame
-        X_transformed = X.copy()
+        # Build the output from the needed columns only, instead of copying the whole (20+ column) input
+        index = X.index if isinstance(X, pd.DataFrame) else None
 
         # Convert date columns to datetime, handling mixed formats
-        X_transformed['trans_date_trans_time'] = pd.to_datetime(X_transformed['trans_date_trans_time'], format="mixed", errors='coerce')
-        X_transformed['dob'] = pd.to_datetime(X_transformed['dob'], format="mixed", errors='coerce')
+        dates = {name: parse_dates(self._column(X, name)) for name in DATE_COLUMNS}
 
         # Calculate age
         # Handle potential NaT values from 'errors='coerce' in to_datetime
-        X_transformed['age'] = X_transformed['trans_date_trans_time'].dt.year - X_transformed['dob'].dt.year
-        
-        return X_transformed[self.features]
\ No newline at end of file
+        age = dates['trans_date_trans_time'].dt.year - dates['dob'].dt.year
+
+        columns = {}
+        for feature in self.features:
+            if feature == 'age':
+                column = age
+            elif feature in dates:
+                column = dates[feature]
+            else:
+                column = self._column(X, feature)
+            # Raw arrays, so pandas doesn't try to align the (possibly duplicated) resampled index
+            columns[feature] = column.array
+
+        return pd.DataFrame(columns, index=index, columns=self.features)
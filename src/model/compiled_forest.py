@@ -0,0 +1,148 @@
+from typing import Optional
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+TREE_LEAF = -1
+
+
+class CompiledForest:
+    """
+    Array-backed form of a fitted `RandomForestClassifier` for low-latency inference.
+
+    Every tree is flattened into one set of contiguous node arrays (feature,
+    threshold, left/right child, missing-value direction and normalized leaf
+    class distribution), with `roots` holding the index of each tree's root.
+    `predict_proba` walks all trees for a whole batch at once, one tree level
+    per NumPy step, instead of sklearn's per-estimator Python loop.
+
+    Inputs are cast to float32 and compared against float64 thresholds and the
+    per-tree distributions are summed in estimator order before dividing by the
+    number of trees, exactly as sklearn does, so predictions are identical.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        missing_go_to_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        n_features: int,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.column_stack((left, right)).reshape(-1)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def from_estimator(cls, forest: RandomForestClassifier) -> "CompiledForest":
+        """Flattens the trees of a fitted single-output random forest classifier."""
+        if forest.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+
+            left = tree.children_left.astype(np.int32)
+            right = tree.children_right.astype(np.int32)
+            is_leaf = left == TREE_LEAF
+            # Children become global node indices; leaves keep pointing nowhere
+            left[~is_leaf] += offset
+            right[~is_leaf] += offset
+
+            # Same normalization DecisionTreeClassifier.predict_proba applies to the leaf values
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value /= normalizer
+
+            features.append(tree.feature.astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(left)
+            rights.append(right)
+            missing.append(tree.missing_go_to_left.astype(bool))
+            values.append(value)
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            missing_go_to_left=np.concatenate(missing),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=forest.classes_,
+            n_features=forest.n_features_in_,
+        )
+
+    def apply(self, X) -> np.ndarray:
+        """Returns the global leaf index reached in every tree, shape (n_samples, n_estimators)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, expected (n_samples, {self.n_features_in_})")
+
+        n_samples, n_features = X.shape
+        flat_X = X.reshape(-1)
+        has_missing = bool(np.isnan(flat_X).any())
+
+        nodes = np.tile(self.roots, (n_samples, 1))
+        flat_nodes = nodes.reshape(-1)
+
+        # Walk every (row, tree) pair one level per step, dropping pairs as soon as they reach a leaf
+        current = flat_nodes.copy()
+        feature = self.feature[current]
+        # Single-leaf trees are already done at their root
+        active = np.flatnonzero(feature >= 0)
+        row_offset = np.repeat(np.arange(n_samples) * n_features, self.n_estimators)[active]
+        current, feature = current[active], feature[active]
+        while active.size:
+            x = flat_X[row_offset + feature]
+            go_right = ~(x <= self.threshold[current])
+            if has_missing:
+                is_missing = np.isnan(x)
+                go_right[is_missing] = ~self.missing_go_to_left[current[is_missing]]
+            current = self.children[2 * current + go_right]
+            feature = self.feature[current]
+
+            reached_leaf = feature < 0
+            flat_nodes[active[reached_leaf]] = current[reached_leaf]
+            internal = ~reached_leaf
+            active, current, feature, row_offset = active[internal], current[internal], feature[internal], row_offset[internal]
+
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        leaves = self.apply(X)
+        # cumsum adds the trees strictly in estimator order, matching sklearn's accumulation bit for bit
+        return self.value[leaves].cumsum(axis=1)[:, -1] / self.n_estimators
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def save(self, path: str):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: str, mmap_mode: Optional[str] = None) -> "CompiledForest":
+        """Loads a compiled forest, optionally memory-mapping its node arrays (`mmap_mode='r'`)."""
+        return joblib.load(path, mmap_mode=mmap_mode)
@@ -0,0 +1,214 @@
+import math
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from src.logger import logging as logger
+from src.model.compiled_forest import CompiledForest
+
+SEARCH_STRATEGIES = ("grid", "random")
+# Predict calls timed per trial, the median is reported
+LATENCY_REPEATS = 30
+
+# Memory-mapped training and validation arrays, opened once per worker process
+_SHARED: Dict[str, np.ndarray] = {}
+
+
+@dataclass
+class Trial:
+    """One candidate evaluated at one rung of the search."""
+    candidate: int
+    rung: int
+    n_rows: int
+    params: Dict[str, Any]
+    f1: float
+    fit_seconds: float
+    predict_latency_ms: float
+    model_mb: float
+    within_budget: bool = True
+
+
+def candidate_params(space: Dict[str, list], strategy: str = "grid", n_candidates: Optional[int] = None,
+                     seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Parameter sets to search.
+
+    Args:
+        space (Dict[str, list]): values to try per RandomForestClassifier parameter.
+        strategy (str): grid (every combination) or random (`n_candidates` distinct draws).
+        n_candidates (int, optional): number of draws with the random strategy.
+        seed (int, optional): seed of the random draws.
+    """
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{strategy}', expected one of {SEARCH_STRATEGIES}")
+    grid = ParameterGrid(space)
+    if strategy == "grid" or not n_candidates or n_candidates >= len(grid):
+        return list(grid)
+    # Lists only, so the draws are without replacement
+    return list(ParameterSampler(space, n_iter=n_candidates, random_state=seed))
+
+
+def _open_shared(paths: Dict[str, str]):
+    global _SHARED
+    _SHARED = {name: np.load(path, mmap_mode="r") for name, path in paths.items()}
+
+
+def _run_trial(params: Dict[str, Any], n_rows: int, latency_rows: int, seed: int) -> Tuple[float, float, float, float]:
+    # Rows are already shuffled, so the first n_rows are a random subset; slicing a memmap copies nothing
+    X, y = _SHARED["X_train"][:n_rows], _SHARED["y_train"][:n_rows]
+    w = _SHARED["w_train"][:n_rows] if "w_train" in _SHARED else None
+
+    model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    started = time.perf_counter()
+    model.fit(X, y, sample_weight=w)
+    fit_seconds = time.perf_counter() - started
+
+    f1 = f1_score(_SHARED["y_val"], model.predict(_SHARED["X_val"]))
+    # Timed while other trials share the machine, so it errs on the slow side
+    latency_ms, model_mb = serving_cost(model, _SHARED["X_val"][:latency_rows])
+    return float(f1), fit_seconds, latency_ms, model_mb
+
+
+def serving_cost(model: RandomForestClassifier, X_latency: np.ndarray) -> Tuple[float, float]:
+    """
+    What the serving budget applies to: the median latency of the compiled forest (small batches
+    are served by it) on `X_latency`, in milliseconds, and the pickled size of `model` in MB.
+    """
+    model_mb = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 2**20
+    compiled = CompiledForest.from_estimator(model)
+    X_latency = np.ascontiguousarray(X_latency, dtype=np.float32)
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        started = time.perf_counter()
+        compiled.predict_proba(X_latency)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000), model_mb
+
+
+def within_budget(latency_ms: float, model_mb: float, max_latency_ms: Optional[float], max_model_mb: Optional[float]) -> bool:
+    """Whether a model with this `serving_cost` fits the budget, None meaning no limit."""
+    return ((max_latency_ms is None or latency_ms <= max_latency_ms)
+            and (max_model_mb is None or model_mb <= max_model_mb))
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive halving over RandomForestClassifier parameter sets.
+
+    Every candidate is first fitted on `min_rows` training rows. After each
+    rung only the best 1/`factor` of the candidates go on, fitted on `factor`
+    times more rows, until one is left or the full training set is reached.
+    Candidates are ranked by whether they fit the serving budget (median
+    compiled-forest latency on `latency_rows` rows, pickled model size), then by
+    validation F1.
+
+    The trials of a rung run on a pool of `n_jobs` processes. The training and
+    validation arrays are written once as .npy files and every worker maps them
+    read-only, so no worker gets its own pickled copy of the data.
+    """
+
+    def __init__(self, space: Dict[str, list], strategy: str = "grid", n_candidates: Optional[int] = None,
+                 factor: int = 3, min_rows: int = 5000, max_latency_ms: Optional[float] = None,
+                 max_model_mb: Optional[float] = None, latency_rows: int = 1, n_jobs: int = 1, seed: int = 42):
+        if factor < 2:
+            raise ValueError(f"Successive halving needs a factor of at least 2, got {factor}")
+        self.candidates = candidate_params(space, strategy, n_candidates, seed)
+        self.factor = factor
+        self.min_rows = min_rows
+        self.max_latency_ms = max_latency_ms
+        self.max_model_mb = max_model_mb
+        self.latency_rows = latency_rows
+        self.n_jobs = n_jobs
+        self.seed = seed
+
+    def within_budget(self, trial: Trial) -> bool:
+        return within_budget(trial.predict_latency_ms, trial.model_mb, self.max_latency_ms, self.max_model_mb)
+
+    @staticmethod
+    def rank_key(trial: Trial):
+        return (trial.within_budget, trial.f1, -trial.predict_latency_ms)
+
+    def run(self, X_train: np.ndarray, y_train: np.ndarray, X_val: np.ndarray, y_val: np.ndarray,
+            w_train: Optional[np.ndarray] = None) -> Tuple[Dict[str, Any], List[Trial]]:
+        """
+        Runs the search.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], List[Trial]]: the parameters of every candidate, winner first,
+            and every trial, rung by rung. Candidates dropped at a later rung rank above those dropped
+            earlier, so the list is the order to fall back in when the refitted winner misses the budget.
+        """
+        arrays = {
+            # float32 is what the trees split on, so fitting doesn't copy the mapped rows
+            "X_train": np.ascontiguousarray(X_train, dtype=np.float32),
+            "y_train": np.asarray(y_train),
+            "X_val": np.ascontiguousarray(X_val, dtype=np.float32),
+            "y_val": np.asarray(y_val),
+        }
+        if w_train is not None:
+            arrays["w_train"] = np.asarray(w_train, dtype=np.float64)
+        n_total = len(arrays["X_train"])
+
+        with tempfile.TemporaryDirectory(prefix="model_search_") as directory:
+            paths = {}
+            for name, array in arrays.items():
+                paths[name] = os.path.join(directory, f"{name}.npy")
+                np.save(paths[name], array)
+            del arrays
+
+            if self.n_jobs > 1:
+                with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_open_shared, initargs=(paths,)) as pool:
+                    return self._halve(n_total, pool)
+            _open_shared(paths)
+            try:
+                return self._halve(n_total, None)
+            finally:
+                _SHARED.clear()
+
+    def _halve(self, n_total: int, pool: Optional[ProcessPoolExecutor]) -> Tuple[List[Dict[str, Any]], List[Trial]]:
+        survivors = list(range(len(self.candidates)))
+        n_rows = min(self.min_rows, n_total)
+        trials, dropped, rung = [], [], 0
+        logger.info(f"Searching {len(survivors)} candidates by successive halving (factor {self.factor}) on up to {n_total} rows")
+
+        while True:
+            args = [(self.candidates[i], n_rows, self.latency_rows, self.seed) for i in survivors]
+            if pool is not None:
+                results = list(pool.map(_run_trial, *zip(*args)))
+            else:
+                results = [_run_trial(*arg) for arg in args]
+
+            rung_trials = []
+            for candidate, (f1, fit_seconds, latency_ms, model_mb) in zip(survivors, results):
+                trial = Trial(candidate, rung, n_rows, self.candidates[candidate], f1, fit_seconds, latency_ms, model_mb)
+                trial.within_budget = self.within_budget(trial)
+                rung_trials.append(trial)
+            rung_trials.sort(key=self.rank_key, reverse=True)
+            trials.extend(rung_trials)
+
+            best = rung_trials[0]
+            logger.info(f"Rung {rung}: {len(rung_trials)} candidates on {n_rows} rows, best F1 {best.f1:.4f} with {best.params}")
+            if len(rung_trials) == 1 or n_rows >= n_total:
+                break
+            n_survivors = math.ceil(len(rung_trials) / self.factor)
+            survivors = [trial.candidate for trial in rung_trials[:n_survivors]]
+            dropped = rung_trials[n_survivors:] + dropped
+            n_rows = min(n_rows * self.factor, n_total)
+            rung += 1
+
+        if not best.within_budget:
+            logger.warning(f"No candidate fits the serving budget, taking the best F1 anyway: {best.params} "
+                           f"({best.predict_latency_ms:.2f}ms, {best.model_mb:.1f}MB)")
+        return [trial.params for trial in rung_trials + dropped], trials
+
+
+def trials_to_dicts(trials: List[Trial]) -> List[dict]:
+    return [asdict(trial) for trial in trials]
@@ -0,0 +1,117 @@
+import bisect
+import math
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.monitoring.sketch import ReferenceSketch
+
+
+# Batches up to this many rows are binned in plain Python
+SMALL_BATCH_ROWS = 4
+
+
+class StreamingHistogram:
+    """
+    Constant-memory histograms of a stream of rows over fixed per-column bin edges.
+
+    The edges are the reference sketch's quantile edges, so the counts line up
+    with its `bin_shares` and the PSI needs no other state. All columns share one
+    flat count array: a batch of rows is binned with one `searchsorted` per column
+    and one `bincount`, a fixed amount of work per row whatever has been seen so
+    far. Missing values are counted apart and left out of the shares. Batches of
+    a few rows, the common case with single-row requests, skip NumPy and bisect
+    plain lists, which is several times cheaper than the per-call NumPy overhead.
+
+    Not thread-safe: updates are meant to come from a single thread (the app's
+    event loop), which is what keeps them lock-free.
+    """
+
+    def __init__(self, edges: Dict[str, Sequence[float]]):
+        self.columns = list(edges)
+        self._edges = [np.asarray(edges[name], dtype=np.float64) for name in self.columns]
+        self._edge_lists = [column_edges.tolist() for column_edges in self._edges]
+        # Column j owns the slots offsets[j] .. offsets[j + 1] - 1, one per bin
+        sizes = [len(column_edges) + 1 for column_edges in self._edges]
+        self._offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self.counts = np.zeros(self._offsets[-1], dtype=np.float64)
+        self.missing = np.zeros(len(self.columns), dtype=np.float64)
+
+    @classmethod
+    def from_sketch(cls, sketch: ReferenceSketch) -> "StreamingHistogram":
+        edges = {name: column["bin_edges"] for name, column in sketch.columns.items()}
+        if sketch.prediction is not None:
+            edges["prediction"] = sketch.prediction["bin_edges"]
+        return cls(edges)
+
+    def update(self, X: np.ndarray):
+        """
+        Adds a batch of rows.
+
+        Args:
+            X (np.ndarray): shape (n_rows, n_columns), columns in `self.columns` order.
+        """
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.columns))
+        if len(X) <= SMALL_BATCH_ROWS:
+            self._update_small(X.tolist())
+            return
+
+        missing = np.isnan(X)
+        slots = np.empty(X.shape, dtype=np.int64)
+        for j, column_edges in enumerate(self._edges):
+            slots[:, j] = np.searchsorted(column_edges, X[:, j], side="right") + self._offsets[j]
+        if missing.any():
+            self.missing += missing.sum(axis=0)
+            slots = slots[~missing]
+        self.counts += np.bincount(slots.ravel(), minlength=len(self.counts))
+
+    def _update_small(self, rows: List[List[float]]):
+        counts, missing, offsets = self.counts, self.missing, self._offsets
+        for row in rows:
+            for j, value in enumerate(row):
+                if math.isnan(value):
+                    missing[j] += 1
+                else:
+                    counts[offsets[j] + bisect.bisect_right(self._edge_lists[j], value)] += 1
+
+    def column_counts(self, j: int) -> np.ndarray:
+        return self.counts[self._offsets[j]:self._offsets[j + 1]]
+
+    def rows(self) -> float:
+        """Non-missing values seen in the first column (decayed, like the counts)."""
+        return float(self.column_counts(0).sum()) if self.columns else 0.0
+
+    def decay(self, factor: float):
+        """Scales every count by `factor`, so older rows weigh less than newer ones."""
+        self.counts *= factor
+        self.missing *= factor
+
+    def psi(self, reference_shares: Dict[str, Sequence[float]]) -> Dict[str, float]:
+        """
+        Population stability index of every column against its reference bin shares.
+        Columns without any value yet get NaN.
+        """
+        scores = {}
+        for j, name in enumerate(self.columns):
+            counts = self.column_counts(j)
+            total = counts.sum()
+            scores[name] = ReferenceSketch.psi(np.asarray(reference_shares[name]), counts / total) if total else float("nan")
+        return scores
+
+    def to_dict(self) -> dict:
+        return {
+            name: {
+                "bin_edges": self._edges[j].tolist(),
+                "counts": self.column_counts(j).tolist(),
+                "missing": float(self.missing[j]),
+            }
+            for j, name in enumerate(self.columns)
+        }
+
+
+def reference_shares(sketch: ReferenceSketch) -> Dict[str, List[float]]:
+    """The reference bin shares of every column `StreamingHistogram.from_sketch` tracks."""
+    shares = {name: column["bin_shares"] for name, column in sketch.columns.items()}
+    if sketch.prediction is not None:
+        shares["prediction"] = sketch.prediction["bin_shares"]
+    return shares
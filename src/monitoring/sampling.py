@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SAMPLING_METHODS = ("reservoir", "stratified")
+
+
+class ReservoirSampler:
+    """
+    Uniform sample of at most `size` rows from a stream of dataframe chunks.
+
+    Algorithm R, vectorized per chunk: row number i (0-based, over the whole
+    stream) replaces a random slot of the reservoir with probability size / (i + 1).
+    Memory stays at `size` rows however long the stream is.
+    """
+
+    def __init__(self, size: int, seed: Optional[int] = None):
+        if size < 1:
+            raise ValueError(f"Sample size must be positive, got {size}")
+        self.size = size
+        self.rows_seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._reservoir: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: pd.DataFrame):
+        chunk = chunk.reset_index(drop=True)
+        if self._reservoir is None:
+            self._reservoir = chunk.iloc[:0]
+        filled = len(self._reservoir)
+
+        # Fill the reservoir first
+        if filled < self.size:
+            take = min(self.size - filled, len(chunk))
+            self._reservoir = pd.concat([self._reservoir, chunk.iloc[:take]], ignore_index=True)
+            self.rows_seen += take
+            chunk = chunk.iloc[take:]
+        if not len(chunk):
+            return
+
+        positions = self.rows_seen + np.arange(len(chunk))
+        slots = (self._rng.random(len(chunk)) * (positions + 1)).astype(np.int64)
+        replacing = np.flatnonzero(slots < self.size)
+        if replacing.size:
+            # Later rows win a slot drawn more than once, as they would row by row
+            last = len(replacing) - 1 - np.unique(slots[replacing][::-1], return_index=True)[1]
+            rows = replacing[last]
+            self._reservoir.iloc[slots[rows]] = chunk.iloc[rows].to_numpy()
+        self.rows_seen += len(chunk)
+
+    def sample(self) -> pd.DataFrame:
+        return self._reservoir if self._reservoir is not None else pd.DataFrame()
+
+
+class StratifiedSampler:
+    """
+    Sample of about `size` rows (rounding aside) keeping the share of each value of `column`.
+
+    Every stratum gets its own reservoir, and once the stream is consumed each one
+    contributes rows in proportion to its count (at least one row per stratum
+    seen). A uniform subsample of a uniform reservoir is still uniform.
+    """
+
+    def __init__(self, size: int, column: str, seed: Optional[int] = None):
+        self.size = size
+        self.column = column
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+        self._strata: Dict[object, ReservoirSampler] = {}
+
+    @property
+    def rows_seen(self) -> int:
+        return sum(sampler.rows_seen for sampler in self._strata.values())
+
+    def update(self, chunk: pd.DataFrame):
+        for value, group in chunk.groupby(self.column, sort=False):
+            if value not in self._strata:
+                self._strata[value] = ReservoirSampler(self.size, seed=None if self.seed is None else self.seed + len(self._strata))
+            self._strata[value].update(group)
+
+    def sample(self) -> pd.DataFrame:
+        total = self.rows_seen
+        if not total:
+            return pd.DataFrame()
+        parts = []
+        for value in sorted(self._strata, key=str):
+            sampler = self._strata[value]
+            share = max(int(round(self.size * sampler.rows_seen / total)), 1)
+            reservoir = sampler.sample()
+            if share < len(reservoir):
+                reservoir = reservoir.iloc[np.sort(self._rng.choice(len(reservoir), share, replace=False))]
+            parts.append(reservoir)
+        return pd.concat(parts, ignore_index=True)
+
+
+def sample_chunks(chunks: Iterable[pd.DataFrame], size: int, method: str = "reservoir",
+                  column: Optional[str] = None, seed: Optional[int] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Samples a stream of dataframe chunks down to at most `size` rows.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): the rows, in chunks with the same columns.
+        size (int): maximum rows in the sample.
+        method (str): reservoir (uniform) or stratified (keeps the shares of `column`).
+        column (str, optional): column to stratify by.
+        seed (int, optional): seed of the sampling draws.
+
+    Returns:
+        Tuple[pd.DataFrame, int]: the sample, with a fresh index, and the number of rows it was drawn from.
+    """
+    if method not in SAMPLING_METHODS:
+        raise ValueError(f"Unknown sampling method '{method}', expected one of {SAMPLING_METHODS}")
+    sampler = StratifiedSampler(size, column, seed) if method == "stratified" else ReservoirSampler(size, seed)
+    for chunk in chunks:
+        sampler.update(chunk)
+    return sampler.sample(), sampler.rows_seen
+
+
+def percentile_interval(values, confidence: float = 0.95) -> tuple:
+    """Two-sided percentile interval of bootstrap `values` at `confidence`."""
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(np.asarray(values, dtype=np.float64), [alpha, 1.0 - alpha])
+    return float(low), float(high)
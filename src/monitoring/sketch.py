@@ -0,0 +1,157 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Decile bins for PSI, percentiles for KS and Wasserstein
+N_BINS = 10
+QUANTILE_LEVELS = np.linspace(0.0, 1.0, 101)
+# Floor on bin proportions so an empty bin doesn't make the PSI infinite
+PSI_EPSILON = 1e-4
+STATTESTS = ("psi", "ks", "wasserstein")
+
+
+class ReferenceSketch:
+    """
+    Compact per-feature summary of a reference dataset for drift scoring.
+
+    For every numeric column it keeps the moments (count, mean, std, min, max),
+    the share of missing values, quantile bin edges with the reference share of
+    each bin, and the reference quantiles and empirical CDF at `QUANTILE_LEVELS`.
+    A few kilobytes in all, computed once at training time, after which a window
+    of new data is scored with vectorized passes over that window only:
+
+    - psi: population stability index over the reference quantile bins.
+    - ks: largest gap between the two CDFs, evaluated at the reference quantiles
+      (a lower bound of the exact Kolmogorov-Smirnov statistic, within 1/100).
+    - wasserstein: mean absolute difference of the two quantile functions, divided
+      by the reference std so the same threshold works for every feature.
+    """
+
+    def __init__(self, columns: Dict[str, dict], rows: int, created_at: Optional[float] = None,
+                 prediction: Optional[dict] = None):
+        self.columns = columns
+        self.rows = rows
+        self.created_at = created_at if created_at is not None else time.time()
+        # Sketch of the model's fraud probabilities on its test split, for monitoring served predictions
+        self.prediction = prediction
+
+    @property
+    def features(self) -> List[str]:
+        return list(self.columns)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, n_bins: int = N_BINS, predictions: Optional[np.ndarray] = None) -> "ReferenceSketch":
+        """
+        Sketches every numeric column of `df`, and `predictions` (fraud probabilities) when given.
+        """
+        numeric = df.select_dtypes(include="number")
+        X = numeric.to_numpy(dtype=np.float64)
+        columns = {name: cls._sketch_column(name, X[:, i], n_bins) for i, name in enumerate(numeric.columns)}
+        prediction = cls._sketch_column("prediction", np.asarray(predictions, dtype=np.float64), n_bins) if predictions is not None else None
+        return cls(columns, rows=len(df), prediction=prediction)
+
+    @classmethod
+    def _sketch_column(cls, name: str, values: np.ndarray, n_bins: int) -> dict:
+        total = len(values)
+        values = np.sort(values[~np.isnan(values)])
+        if not values.size:
+            raise ValueError(f"Column {name} has no values to sketch")
+
+        quantiles = np.quantile(values, QUANTILE_LEVELS)
+        # Inner edges only: the outer bins are open-ended, so new data beyond the reference range still lands in a bin
+        edges = np.unique(np.quantile(values, np.linspace(0.0, 1.0, n_bins + 1))[1:-1])
+        return {
+            "count": int(values.size),
+            "missing_share": float(1.0 - values.size / total),
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values[0]),
+            "max": float(values[-1]),
+            "bin_edges": edges.tolist(),
+            "bin_shares": cls._bin_shares(values, edges).tolist(),
+            "quantiles": quantiles.tolist(),
+            "cdf": (np.searchsorted(values, quantiles, side="right") / values.size).tolist(),
+        }
+
+    @staticmethod
+    def _bin_shares(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        return counts / max(counts.sum(), 1)
+
+    @staticmethod
+    def psi(reference_shares: np.ndarray, current_shares: np.ndarray) -> float:
+        reference_shares = np.clip(reference_shares, PSI_EPSILON, None)
+        current_shares = np.clip(current_shares, PSI_EPSILON, None)
+        return float(np.sum((current_shares - reference_shares) * np.log(current_shares / reference_shares)))
+
+    def score(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Scores a window of current data against the reference.
+
+        Args:
+            df (pd.DataFrame): current window, holding every sketched column.
+
+        Returns:
+            pd.DataFrame: one row per sketched feature with its psi, ks and wasserstein
+                scores, the current mean and the number of current values.
+        """
+        missing = [name for name in self.columns if name not in df.columns]
+        if missing:
+            raise ValueError(f"Current data lacks the sketched columns {missing}")
+
+        X = df[self.features].to_numpy(dtype=np.float64)
+        # One sort of the whole window, shared by the bins, the CDF and the quantiles
+        X = np.sort(X, axis=0)
+        counts = (~np.isnan(X)).sum(axis=0)
+
+        rows = []
+        for i, (name, reference) in enumerate(self.columns.items()):
+            # NaNs sort last, so the valid values are the first counts[i]
+            values = X[:counts[i], i]
+            if not values.size:
+                rows.append({"feature": name, "psi": np.nan, "ks": np.nan, "wasserstein": np.nan, "mean": np.nan, "count": 0})
+                continue
+
+            edges = np.asarray(reference["bin_edges"])
+            reference_quantiles = np.asarray(reference["quantiles"])
+            current_cdf = np.searchsorted(values, reference_quantiles, side="right") / values.size
+            current_quantiles = np.quantile(values, QUANTILE_LEVELS)
+            scale = reference["std"] or 1.0
+
+            rows.append({
+                "feature": name,
+                "psi": self.psi(np.asarray(reference["bin_shares"]), self._bin_shares(values, edges)),
+                "ks": float(np.max(np.abs(current_cdf - np.asarray(reference["cdf"])))),
+                "wasserstein": float(np.mean(np.abs(current_quantiles - reference_quantiles)) / scale),
+                "mean": float(values.mean()),
+                "count": int(values.size),
+            })
+        return pd.DataFrame(rows).set_index("feature")
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "created_at": self.created_at,
+            "quantile_levels": QUANTILE_LEVELS.tolist(),
+            "columns": self.columns,
+            "prediction": self.prediction,
+        }
+
+    def save(self, path: Union[str, Path]):
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ReferenceSketch":
+        with open(path) as f:
+            data = json.load(f)
+        if not np.allclose(data["quantile_levels"], QUANTILE_LEVELS):
+            raise ValueError(f"Sketch {path} was computed with different quantile levels")
+        return cls(data["columns"], rows=data["rows"], created_at=data["created_at"], prediction=data.get("prediction"))
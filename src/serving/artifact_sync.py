@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+from src.cloud_storage.s3_storage import ETAG_SUFFIX, S3Storage
+from src.entity.config_entity import PredictionConfig
+from src.logger import logging as logger
+from src.serving.metrics import ARTIFACT_DOWNLOAD_BYTES, ARTIFACT_DOWNLOAD_SECONDS, ARTIFACT_DOWNLOADS
+from src.serving.model_registry import ModelRegistry
+
+# How often to retry while no model could be loaded yet
+NOT_READY_RETRY_SECONDS = 10
+
+
+def record_download(file_name: str, size_bytes: int, seconds: float):
+    ARTIFACT_DOWNLOADS.labels(file_name).inc()
+    ARTIFACT_DOWNLOAD_BYTES.labels(file_name).inc(size_bytes)
+    ARTIFACT_DOWNLOAD_SECONDS.labels(file_name).inc(seconds)
+
+
+class ArtifactSynchronizer:
+    """
+    Keeps the local model artifacts in step with S3 and the registry in step with the local artifacts.
+
+    `sync` is blocking and is meant to run off the event loop: it fetches the manifest the push
+    writes last, then the artifacts of the version it names (S3Storage skips objects whose ETag
+    hasn't changed), and hot-swaps the registry only when something new landed and every artifact
+    on disk matches the manifest, so a model is never served with another version's preprocessor
+    or compiled forest. If S3 is unreachable the artifacts already on disk are served. The app's
+    online drift snapshot goes the other way, see `upload_drift_snapshot`.
+    """
+
+    def __init__(self, config: PredictionConfig, registry: ModelRegistry):
+        self.config = config
+        self.registry = registry
+        self._store: Optional[S3Storage] = None
+
+    @property
+    def store(self) -> S3Storage:
+        if self._store is None:
+            self._store = S3Storage(on_download=record_download)
+        return self._store
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.config.download_location, file_name)
+
+    @property
+    def model_path(self) -> str:
+        return self._path(self.config.s3_model_name)
+
+    @property
+    def preprocessor_path(self) -> str:
+        return self._path(self.config.s3_preprocessor_name)
+
+    @property
+    def compiled_model_path(self) -> str:
+        return self._path(self.config.s3_compiled_model_name)
+
+    @property
+    def reference_sketch_path(self) -> str:
+        return self._path(self.config.s3_reference_sketch_name)
+
+    @property
+    def manifest_path(self) -> str:
+        return self._path(self.config.s3_manifest_name)
+
+    def read_manifest(self) -> Optional[dict]:
+        """The last downloaded manifest, None when there is none (artifacts pushed before manifests existed)."""
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _download(self, folder_path: str, file_names) -> bool:
+        """Downloads `file_names` from `folder_path`, returns True if any local copy changed."""
+        changed = False
+        for file_name in file_names:
+            local_path = self._path(file_name)
+            before = S3Storage.local_etag(local_path)
+            downloaded = self.store.download_file(
+                bucket_name=self.config.s3_bucket_name,
+                folder_path=folder_path,
+                file_name=file_name,
+                download_location=local_path
+            )
+            changed = changed or (downloaded is not None and S3Storage.local_etag(local_path) != before)
+        return changed
+
+    def _remove(self, file_name: str):
+        for path in (self._path(file_name), self._path(file_name) + ETAG_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def download(self) -> bool:
+        """
+        Fetches the manifest and the artifacts of the version it names. Buckets without a manifest
+        are read the old way, one artifact at a time from `s3_artifact_dir`.
+
+        Returns:
+            bool: True if the manifest or any local artifact changed.
+        """
+        changed = self._download(self.config.s3_artifact_dir, [self.config.s3_manifest_name])
+        manifest = self.read_manifest()
+        if manifest is not None:
+            return self._download(manifest["folder"], manifest["artifacts"]) or changed
+
+        model_changed = self._download(self.config.s3_artifact_dir, [self.config.s3_model_name])
+        compiled_changed = self._download(self.config.s3_artifact_dir, [self.config.s3_compiled_model_name])
+        if model_changed and not compiled_changed:
+            # Compiled from an older model (or the new one couldn't be compiled), never serve it with the new one
+            logger.warning(f"{self.config.s3_compiled_model_name} is older than {self.config.s3_model_name}, removing it")
+            self._remove(self.config.s3_compiled_model_name)
+        return self._download(self.config.s3_artifact_dir, [self.config.s3_preprocessor_name, self.config.s3_reference_sketch_name]) \
+            or model_changed or compiled_changed
+
+    def matches_manifest(self) -> bool:
+        """
+        Whether every artifact on disk is the one the manifest lists. Optional artifacts the
+        manifest's version doesn't have are removed, rather than served from an older version.
+        Always True without a manifest.
+        """
+        manifest = self.read_manifest()
+        if manifest is None:
+            return True
+        stale = [file_name for file_name, etag in manifest["artifacts"].items() if S3Storage.local_etag(self._path(file_name)) != etag]
+        if stale:
+            logger.warning(f"{stale} on disk don't match version {manifest['version']} yet")
+            return False
+        for file_name in (self.config.s3_compiled_model_name, self.config.s3_reference_sketch_name):
+            if file_name not in manifest["artifacts"] and os.path.exists(self._path(file_name)):
+                logger.info(f"Version {manifest['version']} has no {file_name}, removing the older one")
+                self._remove(file_name)
+        return True
+
+    def upload_drift_snapshot(self, snapshot_path: str) -> bool:
+        """
+        Publishes the online drift snapshot next to the model artifacts, where the offline drift check reads it.
+        Blocking, like `sync`.
+
+        Returns:
+            bool: True if it was uploaded.
+        """
+        if not self.config.s3_drift_snapshot_name:
+            return False
+        return self.store.upload_file(
+            file_path=snapshot_path,
+            bucket_name=self.config.s3_bucket_name,
+            folder_path=self.config.s3_artifact_dir,
+            file_name=self.config.s3_drift_snapshot_name
+        )
+
+    def load_from_disk(self) -> bool:
+        """Loads the downloaded artifacts into the registry, if they are present and all of one version."""
+        if not (os.path.exists(self.model_path) and os.path.exists(self.preprocessor_path)):
+            logger.info("Model artifacts not downloaded yet, registry left empty.")
+            return False
+        if not self.matches_manifest():
+            logger.info("Artifacts on disk are a mix of versions, registry left as is.")
+            return False
+        manifest = self.read_manifest()
+
+        self.registry.load(
+            self.model_path,
+            self.preprocessor_path,
+            compiled_model_path=self.compiled_model_path if os.path.exists(self.compiled_model_path) else None,
+            compiled_model_max_rows=self.config.compiled_model_max_rows,
+            # The pushed version, or for artifacts pushed without a manifest the model's S3 ETag
+            version=manifest["version"] if manifest is not None else S3Storage.local_etag(self.model_path),
+            reference_sketch_path=self.reference_sketch_path if os.path.exists(self.reference_sketch_path) else None,
+        )
+        return True
+
+    def sync(self) -> bool:
+        """
+        Downloads new artifacts and reloads the registry when they changed.
+
+        Returns:
+            bool: True if the registry holds a model afterwards.
+        """
+        try:
+            changed = self.download()
+        except Exception as e:
+            logger.error(f"Artifact download failed, serving what is on disk: {e}")
+            changed = False
+
+        if changed or not self.registry.is_loaded:
+            try:
+                self.load_from_disk()
+            except Exception as e:
+                logger.error(f"Failed to load artifacts into the registry: {e}")
+
+        return self.registry.is_loaded
+
+    async def poll(self, interval_seconds: float):
+        """Re-syncs every `interval_seconds` until cancelled, retrying sooner while not ready."""
+        while True:
+            await asyncio.sleep(interval_seconds if self.registry.is_loaded else min(interval_seconds, NOT_READY_RETRY_SECONDS))
+            await asyncio.to_thread(self.sync)
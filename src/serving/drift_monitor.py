@@ -0,0 +1,185 @@
+import asyncio
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from src.logger import logging as logger
+from src.monitoring.online import StreamingHistogram, reference_shares
+from src.serving.metrics import ONLINE_DRIFT_PSI, ONLINE_DRIFT_ROWS, ONLINE_FRAUD_RATE, ONLINE_REFERENCE_FRAUD_RATE
+from src.serving.model_registry import LoadedModel
+
+
+class DriftMonitor:
+    """
+    Tracks the served traffic against the reference sketch of the model serving it.
+
+    `observe` is called with every scored batch: the preprocessed feature matrix
+    and the predicted fraud probabilities are binned into a StreamingHistogram
+    over the reference quantile bins, a fixed amount of work per row. Every
+    `interval_seconds` the PSI of each feature (and of the predictions) against
+    the reference is exported as Prometheus gauges, the histograms are written as
+    JSON to `snapshot_path` and handed to `publish` (the app uploads them to S3 for
+    the offline drift check), and the counts are decayed so the scores follow
+    recent traffic.
+
+    Everything runs on the event loop thread (the executor hands results back
+    there), so there are no locks on the request path. Only the snapshot write and
+    upload are done on a worker thread, from a copy of the counts. The histograms restart
+    when a new model version is served, since its reference differs.
+    """
+
+    def __init__(self, snapshot_path: str, interval_seconds: float = 60, decay: float = 0.5, min_rows: int = 200,
+                 publish: Optional[Callable[[str], bool]] = None):
+        if not 0.0 <= decay <= 1.0:
+            raise ValueError(f"Drift monitor decay must be between 0 and 1, got {decay}")
+        self.snapshot_path = snapshot_path
+        self.interval_seconds = interval_seconds
+        self.decay = decay
+        self.min_rows = min_rows
+        # Called with snapshot_path after every write, blocking
+        self.publish = publish
+        self.version: Optional[str] = None
+        self._reference: Dict[str, List[float]] = {}
+        self._histogram: Optional[StreamingHistogram] = None
+        # Positions of the histogram's feature columns in the served feature matrix
+        self._feature_index: Optional[np.ndarray] = None
+        self._predicted_fraud = 0.0
+        self._started_at = time.time()
+        self._task: Optional[asyncio.Task] = None
+
+    def _reset(self, loaded: LoadedModel):
+        self.version = loaded.version
+        self._started_at = time.time()
+        self._predicted_fraud = 0.0
+        # The previous version's scores, they must not outlive it even when this one isn't monitored
+        ONLINE_DRIFT_PSI.clear()
+        sketch = loaded.reference_sketch
+        if sketch is None:
+            self._histogram = None
+            return
+
+        features = list(loaded.features)
+        missing = [name for name in sketch.columns if name not in features]
+        if missing:
+            logger.warning(f"Served features lack the sketched columns {missing}, drift monitoring is off for version {loaded.version}")
+            self._histogram = None
+            return
+
+        self._histogram = StreamingHistogram.from_sketch(sketch)
+        self._reference = reference_shares(sketch)
+        self._feature_index = np.array([features.index(name) for name in sketch.columns])
+        if sketch.prediction is not None:
+            ONLINE_REFERENCE_FRAUD_RATE.set(sketch.prediction["mean"])
+
+    def observe(self, loaded: LoadedModel, X: np.ndarray, labels: np.ndarray, fraud_proba: np.ndarray):
+        """
+        Adds a scored batch.
+
+        Args:
+            loaded (LoadedModel): the snapshot that scored it.
+            X (np.ndarray): preprocessed features, in `loaded.features` order.
+            labels (np.ndarray): predicted labels.
+            fraud_proba (np.ndarray): predicted fraud probabilities.
+        """
+        if loaded.version != self.version:
+            self._reset(loaded)
+        if self._histogram is None:
+            return
+
+        X = np.asarray(X, dtype=np.float64)[:, self._feature_index]
+        if "prediction" in self._reference:
+            X = np.column_stack([X, fraud_proba])
+        self._histogram.update(X)
+        self._predicted_fraud += float(np.count_nonzero(labels == 1))
+
+    def evaluate(self) -> Optional[dict]:
+        """
+        Refreshes the gauges and returns the snapshot, or None while nothing is monitored.
+        The PSI gauges are only set once `min_rows` rows are in, a handful of rows says little.
+        """
+        if self._histogram is None:
+            return None
+
+        rows = self._histogram.rows()
+        psi = self._histogram.psi(self._reference)
+        ONLINE_DRIFT_ROWS.set(rows)
+        if rows:
+            ONLINE_FRAUD_RATE.set(self._predicted_fraud / rows)
+        if rows >= self.min_rows:
+            for name, value in psi.items():
+                ONLINE_DRIFT_PSI.labels(name).set(value)
+
+        return {
+            "model_version": self.version,
+            "started_at": self._started_at,
+            "written_at": time.time(),
+            "decay": self.decay,
+            "rows": rows,
+            "predicted_fraud_rate": self._predicted_fraud / rows if rows else None,
+            "psi": {name: None if math.isnan(value) else value for name, value in psi.items()},
+            "histograms": self._histogram.to_dict(),
+        }
+
+    def save_snapshot(self, snapshot: dict):
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        # Atomic, a reader never sees a half-written snapshot
+        os.replace(tmp_path, self.snapshot_path)
+
+    def write_snapshot(self, snapshot: dict):
+        """Saves the snapshot and publishes it. Failures are logged, monitoring goes on."""
+        try:
+            self.save_snapshot(snapshot)
+        except OSError as e:
+            logger.error(f"Failed to write the drift snapshot to {self.snapshot_path}: {e}")
+            return
+        if self.publish is None:
+            return
+        try:
+            published = self.publish(self.snapshot_path)
+        except Exception as e:
+            logger.error(f"Failed to publish the drift snapshot {self.snapshot_path}: {e}")
+            return
+        if not published:
+            logger.warning(f"Drift snapshot {self.snapshot_path} was not published")
+
+    async def tick(self):
+        histogram = self._histogram
+        snapshot = self.evaluate()
+        if snapshot is None:
+            return
+        histogram.decay(self.decay)
+        self._predicted_fraud *= self.decay
+        await asyncio.to_thread(self.write_snapshot, snapshot)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.tick()
+            except Exception as e:
+                # A failed tick loses one snapshot, not the monitoring
+                logger.error(f"Drift monitor tick failed: {e}")
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Drift monitor started, scoring every {self.interval_seconds}s into {self.snapshot_path}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Keep what was seen since the last tick
+        snapshot = self.evaluate()
+        if snapshot is not None:
+            await asyncio.to_thread(self.write_snapshot, snapshot)
+        logger.info("Drift monitor stopped")
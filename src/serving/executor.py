@@ -0,0 +1,137 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from src.logger import logging as logger
+from src.serving.metrics import EXECUTOR_EXECUTION_SECONDS, EXECUTOR_IN_FLIGHT, EXECUTOR_QUEUE_WAIT_SECONDS, PREDICTION_STAGE_SECONDS
+from src.serving.model_registry import LoadedModel, ModelRegistry, registry
+from src.serving.predictor import score_records
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+# Called on the event loop with every scored batch: (snapshot, preprocessed features, labels, fraud probabilities)
+ResultObserver = Callable[[LoadedModel, np.ndarray, np.ndarray, np.ndarray], None]
+
+
+def _timed_predict(loaded: LoadedModel, records: List[dict]):
+    # Timings travel back with the result so stages run in worker processes are observed by the parent
+    timings = {}
+    started = time.time()
+    labels, fraud_proba, X_processed = score_records(loaded, records, timings)
+    return labels, fraud_proba, X_processed, started, time.time(), timings
+
+
+def _init_worker(load_kwargs: dict):
+    # Each worker process keeps its own registry, preloaded with the snapshot current at pool start
+    registry.load(**load_kwargs)
+
+
+def _warm_worker():
+    return multiprocessing.current_process().pid
+
+
+def _predict_in_worker(load_kwargs: dict, records: List[dict]):
+    # Reload inside the worker when the parent has hot-swapped to a new version since
+    if registry.version != load_kwargs["version"]:
+        registry.load(**load_kwargs)
+    return _timed_predict(registry.get(), records)
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound preprocessing and prediction off the event loop.
+
+    Modes:
+        inline:  run on the event loop itself (no offloading).
+        thread:  a thread pool; the sklearn tree walk and most NumPy work release the GIL.
+        process: a process pool where every worker preloads the model once and reloads
+                 it only when the served version changes.
+
+    At most `max_concurrency` calls are admitted at once; the rest wait on a
+    semaphore, and that wait plus the pool's own queueing is exported as queue
+    wait time next to the execution time.
+
+    `observer`, if given, sees every scored batch together with its preprocessed
+    features once the result is back on the event loop (e.g. a DriftMonitor).
+    """
+
+    def __init__(self, model_registry: ModelRegistry, mode: str = "thread", max_workers: int = 4, max_concurrency: int = 8,
+                 observer: Optional[ResultObserver] = None):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode '{mode}', expected one of {EXECUTOR_MODES}")
+        self.registry = model_registry
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.observer = observer
+        self._pool: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def start(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        elif self.mode == "process":
+            initargs = (self.registry.get().load_kwargs,) if self.registry.is_loaded else None
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                # spawn: forking a process that already runs the event loop and boto3 threads is unsafe
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker if initargs else None,
+                initargs=initargs or (),
+            )
+            # Spawn every worker (and let it preload the model) before the first request arrives
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[loop.run_in_executor(self._pool, _warm_worker) for _ in range(self.max_workers)])
+        logger.info(f"Inference executor started in {self.mode} mode with {self.max_workers} workers")
+
+    async def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        logger.info("Inference executor stopped")
+
+    async def run(self, records: List[dict], loaded: Optional[LoadedModel] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores `records` on a worker and returns their labels and fraud probabilities.
+
+        Args:
+            records (List[dict]): raw transaction records.
+            loaded (LoadedModel, optional): snapshot to score with. Defaults to the registry's current one.
+        """
+        if self._semaphore is None:
+            raise RuntimeError("Inference executor is not running")
+
+        loaded = loaded if loaded is not None else self.registry.get()
+        submitted = time.time()
+
+        async with self._semaphore:
+            EXECUTOR_IN_FLIGHT.inc()
+            try:
+                if self.mode == "inline":
+                    labels, fraud_proba, X_processed, started, finished, timings = _timed_predict(loaded, records)
+                elif self.mode == "thread":
+                    labels, fraud_proba, X_processed, started, finished, timings = await asyncio.get_running_loop().run_in_executor(
+                        self._pool, _timed_predict, loaded, records
+                    )
+                else:
+                    labels, fraud_proba, X_processed, started, finished, timings = await asyncio.get_running_loop().run_in_executor(
+                        self._pool, _predict_in_worker, loaded.load_kwargs, records
+                    )
+            finally:
+                EXECUTOR_IN_FLIGHT.dec()
+
+        EXECUTOR_QUEUE_WAIT_SECONDS.observe(max(started - submitted, 0.0))
+        EXECUTOR_EXECUTION_SECONDS.observe(finished - started)
+        for stage, seconds in timings.items():
+            PREDICTION_STAGE_SECONDS.labels(stage).observe(seconds)
+        if self.observer is not None:
+            try:
+                self.observer(loaded, X_processed, labels, fraud_proba)
+            except Exception as e:
+                # Monitoring must never fail a prediction
+                logger.error(f"Result observer failed: {e}")
+        return labels, fraud_proba
@@ -0,0 +1,100 @@
+from prometheus_client import Counter, Gauge, Histogram, Info
+
+# All serving metrics are registered on the default prometheus_client registry,
+# which is the one exposed by the Instrumentator on /metrics.
+
+MODEL_LOAD_SECONDS = Histogram(
+    "model_registry_load_seconds",
+    "Time spent loading the model and preprocessor into the registry.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+MODEL_LOADED_TIMESTAMP = Gauge(
+    "model_registry_loaded_timestamp_seconds",
+    "Unix time at which the currently served model was loaded.",
+)
+
+MODEL_RELOADS = Counter(
+    "model_registry_reloads_total",
+    "Number of times a model version was loaded into the registry.",
+)
+
+MODEL_VERSION = Info(
+    "model_registry_model",
+    "Version of the model currently served by the registry.",
+)
+
+BATCHER_QUEUE_DEPTH = Gauge(
+    "micro_batcher_queue_depth",
+    "Single-row prediction requests waiting to be coalesced into a batch.",
+)
+
+BATCHER_BATCH_SIZE = Histogram(
+    "micro_batcher_batch_size",
+    "Number of rows scored per coalesced micro-batch.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+
+EXECUTOR_QUEUE_WAIT_SECONDS = Histogram(
+    "inference_executor_queue_wait_seconds",
+    "Time an inference call waited for a free worker before it started executing.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+EXECUTOR_EXECUTION_SECONDS = Histogram(
+    "inference_executor_execution_seconds",
+    "Time spent executing an inference call on a worker.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+EXECUTOR_IN_FLIGHT = Gauge(
+    "inference_executor_in_flight",
+    "Inference calls currently admitted to the executor.",
+)
+
+PREDICTION_STAGE_SECONDS = Histogram(
+    "prediction_stage_seconds",
+    "Time spent in each stage of the prediction path.",
+    ["stage"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+ARTIFACT_DOWNLOADS = Counter(
+    "artifact_downloads_total",
+    "Artifacts transferred from S3 (downloads skipped because the local copy was current are not counted).",
+    ["artifact"],
+)
+
+ARTIFACT_DOWNLOAD_BYTES = Counter(
+    "artifact_download_bytes_total",
+    "Bytes transferred from S3 per artifact.",
+    ["artifact"],
+)
+
+ARTIFACT_DOWNLOAD_SECONDS = Counter(
+    "artifact_download_seconds_total",
+    "Time spent transferring artifacts from S3.",
+    ["artifact"],
+)
+
+ONLINE_DRIFT_PSI = Gauge(
+    "online_drift_psi",
+    "Population stability index of the served traffic against the model's reference sketch, per feature "
+    "(`prediction` is the predicted fraud probability).",
+    ["feature"],
+)
+
+ONLINE_DRIFT_ROWS = Gauge(
+    "online_drift_rows",
+    "Rows behind the current online drift scores (decayed, so older traffic counts for less).",
+)
+
+ONLINE_FRAUD_RATE = Gauge(
+    "online_predicted_fraud_rate",
+    "Share of served rows predicted as fraud (decayed like the drift histograms).",
+)
+
+ONLINE_REFERENCE_FRAUD_RATE = Gauge(
+    "online_reference_fraud_rate",
+    "Mean fraud probability the served model predicted on its test split at training time.",
+)
@@ -0,0 +1,141 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+import numpy as np
+from src.logger import logging as logger
+from src.serving.metrics import BATCHER_BATCH_SIZE, BATCHER_QUEUE_DEPTH
+
+PredictFn = Callable[[List[dict]], Awaitable[Tuple[np.ndarray, np.ndarray]]]
+
+
+@dataclass
+class _PendingRequest:
+    records: List[dict]
+    future: asyncio.Future
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into a single batched call.
+
+    Requests are queued and a background task flushes them either when
+    `max_batch_size` rows have accumulated or when the oldest request has
+    waited `max_wait_ms`, whichever comes first. One preprocess + predict is
+    run over the concatenated records and each waiting future gets its own slice
+    of the labels and probabilities back.
+
+    `predict_fn` is awaited, so a batch can be handed to a worker pool while the
+    next one is being collected. When a batch fails, its requests are retried one
+    at a time so a single malformed record only fails its own request.
+    """
+
+    def __init__(self, predict_fn: PredictFn, max_batch_size: int, max_wait_ms: float):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+        # Requests taken off the queue for the batch being collected, not yet handed to a flush
+        self._collecting: List[_PendingRequest] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Micro-batcher started with max_batch_size={self.max_batch_size}, max_wait={self.max_wait * 1000}ms")
+
+    async def stop(self):
+        """Stops collecting, lets the in-flight batches finish and fails the requests still queued."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+        if self._queue is not None:
+            leftover = self._collecting
+            while not self._queue.empty():
+                leftover.append(self._queue.get_nowait())
+            for pending in leftover:
+                if not pending.future.done():
+                    pending.future.set_exception(RuntimeError("Micro-batcher stopped before the request was scored"))
+            BATCHER_QUEUE_DEPTH.set(0)
+            self._collecting = []
+            self._queue = None
+        logger.info("Micro-batcher stopped")
+
+    async def submit(self, records: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Queues `records` for the next batch and waits for its labels and probabilities."""
+        if self._queue is None:
+            raise RuntimeError("Micro-batcher is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingRequest(records=records, future=future))
+        BATCHER_QUEUE_DEPTH.set(self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> List[_PendingRequest]:
+        loop = asyncio.get_running_loop()
+
+        batch = self._collecting = [await self._queue.get()]
+        rows = len(batch[0].records)
+        deadline = loop.time() + self.max_wait
+
+        while rows < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                pending = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(pending)
+            rows += len(pending.records)
+
+        BATCHER_QUEUE_DEPTH.set(self._queue.qsize())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            flush = asyncio.create_task(self._flush(batch))
+            self._collecting = []
+            # Keep a reference so in-flight flushes aren't garbage collected
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[_PendingRequest]):
+        try:
+            await self._predict(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0].future.done():
+                    batch[0].future.set_exception(e)
+                return
+            # Find the culprit(s): every request is scored on its own and only the failing ones get the error
+            logger.warning(f"Micro-batch of {len(batch)} requests failed ({e}), retrying them one at a time")
+            for pending in batch:
+                try:
+                    await self._predict([pending])
+                except Exception as request_error:
+                    if not pending.future.done():
+                        pending.future.set_exception(request_error)
+
+    async def _predict(self, batch: List[_PendingRequest]):
+        records = [record for pending in batch for record in pending.records]
+        BATCHER_BATCH_SIZE.observe(len(records))
+
+        labels, fraud_proba = await self.predict_fn(records)
+
+        offset = 0
+        for pending in batch:
+            size = len(pending.records)
+            if not pending.future.done():
+                pending.future.set_result((labels[offset:offset + size], fraud_proba[offset:offset + size]))
+            offset += size
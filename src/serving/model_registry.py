@@ -0,0 +1,181 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+import joblib
+from src.logger import logging as logger
+from src.feature_transform.compiled_pipeline import CompiledPreprocessor
+from src.model.compiled_forest import CompiledForest
+from src.monitoring.sketch import ReferenceSketch
+from src.serving.metrics import MODEL_LOAD_SECONDS, MODEL_LOADED_TIMESTAMP, MODEL_RELOADS, MODEL_VERSION
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """An immutable snapshot of the artifacts served for one model version."""
+    model: Any
+    preprocessor: Any
+    version: str
+    loaded_at: float
+    compiled_preprocessor: Optional[CompiledPreprocessor] = None
+    compiled_model: Optional[CompiledForest] = None
+    compiled_model_max_rows: Optional[int] = None
+    # What the model was trained on, for monitoring the served traffic
+    reference_sketch: Optional[ReferenceSketch] = None
+    # Arguments to ModelRegistry.load that reproduce this snapshot, e.g. in a worker process
+    load_kwargs: dict = field(default_factory=dict)
+
+    def model_for(self, n_rows: int):
+        """Picks the compiled forest for small batches and the sklearn forest for large ones."""
+        if self.compiled_model is not None:
+            if self.model is None or self.compiled_model_max_rows is None or n_rows <= self.compiled_model_max_rows:
+                return self.compiled_model
+        return self.model
+
+    @property
+    def features(self) -> List[str]:
+        """Names of the preprocessed feature columns, in the order the model sees them."""
+        if self.compiled_preprocessor is not None:
+            return self.compiled_preprocessor.features
+        return self.preprocessor.named_steps['date_age_extractor'].features
+
+
+class ModelRegistry:
+    """
+    Process-wide holder of the model and preprocessor used by the request handlers.
+
+    Artifacts are deserialized once by `load` and published as a single
+    `LoadedModel` snapshot. Handlers call `get` and keep the returned reference
+    for the whole request, so a concurrent hot-swap never mixes a model of one
+    version with a preprocessor of another. The snapshot must be treated as
+    read-only: calling `fit`/`fit_transform` on it would mutate state shared by
+    every in-flight request.
+    """
+
+    def __init__(self):
+        self._current: Optional[LoadedModel] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._current is not None
+
+    @property
+    def version(self) -> Optional[str]:
+        current = self._current
+        return current.version if current is not None else None
+
+    def get(self) -> LoadedModel:
+        """
+        Returns the currently served snapshot.
+
+        Raises:
+            RuntimeError: if no model has been loaded yet.
+        """
+        current = self._current
+        if current is None:
+            raise RuntimeError("Model registry is empty: no model has been loaded yet.")
+        return current
+
+    def load(
+        self,
+        model_path: str,
+        preprocessor_path: str,
+        compiled_model_path: Optional[str] = None,
+        compiled_model_max_rows: Optional[int] = None,
+        version: Optional[str] = None,
+        reference_sketch_path: Optional[str] = None
+    ) -> LoadedModel:
+        """
+        Loads the model and preprocessor from disk and atomically swaps them in.
+
+        Args:
+            model_path (str): path to the serialized model.
+            preprocessor_path (str): path to the serialized preprocessing pipeline.
+            compiled_model_path (str, optional): path to the exported CompiledForest, if any.
+            compiled_model_max_rows (int, optional): largest batch served by the compiled forest.
+                When None and a compiled forest is given, the sklearn model is not loaded at all.
+            version (str, optional): version label. Defaults to a digest of the model file.
+            reference_sketch_path (str, optional): path to the model's ReferenceSketch, if any.
+
+        Returns:
+            LoadedModel: the snapshot that is now being served.
+        """
+        # Serialize loads so two concurrent refreshes don't both pay the deserialization cost
+        with self._lock:
+            start = time.perf_counter()
+            if version is None:
+                version = file_digest(model_path)
+
+            compiled_model = CompiledForest.load(compiled_model_path) if compiled_model_path else None
+            if compiled_model is not None and compiled_model_max_rows is None:
+                model = None
+            else:
+                model = joblib.load(model_path)
+            preprocessor = joblib.load(preprocessor_path)
+            reference_sketch = load_reference_sketch(reference_sketch_path) if reference_sketch_path else None
+
+            loaded = LoadedModel(
+                model=model,
+                preprocessor=preprocessor,
+                version=version,
+                loaded_at=time.time(),
+                compiled_preprocessor=compile_preprocessor(preprocessor),
+                compiled_model=compiled_model,
+                compiled_model_max_rows=compiled_model_max_rows,
+                reference_sketch=reference_sketch,
+                load_kwargs=dict(
+                    model_path=model_path,
+                    preprocessor_path=preprocessor_path,
+                    compiled_model_path=compiled_model_path,
+                    compiled_model_max_rows=compiled_model_max_rows,
+                    version=version,
+                    reference_sketch_path=reference_sketch_path,
+                ),
+            )
+            # A single reference assignment is atomic, readers see either the old or the new snapshot
+            self._current = loaded
+
+            elapsed = time.perf_counter() - start
+            MODEL_LOAD_SECONDS.observe(elapsed)
+            MODEL_RELOADS.inc()
+            MODEL_LOADED_TIMESTAMP.set(loaded.loaded_at)
+            MODEL_VERSION.info({"version": version})
+            logger.info(f"Model registry loaded version {version} in {elapsed:.3f}s")
+
+            return loaded
+
+
+def compile_preprocessor(preprocessor) -> Optional[CompiledPreprocessor]:
+    """Returns the NumPy fast path for `preprocessor`, or None if it can't reproduce it exactly."""
+    try:
+        compiled = CompiledPreprocessor.from_pipeline(preprocessor)
+    except (AttributeError, KeyError, ValueError) as e:
+        logger.warning(f"Preprocessor cannot be compiled, serving it through sklearn: {e}")
+        return None
+
+    if not compiled.matches(preprocessor):
+        logger.warning("Compiled preprocessor does not match the sklearn pipeline, serving it through sklearn")
+        return None
+
+    return compiled
+
+
+def load_reference_sketch(path: str) -> Optional[ReferenceSketch]:
+    """Returns the sketch at `path`, or None if it can't be read: the model is served without drift monitoring."""
+    try:
+        return ReferenceSketch.load(path)
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"Reference sketch {path} cannot be loaded, drift monitoring is off for this model: {e}")
+        return None
+
+
+def file_digest(path: str, length: int = 12) -> str:
+    """Returns a short sha256 hex digest of the file at `path`."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()[:length]
+
+
+registry = ModelRegistry()
@@ -0,0 +1,96 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from src.entity.prediction_input import records_to_frame
+from src.serving.model_registry import LoadedModel
+
+FRAUD_CLASS = 1
+
+# Stage label reported for each step of the training pipeline
+PIPELINE_STAGES = {"date_age_extractor": "date_parse", "scaler": "scale"}
+
+
+@contextmanager
+def _stage(timings: Optional[Dict[str, float]], stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def predict_frame(loaded: LoadedModel, input_df: pd.DataFrame, timings: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scores a frame of raw transactions with a single preprocess and predict call.
+
+    Args:
+        loaded (LoadedModel): the registry snapshot to score with.
+        input_df (pd.DataFrame): raw transactions, one row per transaction.
+        timings (dict, optional): filled with the seconds spent per stage (date_parse, scale, predict).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: predicted labels and fraud probabilities, one per row.
+    """
+    X_processed = preprocess_frame(loaded, input_df, timings)
+    return _predict_processed(loaded.model_for(len(input_df)), X_processed, loaded.features, timings)
+
+
+def predict_records(loaded: LoadedModel, records: List[dict], timings: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scores raw transaction records, skipping pandas preprocessing when the
+    registry holds a compiled preprocessor.
+    """
+    labels, fraud_proba, _ = score_records(loaded, records, timings)
+    return labels, fraud_proba
+
+
+def score_records(loaded: LoadedModel, records: List[dict], timings: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Same as `predict_records`, also returning the preprocessed feature matrix the model scored."""
+    X_processed = preprocess_records(loaded, records, timings)
+    labels, fraud_proba = _predict_processed(loaded.model_for(len(records)), X_processed, loaded.features, timings)
+    return labels, fraud_proba, X_processed
+
+
+def preprocess_frame(loaded: LoadedModel, input_df: pd.DataFrame, timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """The preprocessed feature matrix of a frame of raw transactions, columns in `loaded.features` order."""
+    # Same as preprocessor.transform(input_df), one step at a time so each stage can be timed
+    X_processed = input_df
+    for name, step in loaded.preprocessor.steps:
+        with _stage(timings, PIPELINE_STAGES.get(name, name)):
+            X_processed = step.transform(X_processed)
+    return np.asarray(X_processed)
+
+
+def preprocess_records(loaded: LoadedModel, records: List[dict], timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Same as `preprocess_frame` for raw records, through the compiled preprocessor when there is one."""
+    compiled = loaded.compiled_preprocessor
+    if compiled is None:
+        return preprocess_frame(loaded, records_to_frame(records), timings)
+
+    with _stage(timings, "date_parse"):
+        X_processed = compiled.extract(records)
+    with _stage(timings, "scale"):
+        X_processed = compiled.scale(X_processed)
+    return X_processed
+
+
+def _predict_processed(model, X_processed: np.ndarray, features: List[str], timings: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    if hasattr(model, "feature_names_in_"):
+        # The sklearn forest was fitted on named columns, keep the names so it doesn't warn on every call
+        X_processed = pd.DataFrame(X_processed, columns=features)
+
+    # predict() is argmax over predict_proba(), so derive both from one pass over the forest
+    with _stage(timings, "predict"):
+        proba = model.predict_proba(X_processed)
+    labels = model.classes_.take(np.argmax(proba, axis=1))
+    fraud_proba = proba[:, list(model.classes_).index(FRAUD_CLASS)]
+
+    return labels, fraud_proba
+
+
+def label_to_status(label) -> str:
+    return "Fraud" if label == FRAUD_CLASS else "Not Fraud"
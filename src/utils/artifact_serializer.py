@@ -15,6 +15,12 @@ class ArtifactSerializer:
                 "__class__": "DataIngestionArtifact",
                 "data_ingestion_unzip_file_path": obj.data_ingestion_unzip_file_path,
                 "status": obj.status,
+                "cache_hit": obj.cache_hit,
+                "row_count": obj.row_count,
+                "checksum": obj.checksum,
+                "new_data_path": obj.new_data_path,
+                "new_rows": obj.new_rows,
+                "watermark": obj.watermark,
             }
         elif isinstance(obj, DataTransformationArtifact):
             return {
@@ -22,6 +28,10 @@ class ArtifactSerializer:
                 "transformed_object_file_path": obj.transformed_object_file_path,
                 "transformed_file_path": obj.transformed_file_path,
                 "status": obj.status,
+                "cache_hit": obj.cache_hit,
+                "new_data_path": obj.new_data_path,
+                "new_rows": obj.new_rows,
+                "refit": obj.refit,
             }
         elif isinstance(obj, ModelTrainingArtifact):
             return {
@@ -30,6 +40,12 @@ class ArtifactSerializer:
                 "f1_score": obj.f1_score,
                 "recall_score": obj.recall_score,
                 "precision_score": obj.precision_score,
+                "compiled_model_path": obj.compiled_model_path,
+                "reference_sketch_path": obj.reference_sketch_path,
+                "n_estimators": obj.n_estimators,
+                "incremental": obj.incremental,
+                "search_results_path": obj.search_results_path,
+                "reused_model": obj.reused_model,
             }
         else:
             raise TypeError(f"Object of type {obj.__class__.__name__} is not serializable by ArtifactSerializer")
@@ -46,12 +62,22 @@ class ArtifactSerializer:
             return DataIngestionArtifact(
                 data_ingestion_unzip_file_path=data["data_ingestion_unzip_file_path"],
                 status=data["status"],
+                cache_hit=data.get("cache_hit", False),
+                row_count=data.get("row_count"),
+                checksum=data.get("checksum"),
+                new_data_path=data.get("new_data_path"),
+                new_rows=data.get("new_rows"),
+                watermark=data.get("watermark"),
             )
         elif class_name == "DataTransformationArtifact":
             return DataTransformationArtifact(
                 transformed_object_file_path=data["transformed_object_file_path"],
                 transformed_file_path=data["transformed_file_path"],
                 status=data["status"],
+                cache_hit=data.get("cache_hit", False),
+                new_data_path=data.get("new_data_path"),
+                new_rows=data.get("new_rows"),
+                refit=data.get("refit", True),
             )
         elif class_name == "ModelTrainingArtifact":
             return ModelTrainingArtifact(
@@ -59,6 +85,12 @@ class ArtifactSerializer:
                 f1_score=data["f1_score"],
                 precision_score= data["precision_score"],
                 recall_score= data["recall_score"],
+                compiled_model_path=data.get("compiled_model_path", ""),
+                reference_sketch_path=data.get("reference_sketch_path", ""),
+                n_estimators=data.get("n_estimators", 0),
+                incremental=data.get("incremental", False),
+                search_results_path=data.get("search_results_path", ""),
+                reused_model=data.get("reused_model", False),
             )
         else:
             raise ValueError(f"Unknown class name for deserialization: {class_name}")
\ No newline at end of file
@@ -4,10 +4,12 @@ import yaml
 from src.logger import logging as logger
 import json
 import joblib
+import numpy as np
+import pandas as pd
 from ensure import ensure_annotations
 from box import ConfigBox
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, List, Optional, Union
 
 
 
@@ -131,3 +133,159 @@ def get_size(path: Path) -> str:
     """
     size_in_kb = round(os.path.getsize(path)/1024)
     return f"~ {size_in_kb} KB"
+
+
+# File extension used for each supported tabular format
+TABLE_FORMATS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+def table_path(path: Union[str, Path], table_format: str) -> Path:
+    """returns `path` with the extension of `table_format`
+
+    Args:
+        path (Union[str, Path]): path of the table
+        table_format (str): one of csv, parquet or arrow
+
+    Raises:
+        ValueError: if the format is not supported
+
+    Returns:
+        Path: path with the format's extension
+    """
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(f"Unsupported table format '{table_format}', expected one of {list(TABLE_FORMATS)}")
+    return Path(path).with_suffix(TABLE_FORMATS[table_format])
+
+
+def compact_dtypes(df: pd.DataFrame, float32: bool = False, int8_columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """downcasts float64 columns to float32 (optional) and the given integer columns to int8
+
+    Args:
+        df (pd.DataFrame): dataframe to downcast
+        float32 (bool, optional): downcast float64 columns to float32. Defaults to False.
+        int8_columns (List[str], optional): integer columns, e.g. labels, stored as int8 when present
+
+    Returns:
+        pd.DataFrame: dataframe with compact dtypes
+    """
+    dtypes = {column: np.int8 for column in int8_columns or [] if column in df.columns}
+    if float32:
+        dtypes.update({column: np.float32 for column in df.columns if df[column].dtype == np.float64})
+    return df.astype(dtypes, copy=False)
+
+
+def table_files(path: Union[str, Path]) -> List[Path]:
+    """returns the files a table is stored in: the file itself, or the sorted part-files of a directory
+    (including those of its batch subdirectories)
+
+    Args:
+        path (Union[str, Path]): a table file, or a directory of parquet part-files
+
+    Returns:
+        List[Path]: the table's files, in row order
+    """
+    path = Path(path)
+    if path.is_dir():
+        return sorted(path.rglob(f"*{TABLE_FORMATS['parquet']}"))
+    return [path]
+
+
+def load_table(path: Union[str, Path], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """loads a csv, parquet or arrow file, or a directory of parquet part-files, into a dataframe,
+    picking the reader from the extension
+
+    Args:
+        path (Union[str, Path]): path to the table
+        columns (List[str], optional): only read these columns (columnar formats skip the others on disk)
+
+    Returns:
+        pd.DataFrame: the table
+    """
+    suffix = Path(path).suffix
+    if Path(path).is_dir():
+        import pyarrow.parquet as pq
+
+        # Read the parts explicitly so the row order follows their names
+        df = pq.ParquetDataset([str(part) for part in table_files(path)]).read(columns=columns).to_pandas()
+    elif suffix == TABLE_FORMATS["parquet"]:
+        df = pd.read_parquet(path, columns=columns)
+    elif suffix in (TABLE_FORMATS["arrow"], ".feather"):
+        df = pd.read_feather(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    logger.info(f"table loaded from: {path} with shape {df.shape}")
+    return df
+
+
+def iter_table_chunks(path: Union[str, Path], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """streams a csv or parquet table (file or directory of part-files) in chunks of at most `chunk_size` rows
+
+    Args:
+        path (Union[str, Path]): path to the table
+        chunk_size (int): maximum rows per chunk
+
+    Yields:
+        pd.DataFrame: the next chunk, in row order
+    """
+    if Path(path).suffix == TABLE_FORMATS["csv"]:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+
+    import pyarrow.parquet as pq
+
+    for part in table_files(path):
+        for batch in pq.ParquetFile(part).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+class TableWriter:
+    """
+    Writes a dataframe, or a stream of dataframe chunks with the same columns, to one
+    csv, parquet or arrow (IPC file) table, picking the format from the extension.
+
+    Usage:
+        with TableWriter(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.rows = 0
+        self._writer = None
+        self._file = None
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def write(self, df: pd.DataFrame):
+        suffix = self.path.suffix
+        if suffix in (TABLE_FORMATS["parquet"], TABLE_FORMATS["arrow"], ".feather"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                if suffix == TABLE_FORMATS["parquet"]:
+                    self._writer = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    self._writer = pa.ipc.new_file(str(self.path), table.schema)
+            self._writer.write_table(table)
+        else:
+            if self._file is None:
+                self._file = open(self.path, "w", newline="")
+                df.to_csv(self._file, index=False)
+            else:
+                df.to_csv(self._file, index=False, header=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
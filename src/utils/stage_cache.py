@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import hashlib
+import dataclasses
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from src.logger import logging as logger
+
+MANIFEST_FILE_NAME = "stage_manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+def _stat_key(path: Union[str, Path]) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _sha256(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Content-fingerprint cache for one pipeline stage.
+
+    The fingerprint covers the stage's config (the resolved config dataclass) and
+    the content of its input files. The last successful run is recorded in
+    `stage_manifest.json` in the stage's artifact directory, together with the
+    artifact it returned and the size, mtime and sha256 of every output. A later
+    run with the same fingerprint gets that artifact back as long as the outputs
+    are still on disk and unchanged.
+
+    File hashes are memoized by (size, mtime): a file whose stat matches the
+    manifest isn't read again, so a cache hit costs a few stat calls.
+    """
+
+    def __init__(self, stage: str, directory: Union[str, Path]):
+        """
+        Args:
+            stage (str): stage name used in the logs.
+            directory (Union[str, Path]): the stage's artifact directory, where the manifest is kept.
+        """
+        self.stage = stage
+        self.manifest_path = Path(directory) / MANIFEST_FILE_NAME
+        self._manifest = self._read_manifest()
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _known_digest(self, path: Union[str, Path]) -> Optional[str]:
+        """The recorded sha256 of `path`, if its size and mtime still match the manifest."""
+        recorded = self._manifest.get("files", {}).get(str(path))
+        if recorded and os.path.exists(path) and recorded["stat"] == _stat_key(path):
+            return recorded["sha256"]
+        return None
+
+    def file_digest(self, path: Union[str, Path]) -> str:
+        return self._known_digest(path) or _sha256(path)
+
+    def fingerprint(self, config: Any, input_paths: List[Union[str, Path]]) -> str:
+        """
+        Fingerprints the stage's config and inputs.
+
+        Args:
+            config (Any): the stage's config dataclass (or any JSON-serializable value).
+            input_paths (List[Union[str, Path]]): files whose content the stage output depends on.
+
+        Returns:
+            str: sha256 hex digest.
+        """
+        if dataclasses.is_dataclass(config):
+            config = dataclasses.asdict(config)
+        payload = {
+            "config": config,
+            "inputs": {str(path): self.file_digest(path) for path in input_paths},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def lookup(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the recorded artifact fields for `fingerprint`, or None on a miss.
+        """
+        reason = None
+        if self._manifest.get("fingerprint") != fingerprint:
+            reason = "inputs or config changed" if self._manifest else "no previous run"
+        else:
+            for path, recorded in self._manifest["outputs"].items():
+                if not os.path.exists(path):
+                    reason = f"{path} is missing"
+                # A changed stat alone (e.g. after a dvc checkout) isn't a miss if the content is the same
+                elif recorded["stat"] != _stat_key(path) and recorded["sha256"] != _sha256(path):
+                    reason = f"{path} was modified"
+                if reason:
+                    break
+
+        if reason:
+            logger.info(f"{self.stage} cache miss: {reason}")
+            return None
+
+        logger.info(f"{self.stage} cache hit for fingerprint {fingerprint[:12]}, reusing the previous outputs")
+        return self._manifest["artifact"]
+
+    def store(self, fingerprint: str, artifact: Dict[str, Any], output_paths: List[Union[str, Path]],
+              input_paths: List[Union[str, Path]] = ()):
+        """
+        Records a successful run.
+
+        Args:
+            fingerprint (str): fingerprint the run was computed for.
+            artifact (Dict[str, Any]): artifact fields to return on a later hit.
+            output_paths (List[Union[str, Path]]): files the stage produced.
+            input_paths (List[Union[str, Path]], optional): inputs whose digests are memoized for the next run.
+        """
+        outputs = {str(path): {"stat": _stat_key(path), "sha256": _sha256(path)} for path in output_paths}
+        files = {str(path): {"stat": _stat_key(path), "sha256": self.file_digest(path)} for path in input_paths}
+        files.update(outputs)
+
+        self._manifest = {
+            "stage": self.stage,
+            "fingerprint": fingerprint,
+            "created_at": time.time(),
+            "artifact": artifact,
+            "outputs": outputs,
+            "files": files,
+        }
+        os.makedirs(self.manifest_path.parent, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self._manifest, f, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+        logger.info(f"{self.stage} cache entry saved to {self.manifest_path}")
@@ -0,0 +1,123 @@
+import json
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.entity.config_entity import PredictionConfig
+from src.serving.artifact_sync import ArtifactSynchronizer
+
+BUCKET = "artifacts"
+FOLDER = "deploy"
+
+
+class RecordingRegistry:
+    """Stands in for ModelRegistry, records what would have been swapped in."""
+
+    def __init__(self):
+        self.loads = []
+
+    @property
+    def is_loaded(self):
+        return bool(self.loads)
+
+    @property
+    def version(self):
+        return self.loads[-1]["version"] if self.loads else None
+
+    def load(self, model_path, preprocessor_path, **kwargs):
+        self.loads.append(dict(kwargs, model=open(model_path, "rb").read(), preprocessor=open(preprocessor_path, "rb").read()))
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def synchronizer(s3_client, tmp_path):
+    config = PredictionConfig(
+        s3_bucket_name=BUCKET,
+        s3_model_name="model.jbl",
+        s3_artifact_dir=FOLDER,
+        s3_preprocessor_name="preprocessor.jbl",
+        s3_compiled_model_name="compiled_model.jbl",
+        s3_reference_sketch_name="reference_sketch.json",
+        s3_manifest_name="manifest.json",
+        s3_drift_snapshot_name=None,
+        download_location=str(tmp_path / "deploy"),
+        compiled_model_max_rows=None,
+    )
+    return ArtifactSynchronizer(config, RecordingRegistry())
+
+
+def push(s3_client, version, artifacts, manifest=None):
+    """Uploads `artifacts` to a version folder and points the manifest at them, like ModelEvalPush."""
+    folder = f"{FOLDER}/versions/{version}"
+    etags = {}
+    for file_name, body in artifacts.items():
+        s3_client.put_object(Bucket=BUCKET, Key=f"{folder}/{file_name}", Body=body)
+        etags[file_name] = s3_client.head_object(Bucket=BUCKET, Key=f"{folder}/{file_name}")["ETag"].strip('"')
+    manifest = manifest or {"version": version, "folder": folder, "artifacts": etags}
+    s3_client.put_object(Bucket=BUCKET, Key=f"{FOLDER}/manifest.json", Body=json.dumps(manifest))
+    return manifest
+
+
+def test_version_is_swapped_in_once_complete(s3_client, synchronizer):
+    push(s3_client, "v1", {"model.jbl": b"model 1", "preprocessor.jbl": b"prep 1", "compiled_model.jbl": b"forest 1"})
+
+    assert synchronizer.sync()
+    assert synchronizer.registry.version == "v1"
+    assert synchronizer.registry.loads[-1]["compiled_model_path"].endswith("compiled_model.jbl")
+    # Nothing new, nothing reloaded
+    assert synchronizer.sync()
+    assert len(synchronizer.registry.loads) == 1
+
+
+def test_incomplete_version_is_not_swapped_in(s3_client, synchronizer):
+    push(s3_client, "v1", {"model.jbl": b"model 1", "preprocessor.jbl": b"prep 1"})
+    synchronizer.sync()
+
+    manifest = push(s3_client, "v2", {"model.jbl": b"model 2", "preprocessor.jbl": b"prep 2"})
+    s3_client.delete_object(Bucket=BUCKET, Key=f"{manifest['folder']}/preprocessor.jbl")
+    synchronizer.sync()
+
+    assert synchronizer.registry.version == "v1"
+    assert synchronizer.registry.loads[-1]["preprocessor"] == b"prep 1"
+    assert not synchronizer.matches_manifest()
+
+    s3_client.put_object(Bucket=BUCKET, Key=f"{manifest['folder']}/preprocessor.jbl", Body=b"prep 2")
+    synchronizer.sync()
+    assert synchronizer.registry.version == "v2"
+    assert (synchronizer.registry.loads[-1]["model"], synchronizer.registry.loads[-1]["preprocessor"]) == (b"model 2", b"prep 2")
+
+
+def test_compiled_model_of_an_older_version_is_removed(s3_client, synchronizer):
+    push(s3_client, "v1", {"model.jbl": b"model 1", "preprocessor.jbl": b"prep 1", "compiled_model.jbl": b"forest 1"})
+    synchronizer.sync()
+    push(s3_client, "v2", {"model.jbl": b"model 2", "preprocessor.jbl": b"prep 1"})
+    synchronizer.sync()
+
+    assert synchronizer.registry.version == "v2"
+    assert synchronizer.registry.loads[-1]["compiled_model_path"] is None
+    assert not os.path.exists(synchronizer.compiled_model_path)
+
+
+def test_without_manifest_a_compiled_model_older_than_the_model_is_removed(s3_client, synchronizer):
+    for file_name, body in {"model.jbl": b"model 1", "preprocessor.jbl": b"prep 1", "compiled_model.jbl": b"forest 1"}.items():
+        s3_client.put_object(Bucket=BUCKET, Key=f"{FOLDER}/{file_name}", Body=body)
+    synchronizer.sync()
+    assert synchronizer.registry.loads[-1]["compiled_model_path"] is not None
+
+    s3_client.put_object(Bucket=BUCKET, Key=f"{FOLDER}/model.jbl", Body=b"model 2")
+    synchronizer.sync()
+
+    assert synchronizer.registry.loads[-1]["model"] == b"model 2"
+    assert synchronizer.registry.loads[-1]["compiled_model_path"] is None
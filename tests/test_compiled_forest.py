@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from src.model.compiled_forest import CompiledForest
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = make_classification(n_samples=3000, n_features=6, n_informative=4, weights=[0.9], random_state=0)
+    return X[:2000], y[:2000], X[2000:], y[2000:]
+
+
+def fit(X, y, **params):
+    return RandomForestClassifier(n_estimators=25, random_state=0, **params).fit(X, y)
+
+
+@pytest.mark.parametrize("params", [
+    dict(),
+    dict(max_depth=4),
+    dict(min_samples_leaf=8, max_features=0.5),
+    dict(class_weight="balanced"),
+])
+def test_predict_proba_matches_forest(data, params):
+    X_train, y_train, X_test, _ = data
+    forest = fit(X_train, y_train, **params)
+    compiled = CompiledForest.from_estimator(forest)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X_test), forest.predict_proba(X_test))
+    np.testing.assert_array_equal(compiled.predict(X_test), forest.predict(X_test))
+
+
+def test_single_rows_match_forest(data):
+    X_train, y_train, X_test, _ = data
+    forest = fit(X_train, y_train)
+    compiled = CompiledForest.from_estimator(forest)
+
+    for row in X_test[:50]:
+        np.testing.assert_array_equal(compiled.predict_proba(row[None, :]), forest.predict_proba(row[None, :]))
+
+
+def test_missing_values_follow_the_forest(data):
+    X_train, y_train, X_test, _ = data
+    rng = np.random.default_rng(0)
+    X_train, X_test = X_train.copy(), X_test.copy()
+    X_train[rng.random(X_train.shape) < 0.05] = np.nan
+    X_test[rng.random(X_test.shape) < 0.2] = np.nan
+    forest = fit(X_train, y_train)
+
+    np.testing.assert_array_equal(CompiledForest.from_estimator(forest).predict_proba(X_test), forest.predict_proba(X_test))
+
+
+def test_multiclass_and_saved_forest_match(tmp_path):
+    X, y = make_classification(n_samples=1500, n_features=6, n_informative=4, n_classes=3, random_state=1)
+    forest = fit(X[:1000], y[:1000])
+    path = str(tmp_path / "compiled_model.jbl")
+    CompiledForest.from_estimator(forest).save(path)
+
+    compiled = CompiledForest.load(path, mmap_mode="r")
+    np.testing.assert_array_equal(compiled.predict_proba(X[1000:]), forest.predict_proba(X[1000:]))
+    np.testing.assert_array_equal(compiled.classes_, forest.classes_)
+
+
+def test_wrong_feature_count_is_rejected(data):
+    X_train, y_train, X_test, _ = data
+    compiled = CompiledForest.from_estimator(fit(X_train, y_train))
+    with pytest.raises(ValueError):
+        compiled.predict_proba(X_test[:, :3])
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.feature_transform.compiled_pipeline import CompiledPreprocessor, PARITY_PROBE_RECORDS, parse_year
+from src.feature_transform.date_age import DateAgeFeatureExtractor
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "notebooks", "data", "fraud_data.csv")
+COLUMNS = ["trans_date_trans_time", "dob", "amt", "city_pop", "merch_long"]
+
+# Values the sklearn pipeline turns into NaN rather than rejecting
+EDGE_RECORDS = [
+    {"trans_date_trans_time": "2019-W01-1", "dob": "1939-11-09", "amt": 14.37, "city_pop": 145, "merch_long": -165.47},
+    {"trans_date_trans_time": "2019-01-04T00:58", "dob": "1939-W45", "amt": 14.37, "city_pop": 145, "merch_long": -165.47},
+    {"trans_date_trans_time": "2019-01-04 00:58:00", "dob": None, "amt": None, "city_pop": 145, "merch_long": -165.47},
+    {"trans_date_trans_time": None, "dob": "09-11-1939", "amt": "966.11", "city_pop": None, "merch_long": None},
+    {"trans_date_trans_time": "2019-001", "dob": "19391109", "amt": 1.0, "city_pop": "3495", "merch_long": "0"},
+    {"trans_date_trans_time": "2019-02-30", "dob": "not a date", "amt": 1.0, "city_pop": 1, "merch_long": 0},
+]
+
+
+@pytest.fixture(scope="module")
+def rows():
+    frame = pd.read_csv(DATA_PATH, usecols=COLUMNS, nrows=2000)
+    return frame[COLUMNS].to_dict("records")
+
+
+@pytest.fixture(scope="module")
+def pipeline(rows):
+    pipeline = Pipeline(steps=[
+        ("date_age_extractor", DateAgeFeatureExtractor()),
+        ("scaler", StandardScaler()),
+    ])
+    return pipeline.fit(pd.DataFrame(rows))
+
+
+def expected(pipeline, records):
+    return np.asarray(pipeline.transform(pd.DataFrame(records, columns=COLUMNS)), dtype=np.float64)
+
+
+def test_batch_matches_pipeline_on_real_rows(pipeline, rows):
+    compiled = CompiledPreprocessor.from_pipeline(pipeline)
+    np.testing.assert_array_equal(compiled.transform_records(rows), expected(pipeline, rows))
+
+
+def test_single_records_match_pipeline(pipeline, rows):
+    compiled = CompiledPreprocessor.from_pipeline(pipeline)
+    for record in rows[:50] + PARITY_PROBE_RECORDS:
+        np.testing.assert_array_equal(compiled.transform_records([record]), expected(pipeline, [record]))
+
+
+@pytest.mark.parametrize("record", EDGE_RECORDS)
+def test_edge_record_matches_pipeline(pipeline, record):
+    compiled = CompiledPreprocessor.from_pipeline(pipeline)
+    np.testing.assert_array_equal(compiled.transform_records([record]), expected(pipeline, [record]))
+
+
+def test_edge_records_in_a_batch_match_pipeline(pipeline, rows):
+    compiled = CompiledPreprocessor.from_pipeline(pipeline)
+    records = rows[:20] + EDGE_RECORDS
+    np.testing.assert_array_equal(compiled.transform_records(records), expected(pipeline, records))
+
+
+def test_matches_probe_records(pipeline):
+    assert CompiledPreprocessor.from_pipeline(pipeline).matches(pipeline)
+
+
+@pytest.mark.parametrize("value", ["2019-W01-1", "2019-W01", "2019-001", None, "not a date"])
+def test_parse_year_agrees_with_pandas(value):
+    parsed = pd.to_datetime(pd.Series([value], dtype=object), format="mixed", errors="coerce").iloc[0]
+    expected_year = float("nan") if pd.isna(parsed) else float(parsed.year)
+    np.testing.assert_equal(parse_year(value), expected_year)
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from src.configuration import config_manager
+from src.configuration.config_manager import ConfigurationManager, cached_section, load_config
+
+CONFIG = """
+artifacts_root: {root}
+model_eval_push:
+  expected_score: {score}
+  preprocessor_object_path: preprocessor.jbl
+  s3_bucket_name: bucket
+  s3_artifact_dir: deploy
+  s3_model_name: model.jbl
+  s3_preprocessor_name: preprocessor.jbl
+  s3_compiled_model_name: compiled_model.jbl
+  s3_reference_sketch_name: reference_sketch.json
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    path = tmp_path / "config.yml"
+    path.write_text(CONFIG.format(root=tmp_path / "artifacts", score=0.5))
+    monkeypatch.setattr(config_manager, "CONFIG_FILE_PATH", path)
+    return path
+
+
+def rewrite(path, score):
+    path.write_text(CONFIG.format(root=path.parent / "artifacts", score=score))
+    stat = os.stat(path)
+    # Move the mtime on explicitly, a rewrite within the filesystem's timestamp resolution wouldn't
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_unchanged_file_is_parsed_once(config_path):
+    assert load_config(config_path) is load_config(config_path)
+
+
+def test_touched_but_unchanged_file_keeps_its_config_objects(config_path):
+    first = ConfigurationManager().get_model_evaluation_config()
+    rewrite(config_path, 0.5)
+
+    assert ConfigurationManager().get_model_evaluation_config() is first
+
+
+def test_edited_file_is_reparsed_and_its_sections_rebuilt(config_path):
+    parsed = load_config(config_path)
+    first = ConfigurationManager().get_model_evaluation_config()
+    rewrite(config_path, 0.9)
+
+    assert load_config(config_path) is not parsed
+    second = ConfigurationManager().get_model_evaluation_config()
+    assert (first.expected_score, second.expected_score) == (0.5, 0.9)
+
+
+def test_cached_section_builds_once_per_parse(config_path):
+    calls = []
+
+    class Manager:
+        def __init__(self):
+            self._parsed = load_config(config_path)
+
+        @cached_section
+        def get_section(self):
+            calls.append(1)
+            return object()
+
+    assert Manager().get_section() is Manager().get_section()
+    assert len(calls) == 1
+
+    rewrite(config_path, 0.9)
+    Manager().get_section()
+    assert len(calls) == 2
+
+
+def test_manager_creates_the_artifacts_root(config_path):
+    ConfigurationManager()
+    assert (config_path.parent / "artifacts").is_dir()
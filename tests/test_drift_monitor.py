@@ -0,0 +1,91 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.monitoring.sketch import ReferenceSketch
+from src.serving.drift_monitor import DriftMonitor
+from src.serving.metrics import ONLINE_DRIFT_PSI
+
+FEATURES = ["amt", "age"]
+
+
+def served(version, sketch=None):
+    """The parts of a LoadedModel the monitor reads."""
+    return SimpleNamespace(version=version, reference_sketch=sketch, features=FEATURES)
+
+
+@pytest.fixture
+def sketch():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"amt": rng.lognormal(3, 1, 5000), "age": rng.normal(45, 15, 5000)})
+    return ReferenceSketch.from_frame(frame, predictions=rng.beta(1, 9, 5000))
+
+
+def observe(monitor, loaded, rows=500, seed=1):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.lognormal(3, 1, rows), rng.normal(45, 15, rows)])
+    proba = rng.beta(1, 9, rows)
+    monitor.observe(loaded, X, (proba > 0.5).astype(int), proba)
+
+
+def psi_gauges():
+    return {sample.labels["feature"] for metric in ONLINE_DRIFT_PSI.collect() for sample in metric.samples}
+
+
+def test_snapshot_is_written_and_published(tmp_path, sketch):
+    published = []
+    monitor = DriftMonitor(str(tmp_path / "snapshot.json"), min_rows=100, publish=lambda path: published.append(path) or True)
+    observe(monitor, served("v1", sketch))
+    asyncio.run(monitor.tick())
+
+    with open(monitor.snapshot_path) as f:
+        snapshot = json.load(f)
+    assert snapshot["model_version"] == "v1" and snapshot["rows"] == 500
+    assert set(snapshot["psi"]) == set(FEATURES) | {"prediction"}
+    assert published == [monitor.snapshot_path]
+
+
+def test_publish_errors_are_logged_not_raised(tmp_path, sketch):
+    def publish(path):
+        raise RuntimeError("S3 is down")
+
+    monitor = DriftMonitor(str(tmp_path / "snapshot.json"), min_rows=100, publish=publish)
+    observe(monitor, served("v1", sketch))
+    asyncio.run(monitor.tick())
+    assert (tmp_path / "snapshot.json").exists()
+
+
+def test_failed_tick_does_not_stop_the_loop(tmp_path):
+    monitor = DriftMonitor(str(tmp_path / "snapshot.json"), interval_seconds=0)
+    ticks = []
+
+    async def tick():
+        ticks.append(len(ticks))
+        if len(ticks) == 1:
+            raise RuntimeError("boom")
+
+    monitor.tick = tick
+
+    async def run():
+        await monitor.start()
+        while len(ticks) < 3:
+            await asyncio.sleep(0)
+        await monitor.stop()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert len(ticks) >= 3
+
+
+def test_version_without_sketch_clears_the_psi_gauges(tmp_path, sketch):
+    monitor = DriftMonitor(str(tmp_path / "snapshot.json"), min_rows=100)
+    observe(monitor, served("v1", sketch))
+    monitor.evaluate()
+    assert psi_gauges() == set(FEATURES) | {"prediction"}
+
+    observe(monitor, served("v2"))
+    assert monitor.evaluate() is None
+    assert psi_gauges() == set()
@@ -0,0 +1,109 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.serving.micro_batcher import MicroBatcher
+
+
+class RecordingPredict:
+    """predict_fn that echoes each record's `x` back and records the size of every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, records):
+        self.calls.append(len(records))
+        if any(record.get("bad") for record in records):
+            raise ValueError("malformed record")
+        x = np.array([record["x"] for record in records])
+        return x, x / 10
+
+
+def records(*xs):
+    return [{"x": x} for x in xs]
+
+
+async def run_batcher(predict, max_batch_size, max_wait_ms, *requests):
+    batcher = MicroBatcher(predict, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    await batcher.start()
+    try:
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(request) for request in requests), return_exceptions=True), timeout=5
+        )
+    finally:
+        await batcher.stop()
+
+
+def test_concurrent_requests_share_one_call_and_get_their_own_slice():
+    predict = RecordingPredict()
+    results = asyncio.run(run_batcher(predict, 100, 50, records(1, 2), records(3), records(4, 5, 6)))
+
+    assert predict.calls == [6]
+    assert [labels.tolist() for labels, _ in results] == [[1, 2], [3], [4, 5, 6]]
+    np.testing.assert_allclose(results[2][1], [0.4, 0.5, 0.6])
+
+
+def test_full_batch_is_flushed_without_waiting():
+    predict = RecordingPredict()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await run_batcher(predict, 4, 10_000, records(1, 2), records(3, 4))
+        return results, loop.time() - started
+
+    results, elapsed = asyncio.run(run())
+    assert predict.calls == [4]
+    assert [labels.tolist() for labels, _ in results] == [[1, 2], [3, 4]]
+    assert elapsed < 5
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    predict = RecordingPredict()
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=100, max_wait_ms=20)
+        await batcher.start()
+        try:
+            first = await asyncio.wait_for(batcher.submit(records(1)), timeout=5)
+            second = await asyncio.wait_for(batcher.submit(records(2)), timeout=5)
+        finally:
+            await batcher.stop()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert predict.calls == [1, 1]
+    assert (first[0].tolist(), second[0].tolist()) == ([1], [2])
+
+
+def test_failed_batch_only_fails_the_malformed_request():
+    predict = RecordingPredict()
+    results = asyncio.run(run_batcher(predict, 100, 50, records(1), [{"x": 2, "bad": True}], records(3)))
+
+    assert predict.calls == [3, 1, 1, 1]
+    assert results[0][0].tolist() == [1]
+    assert isinstance(results[1], ValueError)
+    assert results[2][0].tolist() == [3]
+
+
+def test_stop_fails_requests_still_being_collected():
+    predict = RecordingPredict()
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=100, max_wait_ms=10_000)
+        await batcher.start()
+        waiting = [asyncio.ensure_future(batcher.submit(records(x))) for x in range(3)]
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+        return await asyncio.gather(*waiting, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert predict.calls == []
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_submit_before_start_is_rejected():
+    batcher = MicroBatcher(RecordingPredict(), max_batch_size=1, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.submit(records(1)))
@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from src.entity.config_entity import ModelTrainingConfig
+
+# The Airflow tasks import their scripts as the `scripts` package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "airflow"))
+from scripts.model_trainer import ModelTrainer  # noqa: E402
+
+TREES_PER_INCREMENT = 10
+MAX_ESTIMATORS = 30
+
+
+@pytest.fixture
+def trainer(tmp_path):
+    return ModelTrainer(ModelTrainingConfig(
+        dir_name=tmp_path,
+        training_data_path=tmp_path / "transformed",
+        trained_model_path=tmp_path / "model.jbl",
+        compiled_model_path=tmp_path / "compiled_model.jbl",
+        reference_sketch_path=tmp_path / "reference_sketch.json",
+        reference_data_path=tmp_path / "reference_data.parquet",
+        train_test_ratio=0.2,
+        mlflow_uri="",
+        target_column="is_fraud",
+        n_jobs=1,
+        n_estimators=MAX_ESTIMATORS,
+        incremental=True,
+        trees_per_increment=TREES_PER_INCREMENT,
+        max_estimators=MAX_ESTIMATORS,
+    ))
+
+
+def batches(n_batches, rows=300):
+    X, y = make_classification(n_samples=n_batches * rows, n_features=4, random_state=0)
+    for start in range(0, len(X), rows):
+        yield pd.DataFrame(X[start:start + rows]), pd.Series(y[start:start + rows])
+
+
+def tree_seeds(model):
+    return [tree.random_state for tree in model.estimators_]
+
+
+def test_growths_past_the_cap_never_reuse_a_seed(trainer):
+    data = batches(6)
+    X, y = next(data)
+    model = RandomForestClassifier(n_estimators=MAX_ESTIMATORS, random_state=42).fit(X, y)
+    trees_grown = MAX_ESTIMATORS
+
+    seeds = set(tree_seeds(model))
+    for X, y in data:
+        trainer.grow(model, X, y, seed=42 + trees_grown)
+        trees_grown += TREES_PER_INCREMENT
+
+        assert len(model.estimators_) == MAX_ESTIMATORS
+        new_seeds = tree_seeds(model)[-TREES_PER_INCREMENT:]
+        assert not seeds & set(new_seeds)
+        seeds.update(new_seeds)
+        assert len(set(tree_seeds(model))) == MAX_ESTIMATORS
+
+
+def test_a_fixed_seed_would_repeat_the_kept_trees(trainer):
+    data = batches(2)
+    X, y = next(data)
+    model = RandomForestClassifier(n_estimators=MAX_ESTIMATORS, random_state=42).fit(X, y)
+
+    X, y = next(data)
+    trainer.grow(model, X, y, seed=42)
+    assert len(set(tree_seeds(model))) < MAX_ESTIMATORS
+
+
+def test_training_state_counts_every_tree_grown(trainer):
+    os.makedirs(trainer.config.training_data_path)
+    for batch, (X, y) in enumerate(batches(4)):
+        frame = X.rename(columns=str).assign(is_fraud=y)
+        frame.to_parquet(Path(trainer.config.training_data_path, f"batch-{batch:05d}.parquet"), index=False)
+        ModelTrainer(trainer.config).initiate_model_trainer(None, None, None)
+
+    with open(trainer.training_state_path) as f:
+        state = json.load(f)
+    assert state["n_estimators"] == MAX_ESTIMATORS
+    assert state["trees_grown"] == MAX_ESTIMATORS + 3 * TREES_PER_INCREMENT
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.monitoring.online import SMALL_BATCH_ROWS, StreamingHistogram, reference_shares
+from src.monitoring.sketch import ReferenceSketch
+
+
+@pytest.fixture(scope="module")
+def sketch():
+    rng = np.random.default_rng(0)
+    reference = pd.DataFrame({"amt": rng.lognormal(3, 1, 20000), "age": rng.normal(45, 15, 20000)})
+    return ReferenceSketch.from_frame(reference, predictions=rng.beta(1, 20, 20000))
+
+
+def rows(seed, n, amt_shift=0.0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.lognormal(3 + amt_shift, 1, n), rng.normal(45, 15, n), rng.beta(1, 20, n)])
+
+
+def test_tracks_every_sketched_column_and_the_prediction(sketch):
+    histogram = StreamingHistogram.from_sketch(sketch)
+
+    assert histogram.columns == ["amt", "age", "prediction"]
+    assert set(reference_shares(sketch)) == set(histogram.columns)
+
+
+def test_small_and_large_batches_count_alike(sketch):
+    X = rows(1, 1000)
+    X[::7, 1] = np.nan
+    batched = StreamingHistogram.from_sketch(sketch)
+    batched.update(X)
+    one_by_one = StreamingHistogram.from_sketch(sketch)
+    for start in range(0, len(X), SMALL_BATCH_ROWS):
+        one_by_one.update(X[start:start + SMALL_BATCH_ROWS])
+
+    np.testing.assert_array_equal(batched.counts, one_by_one.counts)
+    np.testing.assert_array_equal(batched.missing, one_by_one.missing)
+    assert batched.rows() == 1000
+    assert batched.missing.tolist() == [0, 143, 0]
+
+
+def test_psi_agrees_with_the_batch_sketch_score(sketch):
+    window = rows(1, 5000, amt_shift=0.5)
+    histogram = StreamingHistogram.from_sketch(sketch)
+    histogram.update(window)
+    scores = histogram.psi(reference_shares(sketch))
+
+    batch_scores = sketch.score(pd.DataFrame(window[:, :2], columns=["amt", "age"]))
+    assert scores["amt"] == pytest.approx(batch_scores.loc["amt", "psi"])
+    assert scores["age"] == pytest.approx(batch_scores.loc["age", "psi"])
+    assert scores["amt"] > 0.2 and scores["prediction"] < 0.05
+
+
+def test_psi_is_nan_before_any_value(sketch):
+    histogram = StreamingHistogram.from_sketch(sketch)
+    histogram.update(np.array([[np.nan, 40.0, 0.1]]))
+    scores = histogram.psi(reference_shares(sketch))
+
+    assert np.isnan(scores["amt"])
+    assert not np.isnan(scores["age"])
+
+
+def test_decay_lets_new_rows_outweigh_old_ones(sketch):
+    histogram = StreamingHistogram.from_sketch(sketch)
+    histogram.update(rows(1, 5000, amt_shift=0.5))
+    drifted = histogram.psi(reference_shares(sketch))["amt"]
+
+    histogram.decay(0.01)
+    assert histogram.rows() == pytest.approx(50)
+    histogram.update(rows(2, 5000))
+    assert histogram.psi(reference_shares(sketch))["amt"] < drifted / 10
+
+
+def test_to_dict_reports_edges_counts_and_missing(sketch):
+    histogram = StreamingHistogram.from_sketch(sketch)
+    histogram.update(np.array([[10.0, np.nan, 0.1]] * 3))
+    summary = histogram.to_dict()
+
+    assert summary["amt"]["bin_edges"] == list(sketch.columns["amt"]["bin_edges"])
+    assert sum(summary["amt"]["counts"]) == 3
+    assert summary["age"]["missing"] == 3 and sum(summary["age"]["counts"]) == 0
@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+import pytest
+
+from src.entity.prediction_input import BatchDataForm
+
+RECORD = {
+    "trans_date_trans_time": "2020-06-21 12:14:25",
+    "dob": "1968-03-19",
+    "amt": 2.86,
+    "city_pop": 333497,
+    "merch_long": -81.200714,
+}
+
+
+class FakeRequest:
+    def __init__(self, body: str, content_type: str = "application/json"):
+        self._body = body.encode()
+        self.headers = {"content-type": content_type}
+
+    async def body(self):
+        return self._body
+
+
+def get_records(body, content_type="application/json"):
+    return asyncio.run(BatchDataForm(FakeRequest(body, content_type)).get_records())
+
+
+def test_json_array_and_ndjson_parse_alike():
+    array = get_records(json.dumps([RECORD, RECORD]))
+    lines = get_records("\n".join([json.dumps(RECORD)] * 2) + "\n", "application/x-ndjson")
+
+    assert array == lines == [RECORD, RECORD]
+
+
+@pytest.mark.parametrize("body, content_type, message", [
+    (json.dumps(RECORD), "application/json", "JSON array"),
+    ("[]", "application/json", "No transaction records"),
+    (json.dumps([RECORD, 42]), "application/json", "Record 1 is not a JSON object"),
+    (json.dumps([["amt", 2.86]]), "application/json", "Record 0 is not a JSON object"),
+    ('"amt"\n', "application/x-ndjson", "Record 0 is not a JSON object"),
+    (json.dumps([{"amt": 2.86}]), "application/json", "Record 0 is missing fields"),
+])
+def test_malformed_batches_raise_value_error(body, content_type, message):
+    with pytest.raises(ValueError, match=message):
+        get_records(body, content_type)
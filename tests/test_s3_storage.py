@@ -0,0 +1,151 @@
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.cloud_storage.s3_storage import ETAG_SUFFIX, MB, S3Storage
+
+BUCKET = "artifacts"
+FOLDER = "models"
+FILE_NAME = "model.pkl"
+KEY = f"{FOLDER}/{FILE_NAME}"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def location(tmp_path):
+    return str(tmp_path / "artifacts" / FILE_NAME)
+
+
+def record_downloads(storage):
+    downloads = []
+    storage.on_download = lambda file_name, size, seconds: downloads.append((file_name, size))
+    return downloads
+
+
+def record_gets(s3_client):
+    gets = []
+    s3_client.meta.events.register("before-call.s3.GetObject", lambda params, **kwargs: gets.append(params["headers"].get("Range")))
+    return gets
+
+
+def leftovers(location):
+    directory = os.path.dirname(location)
+    return sorted(name for name in os.listdir(directory) if name.startswith("."))
+
+
+def test_matching_etag_skips_the_download(s3_client, location):
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=b"model v1")
+    storage = S3Storage(s3_client=s3_client)
+    downloads = record_downloads(storage)
+    gets = record_gets(s3_client)
+
+    assert storage.download_file(BUCKET, FOLDER, FILE_NAME, location) == location
+    assert storage.download_file(BUCKET, FOLDER, FILE_NAME, location) == location
+
+    assert downloads == [(FILE_NAME, len(b"model v1"))]
+    assert len(gets) == 1
+    etag = s3_client.head_object(Bucket=BUCKET, Key=KEY)["ETag"].strip('"')
+    assert S3Storage.local_etag(location) == etag
+
+
+def test_changed_etag_downloads_again(s3_client, location):
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=b"model v1")
+    storage = S3Storage(s3_client=s3_client)
+    downloads = record_downloads(storage)
+    storage.download_file(BUCKET, FOLDER, FILE_NAME, location)
+
+    # Same size, so only the ETag tells the versions apart
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=b"model v2")
+    assert storage.download_file(BUCKET, FOLDER, FILE_NAME, location) == location
+
+    assert len(downloads) == 2
+    with open(location, "rb") as f:
+        assert f.read() == b"model v2"
+    assert S3Storage.local_etag(location) == s3_client.head_object(Bucket=BUCKET, Key=KEY)["ETag"].strip('"')
+    assert leftovers(location) == []
+
+
+def test_objects_above_the_threshold_use_ranged_gets(s3_client, location):
+    body = os.urandom(3 * MB)
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=body)
+    storage = S3Storage(s3_client=s3_client, multipart_threshold=MB, multipart_chunksize=MB, max_concurrency=2)
+    gets = record_gets(s3_client)
+
+    assert storage.download_file(BUCKET, FOLDER, FILE_NAME, location) == location
+
+    assert len(gets) == 3 and all(get is not None and get.startswith("bytes=") for get in gets)
+    with open(location, "rb") as f:
+        assert f.read() == body
+
+
+def test_objects_below_the_threshold_use_one_get(s3_client, location):
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=os.urandom(MB // 2))
+    storage = S3Storage(s3_client=s3_client, multipart_threshold=MB, multipart_chunksize=MB)
+    gets = record_gets(s3_client)
+
+    storage.download_file(BUCKET, FOLDER, FILE_NAME, location)
+
+    assert gets == [None]
+
+
+def test_every_get_is_conditional_on_the_head_etag(s3_client, location):
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=os.urandom(3 * MB))
+    storage = S3Storage(s3_client=s3_client, multipart_threshold=MB, multipart_chunksize=MB)
+    if_match = []
+    s3_client.meta.events.register("before-call.s3.GetObject", lambda params, **kwargs: if_match.append(params["headers"].get("If-Match")))
+
+    storage.download_file(BUCKET, FOLDER, FILE_NAME, location)
+
+    assert if_match == [s3_client.head_object(Bucket=BUCKET, Key=KEY)["ETag"]] * 3
+
+
+def test_failed_download_leaves_no_temp_file_or_etag(s3_client, location, monkeypatch):
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=b"model v1")
+    storage = S3Storage(s3_client=s3_client)
+
+    def fail_midway(bucket, key, path, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(s3_client, "download_file", fail_midway)
+
+    assert storage.download_file(BUCKET, FOLDER, FILE_NAME, location) is None
+    assert not os.path.exists(location)
+    assert not os.path.exists(location + ETAG_SUFFIX)
+    assert leftovers(location) == []
+
+
+def test_object_overwritten_during_the_download_keeps_the_local_copy(s3_client, location):
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=b"model v1")
+    storage = S3Storage(s3_client=s3_client)
+    storage.download_file(BUCKET, FOLDER, FILE_NAME, location)
+    v1_etag = S3Storage.local_etag(location)
+
+    s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=b"model v2")
+    overwritten = []
+
+    def overwrite_after_head(**kwargs):
+        if not overwritten:
+            overwritten.append(True)
+            s3_client.put_object(Bucket=BUCKET, Key=KEY, Body=b"model v3")
+
+    s3_client.meta.events.register("after-call.s3.HeadObject", overwrite_after_head)
+
+    assert storage.download_file(BUCKET, FOLDER, FILE_NAME, location) is None
+    with open(location, "rb") as f:
+        assert f.read() == b"model v1"
+    assert S3Storage.local_etag(location) == v1_etag
+    assert leftovers(location) == []
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.monitoring.sampling import ReservoirSampler, percentile_interval, sample_chunks
+
+
+def chunked(frame, chunk_size):
+    for start in range(0, len(frame), chunk_size):
+        yield frame.iloc[start:start + chunk_size]
+
+
+def stream(rows=1000, fraud_rate=0.01):
+    return pd.DataFrame({
+        "row": np.arange(rows),
+        "is_fraud": (np.arange(rows) % int(1 / fraud_rate) == 0).astype(int),
+    })
+
+
+def test_short_stream_is_kept_whole():
+    sample, rows_seen = sample_chunks(chunked(stream(30), 7), size=50, seed=0)
+
+    assert rows_seen == 30
+    assert sample["row"].tolist() == list(range(30))
+
+
+def test_reservoir_keeps_size_distinct_rows():
+    sample, rows_seen = sample_chunks(chunked(stream(), 64), size=50, seed=0)
+
+    assert rows_seen == 1000
+    assert len(sample) == 50
+    assert sample["row"].is_unique
+    assert sample.index.tolist() == list(range(50))
+
+
+def test_reservoir_draws_every_row_alike():
+    # Each row should land in a 50-row sample of 1000 one time in 20, wherever it sits in the stream
+    trials = 400
+    counts = np.zeros(10)
+    for seed in range(trials):
+        sample, _ = sample_chunks(chunked(stream(), 100), size=50, seed=seed)
+        counts += np.bincount(sample["row"].to_numpy() // 100, minlength=10)
+
+    expected = trials * 50 / 10
+    assert np.all(np.abs(counts - expected) < 0.1 * expected)
+
+
+def test_reservoir_is_reproducible_with_a_seed():
+    first, _ = sample_chunks(chunked(stream(), 64), size=50, seed=7)
+    second, _ = sample_chunks(chunked(stream(), 64), size=50, seed=7)
+
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_stratified_keeps_the_rare_class_share():
+    sample, rows_seen = sample_chunks(chunked(stream(10_000), 500), size=200, method="stratified",
+                                      column="is_fraud", seed=0)
+
+    assert rows_seen == 10_000
+    assert sample["is_fraud"].sum() == 2
+    assert len(sample) == 200
+    assert sample["row"].is_unique
+
+
+def test_stratified_keeps_a_row_of_every_class_seen():
+    sample, _ = sample_chunks(chunked(stream(10_000, fraud_rate=0.0005), 500), size=100,
+                              method="stratified", column="is_fraud", seed=0)
+
+    assert sample["is_fraud"].sum() == 1
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        sample_chunks([stream()], size=10, method="systematic")
+
+
+def test_empty_sample_size_is_rejected():
+    with pytest.raises(ValueError):
+        ReservoirSampler(0)
+
+
+def test_percentile_interval():
+    low, high = percentile_interval(np.arange(1001), confidence=0.9)
+
+    assert (low, high) == pytest.approx((50.0, 950.0))
@@ -0,0 +1,55 @@
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from src.model.search import SuccessiveHalvingSearch, serving_cost, within_budget
+
+SPACE = {"n_estimators": [5, 20], "max_depth": [2, None]}
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = make_classification(n_samples=2400, n_features=6, n_informative=4, weights=[0.8], random_state=0)
+    return X[:2000], y[:2000], X[2000:], y[2000:]
+
+
+def test_ranking_lists_every_candidate_winner_first(data):
+    search = SuccessiveHalvingSearch(SPACE, factor=2, min_rows=500, n_jobs=1)
+    ranking, trials = search.run(*data)
+
+    assert sorted(map(str, ranking)) == sorted(map(str, search.candidates))
+    last_rung = [trial for trial in trials if trial.rung == trials[-1].rung]
+    assert ranking[0] == max(last_rung, key=search.rank_key).params
+    # Candidates dropped at a later rung rank above those dropped earlier
+    rung_reached = {str(trial.params): trial.rung for trial in trials}
+    assert [rung_reached[str(params)] for params in ranking] == sorted(rung_reached.values(), reverse=True)
+
+
+def test_candidates_over_budget_rank_last(data):
+    search = SuccessiveHalvingSearch(SPACE, factor=2, min_rows=2000, max_model_mb=0.01, n_jobs=1)
+    ranking, trials = search.run(*data)
+
+    assert ranking[0] == next(trial.params for trial in trials if trial.within_budget)
+    assert all(trial.within_budget == (trial.model_mb <= 0.01) for trial in trials)
+
+
+def test_serving_cost_of_a_forest(data):
+    X_train, y_train, X_val, _ = data
+    small = RandomForestClassifier(n_estimators=5, max_depth=2, random_state=0).fit(X_train, y_train)
+    large = RandomForestClassifier(n_estimators=20, random_state=0).fit(X_train, y_train)
+
+    small_ms, small_mb = serving_cost(small, X_val[:1])
+    large_ms, large_mb = serving_cost(large, X_val[:1])
+    assert 0 < small_mb < large_mb
+    assert small_ms > 0 and large_ms > 0
+
+
+@pytest.mark.parametrize("max_latency_ms, max_model_mb, expected", [
+    (None, None, True),
+    (2.0, None, True),
+    (0.5, None, False),
+    (None, 10.0, True),
+    (2.0, 5.0, False),
+])
+def test_within_budget(max_latency_ms, max_model_mb, expected):
+    assert within_budget(1.0, 8.0, max_latency_ms, max_model_mb) == expected
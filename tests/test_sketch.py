@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.monitoring.sketch import PSI_EPSILON, ReferenceSketch
+
+
+def frame(seed, n=20000, amt_shift=0.0, age_scale=1.0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "amt": rng.lognormal(3 + amt_shift, 1, n),
+        "age": rng.normal(45, 15 * age_scale, n),
+    })
+
+
+def exact_ks(a, b):
+    grid = np.sort(np.concatenate([a, b]))
+    cdf_a = np.searchsorted(np.sort(a), grid, side="right") / len(a)
+    cdf_b = np.searchsorted(np.sort(b), grid, side="right") / len(b)
+    return float(np.max(np.abs(cdf_a - cdf_b)))
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return frame(0)
+
+
+@pytest.fixture(scope="module")
+def sketch(reference):
+    return ReferenceSketch.from_frame(reference)
+
+
+def test_same_distribution_scores_low(sketch):
+    scores = sketch.score(frame(1))
+    assert (scores["psi"] < 0.01).all()
+    assert (scores["ks"] < 0.03).all()
+
+
+def test_shifted_feature_scores_high_and_only_it(sketch):
+    scores = sketch.score(frame(1, amt_shift=0.5))
+    assert scores.loc["amt", "psi"] > 0.2
+    assert scores.loc["amt", "ks"] > 0.15
+    assert scores.loc["age", "psi"] < 0.01
+
+
+def test_psi_matches_the_binned_formula(sketch, reference):
+    current = frame(1, age_scale=1.5)
+    edges = np.asarray(sketch.columns["age"]["bin_edges"])
+    bins = np.concatenate([[-np.inf], edges, [np.inf]])
+    expected_shares = np.clip(np.histogram(reference["age"], bins)[0] / len(reference), PSI_EPSILON, None)
+    actual_shares = np.clip(np.histogram(current["age"], bins)[0] / len(current), PSI_EPSILON, None)
+    expected = np.sum((actual_shares - expected_shares) * np.log(actual_shares / expected_shares))
+
+    assert sketch.score(current).loc["age", "psi"] == pytest.approx(expected, rel=1e-6)
+
+
+@pytest.mark.parametrize("amt_shift", [0.0, 0.1, 0.5])
+def test_ks_is_a_lower_bound_within_one_percentile(sketch, reference, amt_shift):
+    current = frame(1, amt_shift=amt_shift)
+    exact = exact_ks(reference["amt"].to_numpy(), current["amt"].to_numpy())
+    ks = sketch.score(current).loc["amt", "ks"]
+
+    assert exact - 0.011 <= ks <= exact + 1e-9
+
+
+def test_psi_is_zero_on_identical_shares_and_symmetric():
+    shares = np.array([0.2, 0.3, 0.5])
+    other = np.array([0.4, 0.4, 0.2])
+    assert ReferenceSketch.psi(shares, shares) == 0.0
+    assert ReferenceSketch.psi(shares, other) == pytest.approx(ReferenceSketch.psi(other, shares))
+
+
+def test_missing_values_are_left_out(sketch):
+    current = frame(1)
+    current.loc[::2, "amt"] = np.nan
+    current["age"] = np.nan
+    scores = sketch.score(current)
+
+    assert scores.loc["amt", "count"] == len(current) // 2
+    assert scores.loc["amt", "psi"] < 0.01
+    assert scores.loc["age", "count"] == 0 and np.isnan(scores.loc["age", "psi"])
+
+
+def test_saved_sketch_scores_the_same(sketch, tmp_path):
+    path = tmp_path / "reference_sketch.json"
+    sketch.save(path)
+    current = frame(2, amt_shift=0.2)
+
+    pd.testing.assert_frame_equal(ReferenceSketch.load(path).score(current), sketch.score(current))
+
+
+def test_window_without_a_sketched_column_is_rejected(sketch):
+    with pytest.raises(ValueError):
+        sketch.score(frame(1).drop(columns=["age"]))
@@ -0,0 +1,101 @@
+import dataclasses
+import os
+from unittest import mock
+
+import pytest
+
+from src.utils import stage_cache
+from src.utils.stage_cache import StageCache
+
+
+@dataclasses.dataclass(frozen=True)
+class StageConfig:
+    chunk_size: int = 1000
+    output_format: str = "parquet"
+
+
+@pytest.fixture
+def files(tmp_path):
+    source = tmp_path / "source.csv"
+    source.write_text("a,b\n1,2\n")
+    output = tmp_path / "out" / "table.parquet"
+    output.parent.mkdir()
+    output.write_bytes(b"table v1")
+    return source, output
+
+
+def cache(tmp_path):
+    return StageCache("Test stage", tmp_path / "stage")
+
+
+def stored(tmp_path, files, config=StageConfig()):
+    source, output = files
+    first = cache(tmp_path)
+    fingerprint = first.fingerprint(config, [source])
+    first.store(fingerprint, {"path": str(output)}, output_paths=[output], input_paths=[source])
+    return fingerprint
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_same_config_and_inputs_hit(tmp_path, files):
+    fingerprint = stored(tmp_path, files)
+    reopened = cache(tmp_path)
+
+    assert reopened.fingerprint(StageConfig(), [files[0]]) == fingerprint
+    assert reopened.lookup(fingerprint) == {"path": str(files[1])}
+
+
+def test_config_change_changes_the_fingerprint(tmp_path, files):
+    fingerprint = stored(tmp_path, files)
+
+    changed = cache(tmp_path).fingerprint(StageConfig(chunk_size=500), [files[0]])
+    assert changed != fingerprint
+    assert cache(tmp_path).lookup(changed) is None
+
+
+def test_input_content_change_changes_the_fingerprint(tmp_path, files):
+    fingerprint = stored(tmp_path, files)
+    files[0].write_text("a,b\n1,23\n")
+
+    assert cache(tmp_path).fingerprint(StageConfig(), [files[0]]) != fingerprint
+
+
+def test_touched_input_keeps_the_fingerprint(tmp_path, files):
+    fingerprint = stored(tmp_path, files)
+    bump_mtime(files[0])
+
+    assert cache(tmp_path).fingerprint(StageConfig(), [files[0]]) == fingerprint
+
+
+def test_unchanged_input_is_not_read_again(tmp_path, files):
+    fingerprint = stored(tmp_path, files)
+
+    with mock.patch.object(stage_cache, "_sha256", side_effect=AssertionError("input re-hashed")):
+        assert cache(tmp_path).fingerprint(StageConfig(), [files[0]]) == fingerprint
+
+
+def test_missing_or_modified_output_misses(tmp_path, files):
+    fingerprint = stored(tmp_path, files)
+    files[1].write_bytes(b"table v2!")
+    assert cache(tmp_path).lookup(fingerprint) is None
+
+    os.remove(files[1])
+    assert cache(tmp_path).lookup(fingerprint) is None
+
+
+def test_output_with_a_new_mtime_but_the_same_content_hits(tmp_path, files):
+    fingerprint = stored(tmp_path, files)
+    bump_mtime(files[1])
+
+    assert cache(tmp_path).lookup(fingerprint) is not None
+
+
+def test_unreadable_manifest_is_a_miss(tmp_path, files):
+    fingerprint = stored(tmp_path, files)
+    (tmp_path / "stage" / stage_cache.MANIFEST_FILE_NAME).write_text("{not json")
+
+    assert cache(tmp_path).lookup(fingerprint) is None